@@ -9,8 +9,12 @@ import sys
 import time
 import logging
 from logging.handlers import RotatingFileHandler
-from flask import Flask, request, jsonify
+import json
+from flask import Flask, Response, request, jsonify, stream_with_context
 from ptz_controller import PTZController
+from axis_wait import DEFAULT_TOLERANCE
+from fleet import FleetController
+from rs485_comm import STATE_CONNECTED, STATE_DISCONNECTED
 import serial
 
 # Flask应用初始化
@@ -27,10 +31,24 @@ YAW_MAX = 85.0
 PITCH_MIN = -10.0
 PITCH_MAX = 85.0
 
+# /set_position 等待到位的上限（秒）
+MAX_WAIT_S = 60.0
+
+# /status_stream 无新样本时发送心跳注释的间隔（秒）
+STREAM_KEEPALIVE_S = 15.0
+
+# /history 默认与最大返回点数（超过时按等间隔抽稀）
+HISTORY_DEFAULT_POINTS = 500
+HISTORY_MAX_POINTS = 2000
+
 # 全局PTZ控制器
 ptz_controller = None
 serial_error_flag = False
 
+# 机群控制器（--fleet 模式下代替单台 ptz_controller）
+fleet_controller = None
+SINGLE_HEAD_ENDPOINTS = ('set_position', 'get_status', 'status_stream', 'history', 'shutdown_motors', 'stop_motors')
+
 
 def setup_logging():
     """配置日志记录器，分离操作日志和错误日志，限制1M大小"""
@@ -91,12 +109,57 @@ def validate_angle(yaw, pitch):
     return True, None
 
 
+def validate_wait(wait, tolerance):
+    """
+    验证到位等待参数
+    :param wait: 最长等待秒数（None 表示不等待）
+    :param tolerance: 到位容差（度）
+    :return: (is_valid, error_message)
+    """
+    if wait is not None:
+        if isinstance(wait, bool) or not isinstance(wait, (int, float)) or not 0 <= wait <= MAX_WAIT_S:
+            return False, f"wait 必须是 0 到 {MAX_WAIT_S:g} 秒"
+    if isinstance(tolerance, bool) or not isinstance(tolerance, (int, float)) or tolerance <= 0:
+        return False, "tolerance 必须是正数"
+    return True, None
+
+
+@app.before_request
+def reject_single_head_in_fleet_mode():
+    """机群模式下没有单台云台，单台接口提示改用 /fleet/<name>/..."""
+    if fleet_controller is not None and request.endpoint in SINGLE_HEAD_ENDPOINTS:
+        error_msg = "机群模式下请使用 /fleet/<name>/... 接口"
+        return jsonify({"success": False, "error": error_msg, "code": 404}), 404
+
+
+def command_failed_response(result, axis, yaw, pitch):
+    """
+    按事务失败原因构造错误响应
+    - 连接断开/不可用: 503，调用方应等待重连
+    - 电机无应答/隔离中: 504，该轴电机可能离线
+    - CRC错误/应答不符: 500，线路干扰，可立即重试
+    """
+    if result.transport_down:
+        error_msg, code = "通信连接断开，请检查设备连接", 503
+    elif result.motor_absent:
+        error_msg, code = f"{axis.upper()}电机无应答", 504
+    else:
+        error_msg, code = "电机控制命令发送失败", 500
+    logging.error(f"设置位置失败: {error_msg}, yaw={yaw}, pitch={pitch}, "
+                  f"{axis}: status={result.status}, attempts={result.attempts}, "
+                  f"elapsed={result.elapsed * 1000.0:.1f}ms")
+    return jsonify({"success": False, "error": error_msg, "code": code,
+                    "axis": axis, "reason": result.status}), code
+
+
 @app.route('/set_position', methods=['POST'])
 def set_position():
     """
     设置PTZ位置
     接收JSON: {"yaw": 45.2, "pitch": -12.5}
-    返回JSON: {"success": true} 或 {"success": false, "error": "错误信息", "code": 错误码}
+              可选 "wait": 秒数，等待两轴到位后再返回；"tolerance": 到位容差（度，默认0.5）
+    返回JSON: {"success": true}（带 wait 时为 {"success": true, "reached": true/false}）
+              或 {"success": false, "error": "错误信息", "code": 错误码}
     """
     global serial_error_flag
     
@@ -113,7 +176,11 @@ def set_position():
             logging.error(f"设置位置失败: {error_msg}")
             return jsonify({"success": False, "error": error_msg, "code": 400}), 400
         
-        data = request.get_json()
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            error_msg = "请求体必须是JSON对象"
+            logging.error(f"设置位置失败: {error_msg}")
+            return jsonify({"success": False, "error": error_msg, "code": 400}), 400
         
         # 检查必需参数
         if 'yaw' not in data or 'pitch' not in data:
@@ -130,20 +197,32 @@ def set_position():
             logging.error(f"设置位置失败: {error_msg}, yaw={yaw}, pitch={pitch}")
             return jsonify({"success": False, "error": error_msg, "code": 400}), 400
         
-        # 设置电机角度
-        yaw_result = ptz_controller.set_yaw_angle(yaw)
-        pitch_result = ptz_controller.set_pitch_angle(pitch)
+        wait = data.get('wait')
+        tolerance = data.get('tolerance', DEFAULT_TOLERANCE)
+        is_valid, error_msg = validate_wait(wait, tolerance)
+        if not is_valid:
+            logging.error(f"设置位置失败: {error_msg}")
+            return jsonify({"success": False, "error": error_msg, "code": 400}), 400
         
-        if not yaw_result or not pitch_result:
-            error_msg = "电机控制命令发送失败"
-            logging.error(f"设置位置失败: {error_msg}, yaw={yaw}, pitch={pitch}")
-            return jsonify({"success": False, "error": error_msg, "code": 500}), 500
+        # 设置电机角度；连接断开时不再发送PITCH指令，立即返回
+        yaw_result = ptz_controller.set_yaw_angle_result(yaw)
+        if yaw_result.transport_down:
+            return command_failed_response(yaw_result, "yaw", yaw, pitch)
+        pitch_result = ptz_controller.set_pitch_angle_result(pitch)
+        
+        for axis, result in (("yaw", yaw_result), ("pitch", pitch_result)):
+            if not result.ok:
+                return command_failed_response(result, axis, yaw, pitch)
         
         logging.info(f"设置位置成功: yaw={yaw}°, pitch={pitch}°")
+        if wait is not None:
+            # 由后台轮询结果唤醒，不额外读取电机
+            reached = ptz_controller.wait_until_reached(yaw, pitch, tolerance, timeout=wait)
+            logging.info(f"等待到位: yaw={yaw}°, pitch={pitch}°, reached={reached}")
+            return jsonify({"success": True, "reached": reached})
         return jsonify({"success": True})
     
     except serial.SerialException as e:
-        serial_error_flag = True
         error_msg = f"串口通信异常: {str(e)}"
         logging.error(f"设置位置失败: {error_msg}")
         return jsonify({"success": False, "error": "串口通信失败，请检查设备连接", "code": 500}), 500
@@ -199,7 +278,6 @@ def get_status():
         return jsonify(response)
     
     except serial.SerialException as e:
-        serial_error_flag = True
         error_msg = f"串口通信异常: {str(e)}"
         logging.error(f"获取状态失败: {error_msg}")
         return jsonify({"success": False, "error": "串口通信失败，请检查设备连接", "code": 500}), 500
@@ -210,6 +288,86 @@ def get_status():
         return jsonify({"success": False, "error": "服务器内部错误", "code": 500}), 500
 
 
+@app.route('/status_stream', methods=['GET'])
+def status_stream():
+    """
+    实时状态推送（Server-Sent Events），由后台轮询结果直接推送，不额外读取电机
+    查询参数: deadband=角度死区（度，可选，只在变化超过死区时推送）
+    每个事件: data: {"axis": "yaw", "angle": 45.2, "temperature": 38, "seq": 12}
+              读取失败时 angle/temperature 为 null；客户端消费不及时会丢弃旧样本
+    """
+    if ptz_controller is None:
+        return jsonify({"success": False, "error": "控制器未初始化", "code": 500}), 500
+    deadband = request.args.get('deadband', type=float)
+    if deadband is not None and deadband < 0:
+        return jsonify({"success": False, "error": "deadband 不能为负数", "code": 400}), 400
+    axes = {ptz_controller.yaw_id: "yaw", ptz_controller.pitch_id: "pitch"}
+    sub = ptz_controller.subscribe(deadband=deadband)
+    
+    def events():
+        try:
+            while True:
+                sample = sub.get(timeout=STREAM_KEEPALIVE_S)
+                if sample is None:
+                    if sub.closed:
+                        return
+                    yield ": keepalive\n\n"
+                    continue
+                status = sample.status
+                event = {
+                    "axis": axes.get(sample.motor_id),
+                    "angle": status['angle_deg'] if status else None,
+                    "temperature": status['temperature'] if status else None,
+                    "seq": sample.seq
+                }
+                yield f"data: {json.dumps(event)}\n\n"
+        finally:
+            sub.close()
+    
+    logging.info(f"状态推送连接: deadband={deadband}")
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache'})
+
+
+@app.route('/history', methods=['GET'])
+def history():
+    """
+    遥测历史查询（后台监控记录的样本，不读取电机）
+    查询参数: axis=yaw|pitch（必填）, seconds=最近多少秒（可选）, max_points=最多点数（默认500，上限2000）
+    返回JSON: {"success": true, "axis": "yaw", "total": 3000, "step": 6,
+               "t": [-59.98, ...], "angle": [...], "temperature": [...], "target": [...]}
+              t 为相对当前时刻的秒数（负数）；读取失败的样本 angle/temperature 为 null，
+              尚未下发过指令时 target 为 null
+    """
+    if ptz_controller is None:
+        return jsonify({"success": False, "error": "控制器未初始化", "code": 500}), 500
+    axes = {"yaw": ptz_controller.yaw_id, "pitch": ptz_controller.pitch_id}
+    axis = request.args.get('axis')
+    if axis not in axes:
+        return jsonify({"success": False, "error": "axis 必须是 yaw 或 pitch", "code": 400}), 400
+    seconds = request.args.get('seconds', type=float)
+    if seconds is not None and seconds <= 0:
+        return jsonify({"success": False, "error": "seconds 必须是正数", "code": 400}), 400
+    max_points = request.args.get('max_points', HISTORY_DEFAULT_POINTS, type=int)
+    if not 0 < max_points <= HISTORY_MAX_POINTS:
+        error_msg = f"max_points 必须是 1 到 {HISTORY_MAX_POINTS}"
+        return jsonify({"success": False, "error": error_msg, "code": 400}), 400
+    
+    now = time.monotonic()
+    window = ptz_controller.get_history(axes[axis], seconds=seconds, max_points=max_points)
+    return jsonify({
+        "success": True,
+        "axis": axis,
+        "total": window['total'],
+        "step": window['step'],
+        "t": [round(t - now, 3) for t in window['time']],
+        "angle": window['angle_deg'],
+        "temperature": [None if angle is None else temperature
+                        for angle, temperature in zip(window['angle_deg'], window['temperature'])],
+        "target": window['target_deg']
+    })
+
+
 @app.route('/shutdown', methods=['POST'])
 def shutdown_motors():
     """
@@ -226,12 +384,17 @@ def shutdown_motors():
             return jsonify({"success": False, "error": error_msg, "code": 500}), 500
         
         # 关闭电机（0x80指令）
-        ptz_controller.shutdown_motors()
+        result = ptz_controller.shutdown_motors()
+        
+        if not result:
+            error_msg = "关闭电机失败"
+            logging.error(f"关闭电机失败: {error_msg}")
+            return jsonify({"success": False, "error": error_msg, "code": 500}), 500
+        
         logging.info("电机已关闭（0xCD广播指令）")
         return jsonify({"success": True})
     
     except serial.SerialException as e:
-        serial_error_flag = True
         error_msg = f"串口通信异常: {str(e)}"
         logging.error(f"关闭电机失败: {error_msg}")
         return jsonify({"success": False, "error": "串口通信失败，请检查设备连接", "code": 500}), 500
@@ -269,7 +432,6 @@ def stop_motors():
         return jsonify({"success": True})
     
     except serial.SerialException as e:
-        serial_error_flag = True
         error_msg = f"串口通信异常: {str(e)}"
         logging.error(f"停止电机失败: {error_msg}")
         return jsonify({"success": False, "error": "串口通信失败，请检查设备连接", "code": 500}), 500
@@ -284,34 +446,208 @@ def stop_motors():
 def health_check():
     """
     健康检查接口
-    返回JSON: {"healthy": true, "serial_connected": true}
+    返回JSON: {"healthy": true, "serial_connected": true, "connection_state": "connected",
+              "bus": {"emergency": {"depth": 0, "wait_max_ms": ...}, "motion": {...}, "poll": {...}},
+              "poll": {"interval_ms": 500, "rate_hz": 2.0, "overruns": 0, "lateness": {...}, "jitter": {...}}}
     """
+    if fleet_controller is not None:
+        fleet_stats = fleet_controller.stats()
+        return jsonify({
+            "healthy": True,
+            "serial_connected": all(bus['state'] == STATE_CONNECTED for bus in fleet_stats['buses'].values()),
+            "connection_state": None,
+            "fleet": fleet_stats
+        })
     return jsonify({
         "healthy": True,
-        "serial_connected": not serial_error_flag
+        "serial_connected": not serial_error_flag,
+        "connection_state": ptz_controller.connection_state if ptz_controller else None,
+        "bus": ptz_controller.get_bus_stats() if ptz_controller else None,
+        "poll": ptz_controller.get_poll_stats() if ptz_controller else None
     })
 
 
-def init_ptz_controller(port='192.168.25.78:502', yaw_id=1, pitch_id=2):
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    事务统计接口（各电机/命令的写出、首字节、整帧延迟直方图，重试次数与失败原因计数）
+    返回JSON: {"success": true, "metrics": {"commands": {"1:0x94": {...}}, "totals": {...}}}
+              机群模式下 metrics 为 {总线: {...}}
+    """
+    if fleet_controller is not None:
+        return jsonify({"success": True, "metrics": fleet_controller.metrics()})
+    if ptz_controller is None:
+        return jsonify({"success": False, "error": "控制器未初始化", "code": 500}), 500
+    return jsonify({"success": True, "metrics": ptz_controller.get_bus_metrics()})
+
+
+@app.route('/fleet/heads', methods=['GET'])
+def fleet_heads():
+    """
+    列出机群中的云台
+    返回JSON: {"success": true, "heads": ["gate-01", "gate-02"]}
+    """
+    if fleet_controller is None:
+        return jsonify({"success": False, "error": "未启用机群模式", "code": 404}), 404
+    return jsonify({"success": True, "heads": fleet_controller.heads()})
+
+
+@app.route('/fleet/status', methods=['GET'])
+def fleet_status():
+    """
+    获取所有云台状态（缓存，由机群轮询线程更新）
+    返回JSON: {"success": true, "heads": {"gate-01": {"yaw_angle": ..., "pitch_angle": ..., ...}}}
+    """
+    if fleet_controller is None:
+        return jsonify({"success": False, "error": "未启用机群模式", "code": 404}), 404
+    heads = {name: format_fleet_status(status)
+             for name, status in fleet_controller.get_all_status().items()}
+    return jsonify({"success": True, "heads": heads})
+
+
+def format_fleet_status(status):
+    """机群云台状态转换为与 /get_status 相同的字段"""
+    yaw_status = status['yaw'] or {}
+    pitch_status = status['pitch'] or {}
+    return {
+        "online": bool(status['yaw'] and status['pitch']),
+        "yaw_angle": yaw_status.get('angle_deg'),
+        "pitch_angle": pitch_status.get('angle_deg'),
+        "yaw_temperature": yaw_status.get('temperature'),
+        "pitch_temperature": pitch_status.get('temperature'),
+        "connection_state": status['connection_state'],
+        "age_ms": status['age_ms']
+    }
+
+
+@app.route('/fleet/<name>/get_status', methods=['GET'])
+def fleet_get_status(name):
+    """
+    获取指定云台状态（缓存）
+    返回JSON: {"success": true, "yaw_angle": 45.2, "pitch_angle": -12.5, ...}
+    """
+    if fleet_controller is None:
+        return jsonify({"success": False, "error": "未启用机群模式", "code": 404}), 404
+    try:
+        status = fleet_controller.get_status(name)
+    except KeyError:
+        return jsonify({"success": False, "error": f"未知云台: {name}", "code": 404}), 404
+    response = format_fleet_status(status)
+    if not response['online']:
+        error_msg = "无法读取电机状态数据"
+        logging.error(f"获取状态失败: {name}: {error_msg}")
+        return jsonify({"success": False, "error": error_msg, "code": 500}), 500
+    response["success"] = True
+    return jsonify(response)
+
+
+@app.route('/fleet/<name>/set_position', methods=['POST'])
+def fleet_set_position(name):
+    """
+    设置指定云台位置
+    接收JSON: {"yaw": 45.2, "pitch": -12.5}
+    返回JSON: {"success": true} 或 {"success": false, "error": "错误信息", "code": 错误码}
+    """
+    if fleet_controller is None:
+        return jsonify({"success": False, "error": "未启用机群模式", "code": 404}), 404
+    if not request.is_json:
+        return jsonify({"success": False, "error": "请求必须是JSON格式", "code": 400}), 400
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"success": False, "error": "请求体必须是JSON对象", "code": 400}), 400
+    if 'yaw' not in data or 'pitch' not in data:
+        return jsonify({"success": False, "error": "缺少必需参数：yaw 和 pitch", "code": 400}), 400
+    yaw = data['yaw']
+    pitch = data['pitch']
+    is_valid, error_msg = validate_angle(yaw, pitch)
+    if not is_valid:
+        logging.error(f"设置位置失败: {name}: {error_msg}, yaw={yaw}, pitch={pitch}")
+        return jsonify({"success": False, "error": error_msg, "code": 400}), 400
+    try:
+        yaw_result, pitch_result = fleet_controller.set_angles_result(name, yaw, pitch)
+    except KeyError:
+        return jsonify({"success": False, "error": f"未知云台: {name}", "code": 404}), 404
+    except Exception as e:
+        logging.error(f"设置位置失败: {name}: 未知错误: {str(e)}")
+        return jsonify({"success": False, "error": "服务器内部错误", "code": 500}), 500
+    for axis, result in (("yaw", yaw_result), ("pitch", pitch_result)):
+        if not result.ok:
+            return command_failed_response(result, axis, yaw, pitch)
+    logging.info(f"设置位置成功: {name}: yaw={yaw}°, pitch={pitch}°")
+    return jsonify({"success": True})
+
+
+@app.route('/fleet/stop', methods=['POST'])
+def fleet_stop():
+    """
+    所有网关同时广播停止（0xCD, 0x81）
+    返回JSON: {"success": true, "buses": {"tcp://192.168.10.11:502": true, ...}}
+    """
+    if fleet_controller is None:
+        return jsonify({"success": False, "error": "未启用机群模式", "code": 404}), 404
+    results = fleet_controller.stop_all()
+    if not all(results.values()):
+        logging.error(f"机群停止失败: {results}")
+        return jsonify({"success": False, "error": "停止电机失败", "buses": results, "code": 500}), 500
+    logging.info(f"机群电机已停止（{len(results)} 条总线 0xCD广播指令）")
+    return jsonify({"success": True, "buses": results})
+
+
+@app.route('/fleet/shutdown', methods=['POST'])
+def fleet_shutdown():
+    """
+    所有网关同时广播关闭（0xCD, 0x80）
+    返回JSON: {"success": true, "buses": {...}}
+    """
+    if fleet_controller is None:
+        return jsonify({"success": False, "error": "未启用机群模式", "code": 404}), 404
+    results = fleet_controller.shutdown_all()
+    if not all(results.values()):
+        logging.error(f"机群关闭失败: {results}")
+        return jsonify({"success": False, "error": "关闭电机失败", "buses": results, "code": 500}), 500
+    logging.info(f"机群电机已关闭（{len(results)} 条总线 0xCD广播指令）")
+    return jsonify({"success": True, "buses": results})
+
+
+def on_connection_state(old_state, new_state):
+    """
+    通信连接状态回调：断线时置位错误标志，后台重连成功后自动清除
+    （不再需要重启进程恢复）
+    """
+    global serial_error_flag
+    if new_state == STATE_CONNECTED:
+        serial_error_flag = False
+        logging.info(f"通信连接已恢复: {old_state} -> {new_state}")
+    elif new_state == STATE_DISCONNECTED:
+        serial_error_flag = True
+        if old_state == STATE_CONNECTED:
+            logging.error(f"通信连接断开，后台重连中: {old_state} -> {new_state}")
+
+
+def init_ptz_controller(port='192.168.25.78:502', yaw_id=1, pitch_id=2, adaptive_poll=False):
     """
     初始化PTZ控制器并启动监控线程
     :param port: 通信端口（串口路径或TCP地址，如192.168.25.78:502）
     :param yaw_id: YAW电机ID
     :param pitch_id: PITCH电机ID
+    :param adaptive_poll: 运动自适应轮询（运动中20ms，静止后退避到500ms）
     """
     global ptz_controller, serial_error_flag
     
     try:
         logging.info(f"初始化PTZ控制器: port={port}, yaw_id={yaw_id}, pitch_id={pitch_id}")
         ptz_controller = PTZController(port=port, yaw_id=yaw_id, pitch_id=pitch_id)
+        ptz_controller.add_connection_listener(on_connection_state)
         
-        # 启动500ms轮询监控线程
-        ptz_controller.start_monitoring(interval_ms=500)
+        # 按500ms固定频率轮询（总线的轮询线程驱动）；自适应时500ms为静止轴的上限
+        ptz_controller.start_monitoring(interval_ms=500, adaptive=adaptive_poll)
         
         # 等待首次轮询完成
         time.sleep(1.0)
         
-        serial_error_flag = False
+        serial_error_flag = not ptz_controller.available
+        if serial_error_flag:
+            logging.error(f"通信端口暂不可用，后台自动重连中: {port}")
         logging.info("PTZ控制器初始化成功，监控线程已启动（500ms轮询间隔）")
         
     except Exception as e:
@@ -320,6 +656,20 @@ def init_ptz_controller(port='192.168.25.78:502', yaw_id=1, pitch_id=2):
         raise
 
 
+def init_fleet_controller(config_path):
+    """
+    按配置文件初始化机群控制器并启动轮询线程
+    :param config_path: 机群配置文件（JSON，格式见 fleet.py）
+    """
+    global fleet_controller
+    
+    logging.info(f"初始化机群控制器: config={config_path}")
+    fleet_controller = FleetController.from_config(config_path)
+    fleet_controller.start_monitoring()
+    stats = fleet_controller.stats()
+    logging.info(f"机群控制器初始化成功: {stats['heads']} 台云台, {len(stats['buses'])} 条总线")
+
+
 def main():
     """主函数"""
     import argparse
@@ -335,6 +685,12 @@ def main():
                        help='监听地址 (默认: 127.0.0.1)')
     parser.add_argument('--port-num', type=int, default=50278,
                        help='监听端口 (默认: 50278)')
+    parser.add_argument('--fleet', type=str, default=None,
+                       help='机群配置文件(JSON)，指定后一个进程管理多台云台，忽略 --port/--yaw-id/--pitch-id')
+    parser.add_argument('--adaptive-poll', action='store_true',
+                       help='运动自适应轮询：指令后和运动中按20ms轮询，停稳后退避到500ms')
+    parser.add_argument('--capture', type=str, default=None,
+                       help='总线抓包环形文件路径（机群模式下为目录，每条总线一个文件），用 wire_capture.py 离线查看')
     
     args = parser.parse_args()
     
@@ -349,9 +705,20 @@ def main():
             datefmt='%Y-%m-%d %H:%M:%S'
         )
     
-    # 初始化PTZ控制器
+    # 初始化PTZ控制器（或机群控制器）
     try:
-        init_ptz_controller(port=args.port, yaw_id=args.yaw_id, pitch_id=args.pitch_id)
+        if args.fleet:
+            init_fleet_controller(args.fleet)
+        else:
+            init_ptz_controller(port=args.port, yaw_id=args.yaw_id, pitch_id=args.pitch_id,
+                                adaptive_poll=args.adaptive_poll)
+        if args.capture:
+            if fleet_controller is not None:
+                paths = fleet_controller.start_wire_capture(args.capture)
+                logging.info(f"总线抓包已开启: {', '.join(paths.values())}")
+            else:
+                ptz_controller.start_wire_capture(args.capture)
+                logging.info(f"总线抓包已开启: {args.capture}")
     except Exception as e:
         logging.error(f"无法启动API服务器: {str(e)}")
         sys.exit(1)
@@ -359,11 +726,18 @@ def main():
     # 启动Flask服务器
     logging.info(f"启动Flask API服务器: http://{args.host}:{args.port_num}")
     logging.info(f"API端点:")
-    logging.info(f"  POST /set_position - 设置PTZ位置 (JSON: {{\"yaw\": float, \"pitch\": float}})")
+    logging.info(f"  POST /set_position - 设置PTZ位置 (JSON: {{\"yaw\": float, \"pitch\": float, \"wait\": 可选秒数}})")
     logging.info(f"  GET  /get_status   - 获取PTZ状态 (返回角度和温度)")
+    logging.info(f"  GET  /status_stream - 实时状态推送 (SSE，可选 ?deadband=0.1)")
     logging.info(f"  POST /stop         - 停止所有电机运动 (0xCD广播指令)")
     logging.info(f"  POST /shutdown     - 关闭所有电机 (0xCD广播指令)")
     logging.info(f"  GET  /health       - 健康检查")
+    logging.info(f"  GET  /metrics      - 事务延迟与错误统计")
+    if fleet_controller is not None:
+        logging.info(f"  GET  /fleet/status              - 所有云台状态")
+        logging.info(f"  GET  /fleet/<name>/get_status   - 指定云台状态")
+        logging.info(f"  POST /fleet/<name>/set_position - 设置指定云台位置")
+        logging.info(f"  POST /fleet/stop | /fleet/shutdown - 所有网关同时广播")
     logging.info(f"角度限制: YAW={YAW_MIN}°~{YAW_MAX}°, PITCH={PITCH_MIN}°~{PITCH_MAX}°")
     
     try:
@@ -371,6 +745,14 @@ def main():
     except KeyboardInterrupt:
         logging.info("收到退出信号，正在关闭...")
     finally:
+        if fleet_controller:
+            try:
+                fleet_controller.shutdown_all()
+                logging.info("机群电机关闭指令已发送")
+            except:
+                logging.warning("发送机群电机关闭指令时出错")
+            fleet_controller.close()
+            logging.info("机群控制器已关闭")
         if ptz_controller:
             # 发送关闭电机指令
             try:
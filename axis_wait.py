@@ -0,0 +1,124 @@
+"""到位等待：由控制器轮询线程的每次采样驱动，等待者不产生额外的总线流量。
+
+控制器在每个轮询周期写入状态缓存后调用 publish()，它在控制器的状态锁下:
+    - 唤醒同步等待者 (threading.Condition)，由它们自己检查是否到位
+    - 逐个检查 Future 等待者，到位的以 True 结束，超过截止时间的以 False 结束
+      (释放锁之后再设置结果，回调里可以安全地读取控制器状态)
+
+所有等待者共用同一条轮询流，完成延迟约为一个轮询周期；Future 的超时也在轮询
+周期上判定，不为每个等待者单独起线程或定时器。停止监控时 abort() 让所有未完成
+的等待以 False 结束，并在 resume() 之前拒绝新的等待 (立即以 False 结束)：等待者
+在同一把锁下登记，与停止监控并发时也不会漏掉。
+
+用法 (控制器内部):
+    self._waiters = AxisWaiters(self._status_lock)
+    ...
+    self._waiters.resume()                    # start_monitoring
+    self._waiters.publish({yaw_id: yaw_angle, pitch_id: pitch_angle}, time.monotonic())
+"""
+from __future__ import annotations
+import threading
+import time
+from concurrent.futures import Future
+from typing import Optional, Dict, List
+from poll_scheduler import angle_delta
+
+DEFAULT_TOLERANCE = 0.5        # 到位容差（度）
+DEFAULT_TIMEOUT = 10.0         # 默认等待时长（秒）
+
+
+def within(angle: Optional[float], target: float, tolerance: float) -> bool:
+    """角度 (度，可跨 ±180°) 是否在目标的容差内；angle 为 None (读取失败) 视为未到位"""
+    return angle is not None and abs(angle_delta(angle, target)) <= tolerance
+
+
+class _Waiter:
+    __slots__ = ('targets', 'tolerance', 'deadline', 'future')
+
+    def __init__(self, targets: Dict[int, float], tolerance: float, deadline: float):
+        self.targets = targets
+        self.tolerance = tolerance
+        self.deadline = deadline
+        self.future: Future = Future()
+        # 已进入等待，不再允许 cancel()，结果只由 publish()/abort() 设置
+        self.future.set_running_or_notify_cancel()
+
+
+class AxisWaiters:
+    """一组轴的到位等待
+
+    Args:
+        lock: 控制器的状态锁 (不可重入)；publish() 调用时不能持有
+    """
+
+    def __init__(self, lock: threading.Lock):
+        self._cond = threading.Condition(lock)
+        self._angles: Dict[int, float] = {}
+        self._pending: List[_Waiter] = []
+        self._generation = 0
+        self._closed = False
+
+    def _reached(self, targets: Dict[int, float], tolerance: float) -> bool:
+        angles = self._angles
+        return all(within(angles.get(motor_id), target, tolerance) for motor_id, target in targets.items())
+
+    def publish(self, angles: Dict[int, Optional[float]], now: float):
+        """写入一次采样 (角度为 None 表示读取失败，沿用该轴上次的角度)，结束到位或超时的等待并唤醒同步等待者"""
+        done = []
+        with self._cond:
+            for motor_id, angle in angles.items():
+                if angle is not None:
+                    self._angles[motor_id] = angle
+            if self._pending:
+                remaining = []
+                for waiter in self._pending:
+                    if self._reached(waiter.targets, waiter.tolerance):
+                        done.append((waiter.future, True))
+                    elif now >= waiter.deadline:
+                        done.append((waiter.future, False))
+                    else:
+                        remaining.append(waiter)
+                self._pending = remaining
+            self._cond.notify_all()
+        for future, reached in done:
+            future.set_result(reached)
+
+    def wait(self, targets: Dict[int, float], tolerance: float = DEFAULT_TOLERANCE,
+             timeout: Optional[float] = DEFAULT_TIMEOUT) -> bool:
+        """阻塞直到所有目标轴到位 (True) 或超时/监控停止 (False)"""
+        with self._cond:
+            if self._closed:
+                return False
+            generation = self._generation
+            self._cond.wait_for(lambda: self._generation != generation or self._reached(targets, tolerance),
+                                timeout)
+            return self._generation == generation and self._reached(targets, tolerance)
+
+    def future(self, targets: Dict[int, float], tolerance: float = DEFAULT_TOLERANCE,
+               timeout: Optional[float] = DEFAULT_TIMEOUT) -> Future:
+        """返回 Future：到位时结果为 True，超时或监控停止时为 False (在轮询周期上判定)"""
+        deadline = float('inf') if timeout is None else time.monotonic() + timeout
+        waiter = _Waiter(targets, tolerance, deadline)
+        with self._cond:
+            reached = not self._closed and self._reached(targets, tolerance)
+            if not reached and not self._closed:
+                self._pending.append(waiter)
+                return waiter.future
+        waiter.future.set_result(reached)
+        return waiter.future
+
+    def resume(self):
+        """重新接受等待 (启动监控时调用)"""
+        with self._cond:
+            self._closed = False
+
+    def abort(self):
+        """所有未完成的等待以 False 结束，清空已知角度，resume() 之前新的等待立即以 False 结束 (停止监控时调用)"""
+        with self._cond:
+            self._closed = True
+            pending, self._pending = self._pending, []
+            self._angles.clear()
+            self._generation += 1
+            self._cond.notify_all()
+        for waiter in pending:
+            waiter.future.set_result(False)
@@ -42,6 +42,18 @@ cp ptz_controller.py ${BUILD_DIR}/usr/share/inchiptz/
 cp lift_motor.py ${BUILD_DIR}/usr/share/inchiptz/
 cp rs485_comm.py ${BUILD_DIR}/usr/share/inchiptz/
 cp proto_v43.py ${BUILD_DIR}/usr/share/inchiptz/
+cp crc16.py ${BUILD_DIR}/usr/share/inchiptz/
+cp rtt_estimator.py ${BUILD_DIR}/usr/share/inchiptz/
+cp bus_scheduler.py ${BUILD_DIR}/usr/share/inchiptz/
+cp bus_registry.py ${BUILD_DIR}/usr/share/inchiptz/
+cp bus_timing.py ${BUILD_DIR}/usr/share/inchiptz/
+cp bus_metrics.py ${BUILD_DIR}/usr/share/inchiptz/
+cp fleet.py ${BUILD_DIR}/usr/share/inchiptz/
+cp wire_capture.py ${BUILD_DIR}/usr/share/inchiptz/
+cp poll_scheduler.py ${BUILD_DIR}/usr/share/inchiptz/
+cp axis_wait.py ${BUILD_DIR}/usr/share/inchiptz/
+cp status_feed.py ${BUILD_DIR}/usr/share/inchiptz/
+cp telemetry_history.py ${BUILD_DIR}/usr/share/inchiptz/
 
 # 复制systemd服务文件
 echo "复制systemd服务文件..."
@@ -0,0 +1,173 @@
+"""事务级延迟与错误计数：按 (电机ID, 命令码) 统计，可在生产环境常开。
+
+每个 (电机ID, 命令) 记录三组延迟直方图，均从命令帧开始写出的时刻算起:
+    write       写出命令帧耗时 (TCP sendall / 串口 write+flush)
+    first_byte  到收到第一个响应字节
+    frame       到收到完整且匹配的响应帧
+
+以及每次尝试的失败原因计数:
+    timeout       截止时间内没有收到任何可用的帧
+    crc           收到的字节流出现CRC错误/帧错位 (FrameDecoder 发生重新同步)
+    id_mismatch   只收到其他电机ID的响应帧
+    cmd_mismatch  电机ID正确但命令回显不符
+    link_error    连接断开 (EOF / I/O错误)
+    interrupted   被更高优先级的帧中断 (读命令随后重新排队，其余命令以失败结束)
+    quarantined   电机处于隔离期，未发送
+    unavailable   连接不可用，未发送
+
+记录在 RS485Comm 持有的总线锁内进行 (同一总线的事务本来就是串行的)，热路径不再
+额外加锁、不保留新对象：键是整数 (motor_id << 8 | cmd)，计数与直方图都存放在
+array 中原地累加。只有首次出现新的 (电机, 命令) 以及导出快照时才取本模块的锁。
+"""
+from __future__ import annotations
+import threading
+from array import array
+from bisect import bisect_left
+from typing import Dict, Any
+
+# 直方图桶上界 (秒)，最后一个桶为 +inf
+LATENCY_BOUNDS = (0.0001, 0.0002, 0.0005, 0.001, 0.002, 0.005,
+                  0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0)
+
+FAIL_TIMEOUT = 0
+FAIL_CRC = 1
+FAIL_ID_MISMATCH = 2
+FAIL_CMD_MISMATCH = 3
+FAIL_LINK_ERROR = 4
+FAIL_INTERRUPTED = 5
+FAIL_QUARANTINED = 6
+FAIL_UNAVAILABLE = 7
+FAIL_REASONS = ('timeout', 'crc', 'id_mismatch', 'cmd_mismatch',
+                'link_error', 'interrupted', 'quarantined', 'unavailable')
+
+# CommandMetrics.counts 的下标
+N_TRANSACTIONS = 0       # 事务数 (含重试只算一次；被中断后重新排队的事务再计一次)
+N_ATTEMPTS = 1           # 实际发出的次数
+N_RETRIES = 2            # 重试次数
+N_SUCCESSES = 3
+N_FAILED = 4             # 最终失败的事务数
+COUNT_NAMES = ('transactions', 'attempts', 'retries', 'successes', 'failed')
+
+
+class LatencyHistogram:
+    """固定桶的延迟直方图"""
+
+    __slots__ = ('counts', 'sums')
+
+    def __init__(self):
+        self.counts = array('Q', bytes(8 * (len(LATENCY_BOUNDS) + 1)))
+        self.sums = array('d', (0.0, 0.0))       # 总和、最大值 (秒)
+
+    def add(self, seconds: float):
+        self.counts[bisect_left(LATENCY_BOUNDS, seconds)] += 1
+        sums = self.sums
+        sums[0] += seconds
+        if seconds > sums[1]:
+            sums[1] = seconds
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    @property
+    def total(self) -> float:
+        return self.sums[0]
+
+    @property
+    def max(self) -> float:
+        return self.sums[1]
+
+    def percentile(self, q: float) -> float:
+        """第 q 分位 (0~1) 所在桶的上界 (秒)；最后一个桶返回观测到的最大值"""
+        count = self.count
+        if not count:
+            return 0.0
+        rank = q * count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return LATENCY_BOUNDS[i] if i < len(LATENCY_BOUNDS) else self.max
+        return self.max
+
+    def snapshot(self) -> Dict[str, Any]:
+        """导出统计 (毫秒)；buckets 为 {上界毫秒: 次数}，只列出非零桶"""
+        buckets = {}
+        for i, n in enumerate(self.counts):
+            if n:
+                label = f'{LATENCY_BOUNDS[i] * 1000.0:g}' if i < len(LATENCY_BOUNDS) else 'inf'
+                buckets[label] = n
+        count = self.count
+        return {
+            'count': count,
+            'avg_ms': round(self.total / count * 1000.0, 3) if count else 0.0,
+            'p50_ms': round(self.percentile(0.5) * 1000.0, 3),
+            'p99_ms': round(self.percentile(0.99) * 1000.0, 3),
+            'max_ms': round(self.max * 1000.0, 3),
+            'buckets': buckets,
+        }
+
+
+class CommandMetrics:
+    """单个 (电机ID, 命令) 的计数与直方图"""
+
+    __slots__ = ('write', 'first_byte', 'frame', 'counts', 'reasons')
+
+    def __init__(self):
+        self.write = LatencyHistogram()
+        self.first_byte = LatencyHistogram()
+        self.frame = LatencyHistogram()
+        self.counts = array('Q', bytes(8 * len(COUNT_NAMES)))      # 下标 N_*
+        self.reasons = array('Q', bytes(8 * len(FAIL_REASONS)))    # 下标 FAIL_*
+
+    def snapshot(self) -> Dict[str, Any]:
+        result: Dict[str, Any] = dict(zip(COUNT_NAMES, self.counts))
+        result['errors'] = dict(zip(FAIL_REASONS, self.reasons))
+        result['write'] = self.write.snapshot()
+        result['first_byte'] = self.first_byte.snapshot()
+        result['frame'] = self.frame.snapshot()
+        return result
+
+
+class BusMetrics:
+    """一条总线上所有 (电机ID, 命令) 的统计"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[int, CommandMetrics] = {}
+
+    def entry(self, motor_id: int, cmd: int) -> CommandMetrics:
+        """取得 (电机ID, 命令) 的统计对象；已存在时不加锁"""
+        key = (motor_id & 0xFF) << 8 | cmd
+        m = self._entries.get(key)
+        if m is None:
+            with self._lock:
+                m = self._entries.get(key)
+                if m is None:
+                    m = self._entries[key] = CommandMetrics()
+        return m
+
+    def reset(self):
+        with self._lock:
+            self._entries = {}
+
+    def snapshot(self) -> Dict[str, Any]:
+        """导出统计: {'commands': {'id:0xCMD': {...}}, 'totals': {...}}，时间单位毫秒
+
+        计数在 RS485Comm 的总线锁内更新，快照不取总线锁 (不阻塞正在进行的事务)，
+        因此不同字段之间可能相差正在进行的一次事务。
+        """
+        with self._lock:
+            entries = sorted(self._entries.items())
+        commands = {}
+        counts = [0] * len(COUNT_NAMES)
+        reasons = [0] * len(FAIL_REASONS)
+        for key, m in entries:
+            commands[f'{key >> 8}:0x{key & 0xFF:02X}'] = m.snapshot()
+            for i, n in enumerate(m.counts):
+                counts[i] += n
+            for i, n in enumerate(m.reasons):
+                reasons[i] += n
+        totals: Dict[str, Any] = dict(zip(COUNT_NAMES, counts))
+        totals['errors'] = dict(zip(FAIL_REASONS, reasons))
+        return {'commands': commands, 'totals': totals}
@@ -0,0 +1,137 @@
+"""进程级总线注册表：同一端口/网关地址只打开一个连接，由所有控制器共享。
+
+PTZController、LiftMotorController 以及 GUI 通过 acquire_bus() 取得同一个
+BusScheduler (内含唯一的 RS485Comm 和 I/O 线程)，它们的帧在总线上不会交错，
+同时排队的状态轮询还会合并成一次扫描。按引用计数管理，最后一个使用者
+release_bus() 后才真正关闭连接。
+
+fire_broadcast() 在多条总线上同时发出同一条 0xCD 广播 (各总线的 I/O 线程并行
+发送)，急停整个机群的耗时约为一帧时间，而不是逐条总线累加。
+
+用法:
+    bus = acquire_bus('192.168.25.78:502')
+    ...
+    release_bus(bus)
+"""
+from __future__ import annotations
+import os
+import threading
+from typing import Dict, Any, List, Optional
+from rs485_comm import RS485Comm, CMD_CLOSE, CMD_STOP
+from bus_scheduler import BusScheduler
+
+
+class _Entry:
+    __slots__ = ('bus', 'baudrate', 'comm_kwargs', 'refs')
+
+    def __init__(self, bus: BusScheduler, baudrate: int, comm_kwargs: Dict[str, Any]):
+        self.bus = bus
+        self.baudrate = baudrate
+        self.comm_kwargs = comm_kwargs
+        self.refs = 0
+
+
+_lock = threading.Lock()
+_buses: Dict[str, _Entry] = {}
+
+
+def normalize_port(port: str) -> str:
+    """端口归一化作为注册表键
+
+    - TCP网关 'Host:502' -> 'tcp://host:502'
+    - Windows串口 'com9' -> 'COM9'
+    - POSIX串口解析符号链接 (/dev/serial/by-id/... -> /dev/ttyUSB0)
+    """
+    port = port.strip()
+    if ":" in port:
+        host, port_str = port.rsplit(":", 1)
+        return f'tcp://{host.strip().lower()}:{int(port_str)}'
+    if os.name == 'nt' or port.upper().startswith('COM'):
+        return port.upper()
+    return os.path.realpath(port)
+
+
+def acquire_bus(port: str, baudrate: int = 115200, **comm_kwargs) -> BusScheduler:
+    """取得端口对应的共享总线 (首次调用时建立连接)，引用计数加一
+
+    Args:
+        port: 串口号或 'host:port'
+        baudrate: 波特率；同一端口上的使用者必须一致 (TCP网关同样用它推导 RS485 帧间时序)
+        comm_kwargs: 首次创建时传给 RS485Comm 的其他参数 (timeout、max_retries、capture 等)；
+                     之后的调用方省略则沿用已打开的总线，给出时必须与首次创建时相同
+
+    Raises:
+        ValueError: 端口已按其他波特率或其他参数打开
+    """
+    key = normalize_port(port)
+    with _lock:
+        entry = _buses.get(key)
+        if entry is None:
+            bus = BusScheduler(RS485Comm(port=port, baudrate=baudrate, **comm_kwargs), name=f'rs485-bus {key}')
+            entry = _buses[key] = _Entry(bus, baudrate, comm_kwargs)
+        else:
+            if entry.baudrate != baudrate:
+                raise ValueError(f'{port} 已按 {entry.baudrate} 波特率打开，不能再以 {baudrate} 打开')
+            conflicts = sorted(name for name, value in comm_kwargs.items()
+                               if name not in entry.comm_kwargs or entry.comm_kwargs[name] != value)
+            if conflicts:
+                raise ValueError(f'{port} 已打开，参数 {", ".join(conflicts)} 与首次打开时不同')
+        entry.refs += 1
+        return entry.bus
+
+
+def release_bus(bus: BusScheduler):
+    """释放一次引用，最后一个使用者释放时关闭连接"""
+    with _lock:
+        for key, entry in _buses.items():
+            if entry.bus is bus:
+                entry.refs -= 1
+                if entry.refs > 0:
+                    return
+                del _buses[key]
+                break
+        else:
+            return
+    bus.close()
+
+
+def active_buses() -> Dict[str, Any]:
+    """当前打开的总线: {键: {'refs': 引用数, 'state': 连接状态}}"""
+    with _lock:
+        return {key: {'refs': entry.refs, 'state': entry.bus.state} for key, entry in _buses.items()}
+
+
+def fire_broadcast(cmd: int, buses: Optional[List[BusScheduler]] = None,
+                   timeout: Optional[float] = None) -> List[bool]:
+    """在多条总线上同时发出 0xCD 广播 (cmd 为 0x80 关闭或 0x81 停止)
+
+    Args:
+        cmd: 广播命令码
+        buses: 目标总线，默认为注册表中所有已打开的总线
+        timeout: 等待各总线发出的最长时间(秒)，None 表示一直等待
+
+    Returns:
+        与 buses 顺序对应的发送结果
+    """
+    if buses is None:
+        with _lock:
+            buses = [entry.bus for entry in _buses.values()]
+    # 先全部提交 (各总线的 I/O 线程立即并行发送)，再逐个收集结果
+    futures = [bus.submit_broadcast(cmd) for bus in buses]
+    results = []
+    for future in futures:
+        try:
+            results.append(bool(future.result(timeout)))
+        except Exception:
+            results.append(False)
+    return results
+
+
+def broadcast_stop_all(buses: Optional[List[BusScheduler]] = None) -> List[bool]:
+    """所有总线同时广播停止 (0xCD, 0x81)"""
+    return fire_broadcast(CMD_STOP, buses)
+
+
+def broadcast_shutdown_all(buses: Optional[List[BusScheduler]] = None) -> List[bool]:
+    """所有总线同时广播关闭 (0xCD, 0x80)"""
+    return fire_broadcast(CMD_CLOSE, buses)
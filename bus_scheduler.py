@@ -0,0 +1,480 @@
+"""总线调度器：按优先级排队 RS485 事务，由专用 I/O 线程独占通信对象。
+
+优先级 (数字越小越优先):
+    0 紧急  - 0xCD 广播 0x80/0x81，单电机 0x80/0x81
+    1 运动  - 0xA4 位置控制
+    2 轮询  - 0x94 状态读取及其他
+
+调用方提交请求得到 concurrent.futures.Future (结果为 TransactResult，带失败原因)。
+紧急请求到达时若 I/O 线程正在
+执行低优先级事务，会调用 RS485Comm.interrupt() 中断其等待；因此急停的延迟上限
+约为一帧时间，不受轮询重试/超时影响。被中断的请求中只有无副作用的读命令重新排队，
+运动等命令可能已经发出，以 'interrupted' 结果结束，不会在急停之后重放。
+
+同时排队的状态轮询 (可能来自不同控制器) 合并为一次 transact_many 扫描，
+在 TCP 网关上流水线发送。同一电机的并发读请求 (0x94) 单飞合并，共享同一次
+往返的结果；可选的 max_age 允许直接返回足够新的结果，总线负载只随不同查询数
+增长，与调用方数量无关。
+
+BusScheduler 提供与 RS485Comm 相同的同步方法 (read_status、set_target_angle、
+broadcast_stop 等)，控制器可以直接替换使用。多个控制器共享同一总线时通过
+bus_registry.acquire_bus() 获取。
+
+周期状态轮询由总线自带的 poller (poll_scheduler.PollScheduler) 按固定频率驱动，
+同一总线上的所有控制器共用一个轮询线程。
+"""
+from __future__ import annotations
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+from typing import Optional, Dict, Any, List, Tuple, Callable
+from bus_timing import BusTiming
+from poll_scheduler import PollScheduler
+from wire_capture import WireCapture
+from rs485_comm import (
+    RS485Comm, BusInterrupted, TransactResult,
+    CMD_READ_ANGLE, CMD_READ_STATUS_A4, CMD_CLOSE, CMD_STOP,
+    decode_angle, decode_status, encode_target_angle, decode_target_reply, decode_ack,
+)
+
+PRIORITY_EMERGENCY = 0
+PRIORITY_MOTION = 1
+PRIORITY_POLL = 2
+PRIORITY_NAMES = ('emergency', 'motion', 'poll')
+
+# 一次合并扫描最多包含的轮询请求数
+MAX_BATCH = 16
+
+# 无副作用、可合并的读命令：同一 (电机ID, 命令) 的并发请求共享一次往返
+COALESCE_CMDS = frozenset((CMD_READ_ANGLE,))
+
+# 请求类型
+KIND_TRANSACT = 0
+KIND_MANY = 1
+KIND_BROADCAST = 2
+
+
+def priority_for(cmd: int) -> int:
+    """按命令码确定优先级"""
+    if cmd in (CMD_STOP, CMD_CLOSE):
+        return PRIORITY_EMERGENCY
+    if cmd == CMD_READ_STATUS_A4:
+        return PRIORITY_MOTION
+    return PRIORITY_POLL
+
+
+class _Request:
+    __slots__ = ('priority', 'seq', 'kind', 'args', 'key', 'future', 'enqueued_at', 'dispatched')
+
+    def __init__(self, priority: int, seq: int, kind: int, args: tuple, key: Optional[Tuple[int, int]] = None):
+        self.priority = priority
+        self.seq = seq
+        self.kind = kind
+        self.args = args
+        self.key = key
+        self.future: Future = Future()
+        self.enqueued_at = time.monotonic()
+        self.dispatched = False
+
+    def __lt__(self, other: '_Request') -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class _ClassStats:
+    """单个优先级类别的排队统计"""
+
+    __slots__ = ('depth', 'max_depth', 'submitted', 'completed', 'interrupted',
+                 'coalesced', 'fresh_hits', 'wait_total', 'wait_max', 'wait_last')
+
+    def __init__(self):
+        self.depth = 0
+        self.max_depth = 0
+        self.submitted = 0
+        self.completed = 0
+        self.interrupted = 0
+        self.coalesced = 0
+        self.fresh_hits = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.wait_last = 0.0
+
+
+class BusScheduler:
+    """RS485 总线优先级调度器
+
+    Args:
+        comm: 通信对象，由调度器的 I/O 线程独占使用
+        name: 线程名称 (便于调试)
+        max_age: 读命令默认可接受的缓存结果年龄(秒)，0 表示只合并同时在途的请求
+    """
+
+    def __init__(self, comm: RS485Comm, name: str = 'rs485-bus', max_age: float = 0.0):
+        self._comm = comm
+        self._max_age = max_age
+        self._cond = threading.Condition()
+        self._queue: List[_Request] = []
+        # 单飞合并: 在途的读请求 (排队或执行中) 与最近一次成功结果
+        self._inflight: Dict[Tuple[int, int], Future] = {}
+        self._fresh: Dict[Tuple[int, int], Tuple[float, TransactResult]] = {}
+        self._seq = itertools.count()
+        self._stats = [_ClassStats() for _ in PRIORITY_NAMES]
+        self._current: Optional[_Request] = None
+        self._closed = False
+        self._name = name
+        self._poller: Optional[PollScheduler] = None
+        self._worker = threading.Thread(target=self._run, name=name, daemon=True)
+        self._worker.start()
+
+    # ---- 提交请求 ----
+
+    def _coalesce_key(self, motor_id: int, cmd: int, payload: bytes, timeout: Optional[float]) -> Optional[Tuple[int, int]]:
+        if cmd in COALESCE_CMDS and not payload and timeout is None:
+            return (motor_id, cmd)
+        return None
+
+    def _invalidate(self, motor_id: Optional[int]):
+        """运动/停止命令后丢弃相关电机的缓存结果 (motor_id 为 None 表示全部)，调用时持有 _cond"""
+        if motor_id is None:
+            self._fresh.clear()
+        elif self._fresh:
+            for key in [key for key in self._fresh if key[0] == motor_id]:
+                del self._fresh[key]
+
+    def _enqueue(self, items: List[tuple]) -> List[Future]:
+        """在一次加锁内排入多个请求 (保证同时排队、可合并扫描)
+
+        items 为 [(priority, kind, args, key, max_age), ...]；key 不为 None 的读请求
+        优先复用在途请求或足够新的缓存结果。
+        """
+        futures: List[Future] = []
+        preempt = False
+        with self._cond:
+            now = time.monotonic()
+            for priority, kind, args, key, max_age in items:
+                st = self._stats[priority]
+                if key is not None:
+                    fresh = self._fresh.get(key)
+                    if fresh is not None and max_age > 0 and now - fresh[0] <= max_age:
+                        st.fresh_hits += 1
+                        future: Future = Future()
+                        future.set_result(fresh[1])
+                        futures.append(future)
+                        continue
+                    future = self._inflight.get(key)
+                    if future is not None:
+                        st.coalesced += 1
+                        futures.append(future)
+                        continue
+                req = _Request(priority, next(self._seq), kind, args, key)
+                futures.append(req.future)
+                if self._closed:
+                    req.future.set_result(self._failed_result(req))
+                    continue
+                if key is not None:
+                    self._inflight[key] = req.future
+                elif kind == KIND_BROADCAST:
+                    self._invalidate(None)
+                elif kind == KIND_TRANSACT:
+                    self._invalidate(args[0])
+                heapq.heappush(self._queue, req)
+                st.submitted += 1
+                st.depth += 1
+                st.max_depth = max(st.max_depth, st.depth)
+                if self._current is not None and self._current.priority > priority:
+                    preempt = True
+            # 正在执行的事务优先级更低：中断其等待，让出总线。在 _cond 内中断，I/O 线程
+            # 换到下一个请求时 (同样在 _cond 内) 的 clear_interrupt() 会清掉迟到的中断，
+            # 不会落在新取出的紧急请求上
+            if preempt:
+                self._comm.interrupt()
+            self._cond.notify()
+        return futures
+
+    def submit(self, motor_id: int, cmd: int, payload: bytes = b'',
+               priority: Optional[int] = None, timeout: Optional[float] = None,
+               max_age: Optional[float] = None) -> Future:
+        """提交单个事务，Future 结果为 TransactResult
+
+        读命令 (0x94) 与同一电机在途的请求合并；max_age>0 时可直接返回该时长内的结果。
+        """
+        if priority is None:
+            priority = priority_for(cmd)
+        if max_age is None:
+            max_age = self._max_age
+        key = self._coalesce_key(motor_id, cmd, payload, timeout)
+        return self._enqueue([(priority, KIND_TRANSACT, (motor_id, cmd, payload, timeout), key, max_age)])[0]
+
+    def submit_reads(self, motor_ids: List[int], cmd: int = CMD_READ_ANGLE,
+                     max_age: Optional[float] = None) -> List[Future]:
+        """一次提交多个电机的读命令 (各自可合并，并在同一次扫描中发出)"""
+        if max_age is None:
+            max_age = self._max_age
+        priority = priority_for(cmd)
+        return self._enqueue([(priority, KIND_TRANSACT, (motor_id, cmd, b'', None),
+                               self._coalesce_key(motor_id, cmd, b'', None), max_age)
+                              for motor_id in motor_ids])
+
+    def submit_many(self, requests: List[Tuple[int, int, bytes]],
+                    priority: int = PRIORITY_POLL, timeout: Optional[float] = None) -> Future:
+        """提交一组事务 (RS485Comm.transact_many_results)，Future 结果为 TransactResult 列表"""
+        return self._enqueue([(priority, KIND_MANY, (list(requests), timeout), None, 0.0)])[0]
+
+    def submit_broadcast(self, cmd: int) -> Future:
+        """提交 0xCD 广播 (紧急优先级)，Future 结果为 bool"""
+        return self._enqueue([(PRIORITY_EMERGENCY, KIND_BROADCAST, (cmd,), None, 0.0)])[0]
+
+    # ---- I/O 线程 ----
+
+    @staticmethod
+    def _batchable(req: _Request) -> bool:
+        """可合并进一次扫描的轮询请求 (使用自适应超时)"""
+        return req.priority == PRIORITY_POLL and req.kind != KIND_BROADCAST and req.args[-1] is None
+
+    def _take_batch(self, req: _Request) -> List[_Request]:
+        """取出队首同样可合并的轮询请求，与 req 组成一批 (调用时持有 _cond)"""
+        batch = [req]
+        if not self._batchable(req):
+            return batch
+        while len(batch) < MAX_BATCH and self._queue and self._batchable(self._queue[0]):
+            batch.append(heapq.heappop(self._queue))
+        return batch
+
+    @staticmethod
+    def _replayable(req: _Request) -> bool:
+        """被中断后可以重新排队的请求：只含无副作用的读命令"""
+        if req.kind == KIND_TRANSACT:
+            return req.args[1] in COALESCE_CMDS
+        if req.kind == KIND_MANY:
+            return all(cmd in COALESCE_CMDS for _, cmd, _ in req.args[0])
+        return False
+
+    @staticmethod
+    def _failed_result(req: _Request, status: str = 'unavailable'):
+        """未能执行的请求 (调度器已关闭、执行异常或被中断) 的结果"""
+        if req.kind == KIND_BROADCAST:
+            return False
+        if req.kind == KIND_MANY:
+            return [TransactResult(status) for _ in req.args[0]]
+        return TransactResult(status)
+
+    def _execute(self, req: _Request):
+        comm = self._comm
+        if req.kind == KIND_TRANSACT:
+            motor_id, cmd, payload, timeout = req.args
+            return comm.transact_result(motor_id, cmd, payload, timeout)
+        if req.kind == KIND_MANY:
+            requests, timeout = req.args
+            return comm.transact_many_results(requests, timeout)
+        cmd, = req.args
+        if cmd == CMD_STOP:
+            return comm.broadcast_stop()
+        return comm.broadcast_shutdown()
+
+    def _execute_batch(self, batch: List[_Request]) -> list:
+        """多个轮询请求合并为一次 transact_many，再按请求拆分结果"""
+        requests: List[Tuple[int, int, bytes]] = []
+        for req in batch:
+            if req.kind == KIND_TRANSACT:
+                requests.append(req.args[:3])
+            else:
+                requests.extend(req.args[0])
+        datas = self._comm.transact_many_results(requests)
+        results = []
+        pos = 0
+        for req in batch:
+            if req.kind == KIND_TRANSACT:
+                results.append(datas[pos])
+                pos += 1
+            else:
+                count = len(req.args[0])
+                results.append(datas[pos:pos + count])
+                pos += count
+        return results
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                batch = self._take_batch(heapq.heappop(self._queue))
+                now = time.monotonic()
+                for req in batch:
+                    st = self._stats[req.priority]
+                    st.depth -= 1
+                    if not req.dispatched:
+                        req.dispatched = True
+                        wait = now - req.enqueued_at
+                        st.wait_total += wait
+                        st.wait_last = wait
+                        st.wait_max = max(st.wait_max, wait)
+                self._current = batch[0]
+                # 只有比当前请求更高优先级的新请求才应中断它
+                self._comm.clear_interrupt()
+            try:
+                if len(batch) == 1:
+                    results = [self._execute(batch[0])]
+                else:
+                    results = self._execute_batch(batch)
+            except BusInterrupted:
+                # 读请求重新排队；其余请求可能已经发出，在急停之后重放会抵消急停
+                interrupted = []
+                with self._cond:
+                    self._current = None
+                    for req in batch:
+                        st = self._stats[req.priority]
+                        st.interrupted += 1
+                        if self._replayable(req) and not self._closed:
+                            st.depth += 1
+                            heapq.heappush(self._queue, req)
+                        else:
+                            st.completed += 1
+                            if req.key is not None:
+                                self._inflight.pop(req.key, None)
+                            interrupted.append(req)
+                for req in interrupted:
+                    req.future.set_result(self._failed_result(req, 'interrupted'))
+                continue
+            except Exception:
+                results = [self._failed_result(req) for req in batch]
+            with self._cond:
+                self._current = None
+                now = time.monotonic()
+                for req, result in zip(batch, results):
+                    self._stats[req.priority].completed += 1
+                    if req.key is not None:
+                        self._inflight.pop(req.key, None)
+                        if result.ok:
+                            self._fresh[req.key] = (now, result)
+            for req, result in zip(batch, results):
+                req.future.set_result(result)
+
+    # ---- 与 RS485Comm 相同的同步接口 ----
+
+    @property
+    def available(self) -> bool:
+        return self._comm.available
+
+    @property
+    def state(self) -> str:
+        return self._comm.state
+
+    def add_state_listener(self, callback: Callable[[str, str], None]):
+        self._comm.add_state_listener(callback)
+
+    def remove_state_listener(self, callback: Callable[[str, str], None]):
+        self._comm.remove_state_listener(callback)
+
+    @property
+    def timing(self) -> BusTiming:
+        return self._comm.timing
+
+    @property
+    def busy_until(self) -> float:
+        return self._comm.busy_until
+
+    def rtt_stats(self) -> Dict[str, Any]:
+        return self._comm.rtt_stats()
+
+    def metrics_snapshot(self) -> Dict[str, Any]:
+        return self._comm.metrics_snapshot()
+
+    def set_capture(self, capture: Optional[WireCapture]) -> Optional[WireCapture]:
+        return self._comm.set_capture(capture)
+
+    @property
+    def poller(self) -> PollScheduler:
+        """本总线的固定频率轮询调度器 (首次访问时创建，各控制器共用)"""
+        with self._cond:
+            if self._poller is None:
+                self._poller = PollScheduler(name=f'{self._name} poll')
+            return self._poller
+
+    def transact(self, motor_id: int, cmd: int, payload: bytes = b'', timeout: float = None,
+                 max_age: Optional[float] = None) -> Optional[bytes]:
+        return self.transact_result(motor_id, cmd, payload, timeout, max_age).data
+
+    def transact_result(self, motor_id: int, cmd: int, payload: bytes = b'', timeout: float = None,
+                        max_age: Optional[float] = None) -> TransactResult:
+        return self.submit(motor_id, cmd, payload, timeout=timeout, max_age=max_age).result()
+
+    def transact_many(self, requests: List[Tuple[int, int, bytes]], timeout: float = None) -> List[Optional[bytes]]:
+        return [result.data for result in self.transact_many_results(requests, timeout)]
+
+    def transact_many_results(self, requests: List[Tuple[int, int, bytes]],
+                              timeout: float = None) -> List[TransactResult]:
+        priority = min((priority_for(cmd) for _, cmd, _ in requests), default=PRIORITY_POLL)
+        return self.submit_many(requests, priority, timeout).result()
+
+    def read_status_many(self, motor_ids: List[int], max_age: Optional[float] = None) -> Dict[int, Optional[Dict[str, Any]]]:
+        futures = self.submit_reads(motor_ids, CMD_READ_ANGLE, max_age)
+        return {motor_id: decode_status(future.result().data) for motor_id, future in zip(motor_ids, futures)}
+
+    def read_angle(self, motor_id: int, max_age: Optional[float] = None) -> Optional[float]:
+        return decode_angle(self.transact(motor_id, CMD_READ_ANGLE, max_age=max_age))
+
+    def read_status(self, motor_id: int, max_age: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        return decode_status(self.transact(motor_id, CMD_READ_ANGLE, max_age=max_age))
+
+    def set_target_angle(self, motor_id: int, target_deg: float, speed_rpm: int = 100) -> Optional[Dict[str, Any]]:
+        payload, target_deg, angle_control = encode_target_angle(target_deg, speed_rpm)
+        data = self.transact(motor_id, CMD_READ_STATUS_A4, payload)
+        return decode_target_reply(data, target_deg, speed_rpm, angle_control)
+
+    def close_motor(self, motor_id: int) -> Optional[Dict[str, Any]]:
+        return decode_ack(self.transact(motor_id, CMD_CLOSE), CMD_CLOSE)
+
+    def stop_motor(self, motor_id: int) -> Optional[Dict[str, Any]]:
+        return decode_ack(self.transact(motor_id, CMD_STOP), CMD_STOP)
+
+    def broadcast_shutdown(self) -> bool:
+        return self.submit_broadcast(CMD_CLOSE).result()
+
+    def broadcast_stop(self) -> bool:
+        return self.submit_broadcast(CMD_STOP).result()
+
+    # ---- 统计与关闭 ----
+
+    def stats(self) -> Dict[str, Any]:
+        """各优先级类别的队列深度与等待时间 (毫秒)"""
+        with self._cond:
+            result = {}
+            for name, st in zip(PRIORITY_NAMES, self._stats):
+                dispatched = st.submitted - st.depth
+                result[name] = {
+                    'depth': st.depth,
+                    'max_depth': st.max_depth,
+                    'submitted': st.submitted,
+                    'completed': st.completed,
+                    'interrupted': st.interrupted,
+                    'coalesced': st.coalesced,
+                    'fresh_hits': st.fresh_hits,
+                    'wait_avg_ms': round(st.wait_total / dispatched * 1000.0, 3) if dispatched > 0 else 0.0,
+                    'wait_max_ms': round(st.wait_max * 1000.0, 3),
+                    'wait_last_ms': round(st.wait_last * 1000.0, 3),
+                }
+            return result
+
+    def close(self, close_comm: bool = True):
+        """停止轮询与 I/O 线程；未执行的请求以失败结果结束"""
+        with self._cond:
+            poller, self._poller = self._poller, None
+        if poller is not None:
+            poller.close()
+        with self._cond:
+            self._closed = True
+            pending, self._queue = self._queue, []
+            for req in pending:
+                self._stats[req.priority].depth -= 1
+            self._inflight.clear()
+            self._cond.notify_all()
+        self._comm.interrupt()
+        for req in pending:
+            req.future.set_result(self._failed_result(req))
+        if self._worker is not threading.current_thread():
+            self._worker.join(timeout=2.0)
+        if close_comm:
+            self._comm.close()
@@ -0,0 +1,82 @@
+"""RS485 总线时序模型：由波特率推导帧时间与帧间静默间隔，取代固定的睡眠时间。
+
+以 115200 波特率、每字符10位 (1起始+8数据+1停止) 为例:
+    字符时间  = 10 / 115200        ≈ 0.087 ms
+    帧时间    = 13 字符             ≈ 1.13 ms
+    静默间隔  = 3.5 字符            ≈ 0.30 ms
+    设备转向  = 电机收到命令到开始应答的处理时间 (turnaround，可配置)
+
+通信层只在帧与帧之间强制所需的静默间隔，并且从总线上最后一个字节的时刻算起，
+而不是从调用方返回的时刻算起：应答收完后立即可以发下一帧 (只需等静默间隔)。
+"""
+from __future__ import annotations
+import time
+from typing import Optional
+
+FRAME_SIZE = 13
+SILENT_CHARS = 3.5
+
+
+class BusTiming:
+    """单条总线的时序参数
+
+    Args:
+        baudrate: 波特率 (TCP网关模式下为网关后面 RS485 线路的波特率)
+        bits_per_char: 每字符位数 (8N1 为10)
+        turnaround: 设备转向时间(秒)，即电机收到命令到开始应答的间隔
+        silent_interval: 帧间静默间隔(秒)，None 则取 3.5 字符时间
+                         (按 Modbus RTU 规范在 19200 以上固定 1.75ms 时传 0.00175)
+        broadcast_settle: 广播后电机执行指令所需的额外静默时间(秒)
+    """
+
+    def __init__(self, baudrate: int = 115200, bits_per_char: int = 10, turnaround: float = 0.0005,
+                 silent_interval: Optional[float] = None, broadcast_settle: float = 0.001):
+        if baudrate <= 0:
+            raise ValueError('baudrate must be positive')
+        self.baudrate = baudrate
+        self.bits_per_char = bits_per_char
+        self.char_time = bits_per_char / float(baudrate)
+        self.frame_time = FRAME_SIZE * self.char_time
+        if silent_interval is None:
+            silent_interval = SILENT_CHARS * self.char_time
+        self.silent_interval = silent_interval
+        self.turnaround = turnaround
+        self.broadcast_settle = broadcast_settle
+
+    def wire_time(self, nbytes: int) -> float:
+        """nbytes 字节在线路上的传输时间(秒)"""
+        return nbytes * self.char_time
+
+    @property
+    def reply_time(self) -> float:
+        """一次请求-应答在总线上的最短时间: 命令帧 + 转向 + 应答帧"""
+        return 2.0 * self.frame_time + self.turnaround
+
+    @property
+    def broadcast_gap(self) -> float:
+        """广播帧发完后到下一帧之前需要保持的静默时间"""
+        return self.silent_interval + self.turnaround + self.broadcast_settle
+
+    @property
+    def command_gap(self) -> float:
+        """连续两条命令之间的最小间隔 (应答收完后的静默间隔)"""
+        return self.silent_interval
+
+    def snapshot(self) -> dict:
+        """时序参数 (毫秒)"""
+        return {
+            'baudrate': self.baudrate,
+            'char_time_ms': round(self.char_time * 1000.0, 4),
+            'frame_time_ms': round(self.frame_time * 1000.0, 4),
+            'silent_interval_ms': round(self.silent_interval * 1000.0, 4),
+            'turnaround_ms': round(self.turnaround * 1000.0, 4),
+            'reply_time_ms': round(self.reply_time * 1000.0, 4),
+            'broadcast_gap_ms': round(self.broadcast_gap * 1000.0, 4),
+        }
+
+
+def sleep_until(deadline: float):
+    """睡眠到 monotonic 时刻 deadline (已过则立即返回)"""
+    remaining = deadline - time.monotonic()
+    if remaining > 0:
+        time.sleep(remaining)
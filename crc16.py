@@ -0,0 +1,49 @@
+"""Modbus CRC16 查表实现 (多项式 0xA001, 初值 0xFFFF, 低字节在前)。
+
+rs485_comm、proto_v43 及 test/ 下脚本共用本模块，不再各自逐位计算。
+
+整帧校验利用 CRC 的性质: 对 "数据 + CRC(低字节在前)" 整体再算一次 CRC，
+结果为 0 即说明校验通过，无需切片取出 body 和 CRC 字段再比较。
+"""
+from __future__ import annotations
+from typing import Tuple
+
+CRC_POLY = 0xA001
+CRC_INIT = 0xFFFF
+
+
+def _make_table() -> Tuple[int, ...]:
+    """预计算 256 项查找表"""
+    table = []
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            if crc & 0x0001:
+                crc = (crc >> 1) ^ CRC_POLY
+            else:
+                crc >>= 1
+        table.append(crc)
+    return tuple(table)
+
+
+CRC_TABLE = _make_table()
+
+
+def modbus_crc(data: bytes) -> int:
+    """Modbus CRC16 计算 (查表，每字节一次查表+移位)"""
+    crc = CRC_INIT
+    table = CRC_TABLE
+    for b in data:
+        crc = (crc >> 8) ^ table[(crc ^ b) & 0xFF]
+    return crc
+
+
+def append_crc(body: bytes) -> bytes:
+    """在 body 后追加 CRC (低字节在前)，返回完整帧"""
+    crc = modbus_crc(body)
+    return bytes(body) + bytes((crc & 0xFF, crc >> 8))
+
+
+def check_crc(frame: bytes) -> bool:
+    """整帧 CRC 校验: 含 CRC 的完整帧再算一次 CRC，结果为 0 即合法"""
+    return len(frame) > 2 and modbus_crc(frame) == 0
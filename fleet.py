@@ -0,0 +1,437 @@
+"""多网关机群控制器：一个进程管理多台云台，每台云台在各自的网关 (或串口) 后面。
+
+每条总线 (同一网关地址) 通过 acquire_bus() 取得一个 BusScheduler，拥有自己的 I/O
+线程；每条总线的状态扫描注册为该总线 poller (poll_scheduler.PollScheduler) 上的一个
+任务，与同一总线上的其他控制器共用一个轮询线程，按绝对截止时间驱动并统计滞后、抖动
+与超时。各总线的扫描并行进行，一轮状态扫描的耗时等于最慢的那个网关，而不是所有网关
+之和。线程数 = 总线数 x 2，每台云台只缓存一份最新状态，几十台云台时线程和内存都有上界。
+
+sweep() 与后台扫描共用同一轮读取：某条总线的扫描正在进行时直接等待它的结果，
+不会在同一总线上重复提交。
+
+云台按名称 (设备ID) 路由；同一网关后面可以挂多台云台 (电机地址不能重复)。
+
+配置文件 (JSON):
+    {
+        "interval_ms": 500,
+        "heads": [
+            {"name": "gate-01", "port": "192.168.10.11:502", "yaw_id": 1, "pitch_id": 2},
+            {"name": "gate-02", "port": "192.168.10.12:502", "interval_ms": 200}
+        ]
+    }
+
+用法:
+    fleet = FleetController.from_config('fleet.json')
+    fleet.start_monitoring()
+    fleet.set_angles('gate-01', 30.0, 10.0)
+    status = fleet.get_status('gate-02')
+    fleet.stop_all()
+    fleet.close()
+"""
+from __future__ import annotations
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import Future
+from typing import Optional, Dict, Any, List, Tuple
+
+from bus_registry import acquire_bus, release_bus, normalize_port, fire_broadcast
+from bus_scheduler import BusScheduler
+from poll_scheduler import PollJob
+from rs485_comm import (CMD_READ_ANGLE, CMD_READ_STATUS_A4, CMD_CLOSE, CMD_STOP, TransactResult,
+                        decode_status, encode_target_angle)
+from wire_capture import WireCapture, DEFAULT_CAPACITY
+
+
+class HeadConfig:
+    """一台云台的配置
+
+    Args:
+        name: 云台名称 (路由用的设备ID)
+        port: 串口号或网关地址 'host:port'
+        yaw_id: YAW电机地址
+        pitch_id: PITCH电机地址
+        interval_ms: 该云台所在总线的轮询间隔，None 则使用机群默认值
+    """
+    __slots__ = ('name', 'port', 'yaw_id', 'pitch_id', 'interval_ms')
+
+    def __init__(self, name: str, port: str, yaw_id: int = 1, pitch_id: int = 2,
+                 interval_ms: Optional[int] = None):
+        self.name = name
+        self.port = port
+        self.yaw_id = yaw_id
+        self.pitch_id = pitch_id
+        self.interval_ms = interval_ms
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'HeadConfig':
+        return cls(name=str(data['name']), port=str(data['port']),
+                   yaw_id=int(data.get('yaw_id', 1)), pitch_id=int(data.get('pitch_id', 2)),
+                   interval_ms=data.get('interval_ms'))
+
+
+class _Head:
+    __slots__ = ('config', 'group', 'yaw_status', 'pitch_status', 'updated')
+
+    def __init__(self, config: HeadConfig, group: '_BusGroup'):
+        self.config = config
+        self.group = group
+        self.yaw_status: Optional[Dict[str, Any]] = None
+        self.pitch_status: Optional[Dict[str, Any]] = None
+        self.updated = 0.0
+
+
+class _BusGroup:
+    """一条总线及挂在上面的云台，有自己的轮询周期"""
+    __slots__ = ('key', 'bus', 'heads', 'motor_ids', 'interval', 'job', 'inflight',
+                 'sweeps', 'failures', 'last_sweep', 'max_sweep')
+
+    def __init__(self, key: str, bus: BusScheduler, interval: float):
+        self.key = key
+        self.bus = bus
+        self.heads: List[_Head] = []
+        self.motor_ids: List[int] = []
+        self.interval = interval
+        self.job: Optional[PollJob] = None          # 总线 poller 上的轮询任务
+        self.inflight: Optional[Future] = None      # 正在进行的扫描，结果为 {电机地址: 状态}
+        self.sweeps = 0
+        self.failures = 0                # 扫描中读取失败的电机数
+        self.last_sweep = 0.0
+        self.max_sweep = 0.0
+
+
+class FleetController:
+    """机群控制器：按名称路由到各云台，所有网关并行轮询"""
+
+    def __init__(self, heads: List[HeadConfig], baudrate: int = 115200, interval_ms: int = 500):
+        """
+        初始化机群控制器 (为每个不同的端口取得一条共享总线)
+
+        Args:
+            heads: 云台配置列表 (HeadConfig 或等价的字典)
+            baudrate: 波特率
+            interval_ms: 默认轮询间隔（毫秒）
+
+        Raises:
+            ValueError: 云台名称重复，或同一总线上电机地址重复
+        """
+        self._lock = threading.Lock()
+        self._heads: Dict[str, _Head] = {}
+        self._groups: Dict[str, _BusGroup] = {}
+        self._captures: Dict[str, WireCapture] = {}
+        self._monitoring = False
+        self._last_sweep = 0.0
+        try:
+            for config in heads:
+                if isinstance(config, dict):
+                    config = HeadConfig.from_dict(config)
+                self._add_head(config, baudrate, interval_ms)
+        except Exception:
+            self.close()
+            raise
+
+    @classmethod
+    def from_config(cls, path: str, baudrate: int = 115200) -> 'FleetController':
+        """从 JSON 配置文件创建机群控制器"""
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(heads=data['heads'], baudrate=int(data.get('baudrate', baudrate)),
+                   interval_ms=int(data.get('interval_ms', 500)))
+
+    def _add_head(self, config: HeadConfig, baudrate: int, interval_ms: int):
+        if config.name in self._heads:
+            raise ValueError(f'云台名称重复: {config.name}')
+        interval = (config.interval_ms or interval_ms) / 1000.0
+        key = normalize_port(config.port)
+        group = self._groups.get(key)
+        if group is None:
+            group = self._groups[key] = _BusGroup(key, acquire_bus(config.port, baudrate), interval)
+        for motor_id in (config.yaw_id, config.pitch_id):
+            if motor_id in group.motor_ids:
+                raise ValueError(f'{config.port} 上电机地址 {motor_id} 重复 ({config.name})')
+            group.motor_ids.append(motor_id)
+        group.interval = min(group.interval, interval)
+        head = _Head(config, group)
+        group.heads.append(head)
+        self._heads[config.name] = head
+
+    # ---- 路由 ----
+
+    def heads(self) -> List[str]:
+        """所有云台名称 (按配置顺序)"""
+        return list(self._heads)
+
+    def _head(self, name: str) -> _Head:
+        head = self._heads.get(name)
+        if head is None:
+            raise KeyError(name)
+        return head
+
+    def bus_for(self, name: str) -> BusScheduler:
+        """云台所在的总线"""
+        return self._head(name).group.bus
+
+    # ---- 轮询 ----
+
+    def start_monitoring(self):
+        """启动机群轮询 (每条总线的扫描注册到该总线的 poller，按各自的间隔并行进行)"""
+        if self._monitoring:
+            return
+        self._monitoring = True
+        for group in self._groups.values():
+            group.job = group.bus.poller.add(lambda group=group: self._poll_group(group),
+                                             group.interval, name=f'fleet {group.key}')
+
+    def stop_monitoring(self):
+        """停止机群轮询（等待正在进行的扫描结束）"""
+        if not self._monitoring:
+            return
+        self._monitoring = False
+        for group in self._groups.values():
+            job, group.job = group.job, None
+            if job is not None:
+                job.cancel()
+
+    def get_poll_stats(self) -> Optional[Dict[str, Any]]:
+        """各总线扫描任务的轮询统计 {总线: PollJob.stats()}，未监控时返回None"""
+        if not self._monitoring:
+            return None
+        return {key: group.job.stats() for key, group in self._groups.items() if group.job is not None}
+
+    def _poll_group(self, group: _BusGroup):
+        """一个轮询周期（在总线的轮询线程中运行）：扫描一轮并等待结果写入缓存"""
+        self._begin_sweep(group).result()
+
+    def _begin_sweep(self, group: _BusGroup) -> Future:
+        """
+        在一条总线上提交所有电机的状态读取，全部完成后更新缓存
+
+        该总线已有扫描在进行时不重复提交，返回正在进行的那一轮
+
+        Returns:
+            Future，结果为 {电机地址: 状态}
+        """
+        with self._lock:
+            if group.inflight is not None:
+                return group.inflight
+            sweep = group.inflight = Future()
+        started = time.monotonic()
+        try:
+            futures = group.bus.submit_reads(group.motor_ids, CMD_READ_ANGLE)
+        except Exception as e:
+            with self._lock:
+                group.inflight = None
+            sweep.set_exception(e)
+            return sweep
+        remaining = [len(futures)]
+
+        def done(_future):
+            with self._lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+                statuses = self._finish_sweep(group, futures, started)
+            sweep.set_result(statuses)
+
+        for future in futures:
+            future.add_done_callback(done)
+        return sweep
+
+    def _finish_sweep(self, group: _BusGroup, futures: List[Future], started: float) -> Dict[int, Any]:
+        """写入一条总线的扫描结果 (调用时持有 _lock)"""
+        now = time.monotonic()
+        statuses = {motor_id: decode_status(future.result().data)
+                    for motor_id, future in zip(group.motor_ids, futures)}
+        for head in group.heads:
+            head.yaw_status = statuses[head.config.yaw_id]
+            head.pitch_status = statuses[head.config.pitch_id]
+            head.updated = now
+        elapsed = now - started
+        group.inflight = None
+        group.sweeps += 1
+        group.failures += sum(1 for status in statuses.values() if status is None)
+        group.last_sweep = elapsed
+        group.max_sweep = max(group.max_sweep, elapsed)
+        return statuses
+
+    def sweep(self, timeout: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        立即在所有总线上并行读取一轮状态并等待完成（某条总线的扫描正在进行时等待该轮结果）
+
+        Args:
+            timeout: 最长等待时间（秒），None 表示一直等待
+
+        Returns:
+            {云台名称: 状态} (格式同 get_status)
+        """
+        started = time.monotonic()
+        pending = [(group, self._begin_sweep(group)) for group in self._groups.values()]
+        deadline = None if timeout is None else started + timeout
+        results: Dict[str, Dict[str, Any]] = {}
+        for group, sweep in pending:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                statuses = sweep.result(remaining)
+            except Exception:
+                statuses = dict.fromkeys(group.motor_ids)
+            for head in group.heads:
+                results[head.config.name] = self._format(head, statuses[head.config.yaw_id],
+                                                         statuses[head.config.pitch_id], time.monotonic())
+        self._last_sweep = time.monotonic() - started
+        return results
+
+    # ---- 状态 ----
+
+    def _format(self, head: _Head, yaw_status, pitch_status, updated: float) -> Dict[str, Any]:
+        return {
+            'name': head.config.name,
+            'bus': head.group.key,
+            'connection_state': head.group.bus.state,
+            'yaw': yaw_status.copy() if yaw_status else None,
+            'pitch': pitch_status.copy() if pitch_status else None,
+            'age_ms': round((time.monotonic() - updated) * 1000.0, 1) if updated else None,
+        }
+
+    def get_status(self, name: str) -> Dict[str, Any]:
+        """获取云台最新状态（缓存，由轮询线程更新）
+
+        Raises:
+            KeyError: 没有该名称的云台
+        """
+        head = self._head(name)
+        with self._lock:
+            return self._format(head, head.yaw_status, head.pitch_status, head.updated)
+
+    def get_all_status(self) -> Dict[str, Dict[str, Any]]:
+        """获取所有云台的最新状态（缓存）"""
+        with self._lock:
+            return {name: self._format(head, head.yaw_status, head.pitch_status, head.updated)
+                    for name, head in self._heads.items()}
+
+    def read_status(self, name: str, max_age: float = 0.0) -> Dict[str, Any]:
+        """实时读取云台两轴状态 (与轮询中的读取合并)"""
+        head = self._head(name)
+        statuses = head.group.bus.read_status_many([head.config.yaw_id, head.config.pitch_id], max_age)
+        return self._format(head, statuses[head.config.yaw_id], statuses[head.config.pitch_id],
+                            time.monotonic())
+
+    # ---- 控制 ----
+
+    def set_angles(self, name: str, yaw_deg: float, pitch_deg: float, speed_rpm: int = 100) -> bool:
+        """
+        设置云台YAW和PITCH目标角度
+
+        Args:
+            name: 云台名称
+            yaw_deg: YAW目标角度（度）
+            pitch_deg: PITCH目标角度（度）
+            speed_rpm: 旋转速度（RPM）
+
+        Returns:
+            两个轴都成功返回True
+
+        Raises:
+            KeyError: 没有该名称的云台
+        """
+        return all(result.ok for result in self.set_angles_result(name, yaw_deg, pitch_deg, speed_rpm))
+
+    def set_angles_result(self, name: str, yaw_deg: float, pitch_deg: float,
+                          speed_rpm: int = 100) -> Tuple[TransactResult, TransactResult]:
+        """
+        同 set_angles，返回 (YAW, PITCH) 两个轴带失败原因的事务结果
+
+        Raises:
+            KeyError: 没有该名称的云台
+        """
+        head = self._head(name)
+        bus = head.group.bus
+        # 两条指令一起提交，在总线上背靠背发出；应答按命令回显匹配，ok 即电机已接受0xA4指令
+        futures = [bus.submit(motor_id, CMD_READ_STATUS_A4, encode_target_angle(target_deg, speed_rpm)[0])
+                   for motor_id, target_deg in ((head.config.yaw_id, yaw_deg), (head.config.pitch_id, pitch_deg))]
+        return futures[0].result(), futures[1].result()
+
+    def _broadcast(self, cmd: int, names: Optional[List[str]] = None) -> Dict[str, bool]:
+        if names is None:
+            groups = list(self._groups.values())
+        else:
+            groups = list({id(g): g for g in (self._head(name).group for name in names)}.values())
+        results = fire_broadcast(cmd, [group.bus for group in groups])
+        return {group.key: ok for group, ok in zip(groups, results)}
+
+    def stop_all(self, names: Optional[List[str]] = None) -> Dict[str, bool]:
+        """
+        所有总线同时广播停止 (0xCD, 0x81)
+
+        Args:
+            names: 只停止这些云台所在的总线，None 表示整个机群
+
+        Returns:
+            {总线: 发送结果}
+        """
+        return self._broadcast(CMD_STOP, names)
+
+    def shutdown_all(self, names: Optional[List[str]] = None) -> Dict[str, bool]:
+        """所有总线同时广播关闭 (0xCD, 0x80)，返回 {总线: 发送结果}"""
+        return self._broadcast(CMD_CLOSE, names)
+
+    # ---- 统计与关闭 ----
+
+    def stats(self) -> Dict[str, Any]:
+        """机群统计：各总线的连接状态、轮询周期、扫描耗时 (毫秒) 与轮询任务统计"""
+        poll = self.get_poll_stats() or {}
+        with self._lock:
+            buses = {}
+            for key, group in self._groups.items():
+                buses[key] = {
+                    'state': group.bus.state,
+                    'heads': [head.config.name for head in group.heads],
+                    'interval_ms': round(group.interval * 1000.0, 1),
+                    'sweeps': group.sweeps,
+                    'skipped': poll[key]['skipped'] if key in poll else 0,
+                    'failures': group.failures,
+                    'last_sweep_ms': round(group.last_sweep * 1000.0, 3),
+                    'max_sweep_ms': round(group.max_sweep * 1000.0, 3),
+                    'poll': poll.get(key),
+                }
+            return {
+                'heads': len(self._heads),
+                'buses': buses,
+                'last_sweep_ms': round(self._last_sweep * 1000.0, 3),
+            }
+
+    def metrics(self) -> Dict[str, Any]:
+        """各总线的事务统计: {总线: RS485Comm.metrics_snapshot()}"""
+        return {key: group.bus.metrics_snapshot() for key, group in self._groups.items()}
+
+    def start_wire_capture(self, directory: str, capacity: int = DEFAULT_CAPACITY) -> Dict[str, str]:
+        """每条总线开启抓包，写入 directory 下各自的环形文件，返回 {总线: 文件路径}"""
+        self.stop_wire_capture()
+        os.makedirs(directory, exist_ok=True)
+        paths = {}
+        for key, group in self._groups.items():
+            path = os.path.join(directory, re.sub(r'[^A-Za-z0-9.-]+', '_', key).strip('_') + '.wcap')
+            capture = WireCapture(path, capacity)
+            self._captures[key] = capture
+            group.bus.set_capture(capture)
+            paths[key] = path
+        return paths
+
+    def stop_wire_capture(self):
+        """停止所有总线的抓包并关闭文件"""
+        captures, self._captures = self._captures, {}
+        for key, capture in captures.items():
+            group = self._groups.get(key)
+            if group is not None:
+                group.bus.set_capture(None)
+            capture.close()
+
+    def close(self):
+        """停止轮询并释放所有总线"""
+        self.stop_monitoring()
+        self.stop_wire_capture()
+        groups, self._groups = self._groups, {}
+        self._heads = {}
+        for group in groups.values():
+            release_bus(group.bus)
@@ -1,9 +1,16 @@
 """升降电机控制器：控制03地址的升降电机。"""
 from __future__ import annotations
+import asyncio
 import threading
 import time
-from typing import Optional, Dict, Any
-from rs485_comm import RS485Comm
+from concurrent.futures import Future
+from typing import Optional, Dict, Any, Callable, Iterable
+from bus_registry import acquire_bus, release_bus
+from axis_wait import AxisWaiters, DEFAULT_TOLERANCE, DEFAULT_TIMEOUT
+from status_feed import StatusFeed, Subscription, StatusSample, DEFAULT_MAXSIZE
+from telemetry_history import AxisHistory, DEFAULT_HISTORY
+from poll_scheduler import PollJob, AdaptiveInterval, POLICY_SKIP
+from rs485_comm import CMD_READ_STATUS_A4, TransactResult, encode_target_angle
 
 
 
@@ -11,7 +18,8 @@ from rs485_comm import RS485Comm
 class LiftMotorController:
     """升降电机控制器"""
     
-    def __init__(self, port: str = 'COM9', baudrate: int = 115200, motor_id: int = 3):
+    def __init__(self, port: str = 'COM9', baudrate: int = 115200, motor_id: int = 3,
+                 history_size: int = DEFAULT_HISTORY):
         """
         初始化升降电机控制器
         
@@ -19,86 +27,253 @@ class LiftMotorController:
             port: 串口号
             baudrate: 波特率
             motor_id: 电机地址（默认3）
+            history_size: 遥测历史保留的样本数（默认540000，50Hz约3小时）
         """
         self.motor_id = motor_id
-        self._comm = RS485Comm(port=port, baudrate=baudrate)
-        self._poll_thread: Optional[threading.Thread] = None
-        self._stop_evt = threading.Event()
-        self._monitoring = False
+        # 同一端口上的控制器共享一个连接和总线调度器
+        self._comm = acquire_bus(port, baudrate)
+        self._comm_acquired = True
+        self._poll_job: Optional[PollJob] = None
+        self._adaptive = False
+        # 运动自适应轮询间隔
+        self._rate = AdaptiveInterval()
         
         # 缓存最新状态
         self._motor_status: Optional[Dict[str, Any]] = None
         self._status_lock = threading.Lock()
+        # 到位等待者，由轮询结果唤醒
+        self._waiters = AxisWaiters(self._status_lock)
+        # 状态订阅者
+        self._feed = StatusFeed()
+        # 遥测历史（只由轮询线程写入）
+        self._history = AxisHistory(history_size)
     
     @property
     def available(self) -> bool:
         """串口是否可用"""
         return self._comm.available
     
-    def start_monitoring(self, interval_ms: int = 500):
+    @property
+    def connection_state(self) -> str:
+        """通信连接状态: connecting / connected / disconnected / closed"""
+        return self._comm.state
+    
+    def add_connection_listener(self, callback):
+        """
+        注册连接状态变化回调（断线/重连）
+        
+        Args:
+            callback: callback(old_state, new_state)
+        """
+        self._comm.add_state_listener(callback)
+    
+    def get_link_stats(self) -> Dict[str, Any]:
+        """获取通信链路统计（各电机往返时间、自适应超时、隔离状态）"""
+        return self._comm.rtt_stats()
+    
+    def get_bus_stats(self) -> Dict[str, Any]:
+        """获取总线调度统计（各优先级队列深度、等待时间、被抢占次数）"""
+        return self._comm.stats()
+    
+    def get_bus_metrics(self) -> Dict[str, Any]:
+        """获取事务统计（各电机/命令的延迟直方图、重试次数、失败原因计数）"""
+        return self._comm.metrics_snapshot()
+    
+    def start_monitoring(self, interval_ms: int = 500, policy: str = POLICY_SKIP, adaptive: bool = False):
         """
-        启动后台监控线程，定期读取电机状态
+        启动后台监控，按固定频率读取电机状态（同一总线上的控制器共用一个轮询线程）
         
         Args:
-            interval_ms: 轮询间隔（毫秒）
+            interval_ms: 轮询间隔（毫秒），按绝对截止时间计，不随总线耗时漂移；
+                         adaptive 时为静止时的默认上限间隔
+            policy: 一次轮询超时后的追赶策略，'skip' 丢弃错过的周期 / 'burst' 立即补跑
+            adaptive: 运动自适应轮询，指令后和运动中按下限间隔轮询，停稳后退避到上限
         """
-        if self._monitoring:
+        if self._poll_job is not None:
             return
         
-        self._monitoring = True
-        self._stop_evt.clear()
-        self._poll_thread = threading.Thread(
-            target=self._poll_loop, 
-            args=(interval_ms / 1000.0,),
-            daemon=True
+        interval = interval_ms / 1000.0
+        self._adaptive = adaptive
+        if adaptive:
+            with self._status_lock:
+                self._rate.default_ceiling = interval
+                self._rate.reset(time.monotonic())
+                interval = self._rate.interval
+        self._waiters.resume()
+        self._poll_job = self._comm.poller.add(
+            self._poll_once, interval, policy=policy,
+            name=f'lift {self.motor_id}'
         )
-        self._poll_thread.start()
+    
+    def set_poll_rates(self, floor_ms: Optional[float] = None, ceiling_ms: Optional[float] = None):
+        """
+        设置自适应轮询下限/上限间隔（adaptive 监控时生效）
+        
+        Args:
+            floor_ms: 运动中的轮询间隔（毫秒），None 表示不变
+            ceiling_ms: 静止时的轮询间隔（毫秒），None 表示不变（默认为监控间隔）
+        
+        Raises:
+            ValueError: 间隔无效
+        """
+        rate = self._rate
+        with self._status_lock:
+            rate.configure(floor=floor_ms / 1000.0 if floor_ms is not None else None,
+                           ceiling=ceiling_ms / 1000.0 if ceiling_ms is not None else None)
+            rate.interval = min(max(rate.interval, rate.floor), rate.upper)
     
     def stop_monitoring(self):
-        """停止后台监控线程"""
-        if not self._monitoring:
+        """停止后台监控（等待正在进行的一次轮询结束）"""
+        job, self._poll_job = self._poll_job, None
+        if job is not None:
+            job.cancel()
+            # 未完成的到位等待以 False 结束
+            self._waiters.abort()
+    
+    def get_poll_stats(self) -> Optional[Dict[str, Any]]:
+        """
+        获取轮询统计（实际频率、滞后与周期抖动直方图、超时/丢弃/补跑次数），未监控时返回None
+        adaptive 监控时 axes 为 {电机地址: {'interval_ms', 'floor_ms', 'ceiling_ms', 'moving'}}
+        """
+        job = self._poll_job
+        if job is None:
+            return None
+        stats = job.stats()
+        if self._adaptive:
+            with self._status_lock:
+                stats['axes'] = {self.motor_id: self._rate.snapshot()}
+        return stats
+    
+    def _poll_once(self):
+        """一个轮询周期（在总线的轮询线程中运行）"""
+        job = self._poll_job
+        if job is None:
+            return
+        # 读取电机状态
+        motor_status = self._comm.read_status(self.motor_id)
+        
+        with self._status_lock:
+            self._motor_status = motor_status
+            if self._adaptive:
+                self._rate.on_sample(motor_status['angle_deg'] if motor_status else None, job.deadline)
+                job.set_interval(self._rate.interval)
+        
+        # 唤醒到位等待者并发布给订阅者
+        now = time.monotonic()
+        self._waiters.publish({self.motor_id: motor_status['angle_deg'] if motor_status else None}, now)
+        self._feed.publish({self.motor_id: motor_status}, now)
+        self._history.append(now, motor_status)
+    
+    def _on_motion_command(self):
+        """运动指令已被接受：回到下限间隔并尽快轮询"""
+        job = self._poll_job
+        if not self._adaptive or job is None:
             return
+        with self._status_lock:
+            self._rate.on_command(time.monotonic())
+            job.set_interval(self._rate.interval)
+    
+    def wait_until_reached(self, target_deg: float, tolerance: float = DEFAULT_TOLERANCE,
+                           timeout: Optional[float] = DEFAULT_TIMEOUT) -> bool:
+        """
+        等待电机到达目标位置（由后台监控的每次轮询结果唤醒，不产生额外总线流量）
+        
+        Args:
+            target_deg: 目标角度（度）
+            tolerance: 到位容差（度）
+            timeout: 最长等待时间（秒），None 表示一直等待
+            
+        Returns:
+            到位返回True，超时或监控停止返回False
+        
+        Raises:
+            RuntimeError: 未启动监控
+        """
+        return self._waiters.wait(self._wait_targets(target_deg), tolerance, timeout)
+    
+    def wait_until_reached_future(self, target_deg: float, tolerance: float = DEFAULT_TOLERANCE,
+                                  timeout: Optional[float] = DEFAULT_TIMEOUT) -> Future:
+        """
+        同 wait_until_reached，但不阻塞：返回 Future，结果为 True（到位）或 False（超时/监控停止）
+        超时在轮询周期上判定，误差约一个轮询周期
+        """
+        return self._waiters.future(self._wait_targets(target_deg), tolerance, timeout)
+    
+    async def wait_until_reached_async(self, target_deg: float, tolerance: float = DEFAULT_TOLERANCE,
+                                       timeout: Optional[float] = DEFAULT_TIMEOUT) -> bool:
+        """wait_until_reached 的协程版本（不占用事件循环线程）"""
+        return await asyncio.wrap_future(self.wait_until_reached_future(target_deg, tolerance, timeout))
+    
+    def _wait_targets(self, target_deg: float) -> Dict[int, float]:
+        if self._poll_job is None:
+            raise RuntimeError('未启动监控，请先调用 start_monitoring()')
+        return {self.motor_id: target_deg}
+    
+    def subscribe(self, callback: Optional[Callable[[StatusSample], None]] = None,
+                  maxsize: int = DEFAULT_MAXSIZE, deadband: Optional[float] = None,
+                  motor_ids: Optional[Iterable[int]] = None) -> Subscription:
+        """
+        订阅每个轮询周期的状态样本（需启动监控才有样本）
         
-        self._monitoring = False
-        self._stop_evt.set()
-        if self._poll_thread:
-            self._poll_thread.join(timeout=2.0)
-            self._poll_thread = None
-    
-    def _poll_loop(self, interval_s: float):
-        """轮询循环（在后台线程中运行）"""
-        while not self._stop_evt.is_set():
-            # 读取电机状态
-            motor_status = self._comm.read_status(self.motor_id)
+        Args:
+            callback: 回调 callback(sample)，在该订阅自己的线程中调用；None 表示用 sub.get() 取样本
+            maxsize: 队列长度，消费不及时丢弃最旧的样本，不会阻塞轮询
+            deadband: 角度死区（度），只在变化超过死区（或温度、读取成败变化）时投递；None 表示每个样本
+            motor_ids: 只接收这些电机的样本，None 表示全部
             
-            with self._status_lock:
-                self._motor_status = motor_status
+        Returns:
+            Subscription，不再需要时调用 close()
+        """
+        return self._feed.subscribe(callback, maxsize, deadband, motor_ids)
+    
+    def get_history(self, seconds: Optional[float] = None, last: Optional[int] = None,
+                    max_points: Optional[int] = None) -> Dict[str, Any]:
+        """
+        查询遥测历史（后台监控的每个样本：时刻、原始角度、温度、当时的指令目标）
+        
+        Args:
+            seconds: 最近多少秒，None 表示全部
+            last: 最多最近多少个样本
+            max_points: 抽稀后最多多少个点
             
-            time.sleep(interval_s)
+        Returns:
+            见 AxisHistory.window()；time 为 time.monotonic() 时刻
+        """
+        return self._history.window(seconds, last, max_points)
+    
+    def get_history_stats(self) -> Dict[int, Dict[str, Any]]:
+        """遥测历史的样本数、时间跨度与内存占用"""
+        return {self.motor_id: self._history.stats()}
     
     def get_status(self) -> Optional[Dict[str, Any]]:
         """获取电机最新状态（缓存）"""
         with self._status_lock:
             return self._motor_status.copy() if self._motor_status else None
     
-    def read_position(self) -> Optional[float]:
+    def read_position(self, max_age: float = 0.0) -> Optional[float]:
         """
         实时读取电机位置角度（归一化到±180°）
         
+        Args:
+            max_age: 可接受的缓存结果年龄（秒），0表示总是实时读取（并发读取仍会合并）
+        
         Returns:
             角度值（度），失败返回None
         """
-        status = self._comm.read_status(self.motor_id)
+        status = self._comm.read_status(self.motor_id, max_age=max_age)
         return status['angle_deg'] if status else None
     
-    def read_raw_position(self) -> Optional[float]:
+    def read_raw_position(self, max_age: float = 0.0) -> Optional[float]:
         """
         实时读取电机原始位置角度（0-360°）
         
+        Args:
+            max_age: 可接受的缓存结果年龄（秒），0表示总是实时读取（并发读取仍会合并）
+        
         Returns:
             角度值（度），失败返回None
         """
-        status = self._comm.read_status(self.motor_id)
+        status = self._comm.read_status(self.motor_id, max_age=max_age)
         return status['angle_0_360'] if status else None
     
     def set_position(self, target_deg: float, speed_rpm: int = 100) -> bool:
@@ -112,8 +287,22 @@ class LiftMotorController:
         Returns:
             成功返回True
         """
-        result = self._comm.set_target_angle(self.motor_id, target_deg, speed_rpm)
-        return result is not None and result.get('success', False)
+        return self.set_position_result(target_deg, speed_rpm).ok
+    
+    def set_position_result(self, target_deg: float, speed_rpm: int = 100) -> TransactResult:
+        """
+        设置电机目标位置，返回带失败原因的事务结果
+        
+        Returns:
+            TransactResult (status 为 'ok' 或 link_error / timeout / crc 等)
+        """
+        payload, target, _ = encode_target_angle(target_deg, speed_rpm)
+        # 响应按命令回显匹配，收到即表示电机已接受0xA4指令
+        result = self._comm.transact_result(self.motor_id, CMD_READ_STATUS_A4, payload)
+        if result.ok:
+            self._history.set_target(target)
+            self._on_motion_command()
+        return result
     
     def move_up(self, angle_deg: float = 10.0, speed_rpm: int = 100) -> bool:
         """
@@ -167,8 +356,10 @@ class LiftMotorController:
     def close(self):
         """关闭控制器，释放资源"""
         self.stop_monitoring()
-        if self._comm:
-            self._comm.close()
+        self._feed.close()
+        if self._comm_acquired:
+            self._comm_acquired = False
+            release_bus(self._comm)
 
 
 # 便捷函数：快速创建升降电机控制器
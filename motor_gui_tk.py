@@ -8,11 +8,14 @@ Tkinter是Python内置GUI库，无需额外安装。
 from __future__ import annotations
 import sys
 import argparse
+import math
 import random
 import tkinter as tk
 from tkinter import ttk
 from typing import Optional
-from rs485_comm import RS485Comm
+from bus_registry import acquire_bus, release_bus
+from bus_scheduler import BusScheduler
+from bus_timing import BusTiming
 import time
 
 
@@ -21,7 +24,7 @@ class MotorMonitorApp:
         self.root = root
         self.port = port
         self.baudrate = baudrate
-        self.comm: Optional[RS485Comm] = None
+        self.comm: Optional[BusScheduler] = None
         self.monitoring = False
         self.port_opened = False
         
@@ -41,10 +44,10 @@ class MotorMonitorApp:
         self.random_active = False
         self.random_job = None
 
-        # 命令发送队列，保证两个电机命令间隔100ms
+        # 命令发送队列：总线帧间隔由通信层按波特率保证，这里只让出 Tk 事件循环
         self.command_queue = []
         self.command_sending = False
-        self.send_interval_ms = 100
+        self.send_interval_ms = max(1, math.ceil(BusTiming(self.baudrate).command_gap * 1000))
         
         self.root.title('云台电机监控')
         self.root.geometry('550x600')
@@ -288,7 +291,7 @@ class MotorMonitorApp:
         else:
             # 未打开，则打开并自动开始读取
             try:
-                self.comm = RS485Comm(port=self.port, baudrate=self.baudrate)
+                self.comm = acquire_bus(self.port, self.baudrate)
                 if self.comm.available:
                     self.port_opened = True
                     self.conn_indicator.config(fg='green')
@@ -301,6 +304,8 @@ class MotorMonitorApp:
                     # 自动开始读取
                     self.start_monitoring()
                 else:
+                    release_bus(self.comm)
+                    self.comm = None
                     self.conn_indicator.config(fg='red')
                     self.status_label.config(text=f'连接: {self.port} (连接失败)')
             except Exception as e:
@@ -316,7 +321,7 @@ class MotorMonitorApp:
         self.command_queue.clear()
         self.command_sending = False
         if self.comm:
-            self.comm.close()
+            release_bus(self.comm)
             self.comm = None
         self.port_opened = False
         self.conn_indicator.config(fg='gray')
@@ -547,7 +552,7 @@ class MotorMonitorApp:
             if widget['control_status']:
                 widget['control_status'].config(text=f'错误: {str(e)}', fg='red')
 
-        # 间隔100ms再处理下一个
+        # 让出事件循环后处理下一个
         if self.command_queue:
             self.root.after(self.send_interval_ms, self._process_command_queue)
         else:
@@ -0,0 +1,398 @@
+"""V4.3 电机仿真器：在本地TCP端口上充当 RS485 网关，后面挂若干台仿真电机。
+
+RS485Comm、PTZController、api_server、motor_gui_tk 把端口填成仿真器地址即可原样运行，
+用于无硬件的回归测试与压力测试:
+
+    python motor_sim.py --port 5020 --motors 1,2,3
+    python api_server.py --port 127.0.0.1:5020
+
+支持的命令:
+    0x94  读状态：温度 + 单圈角度 (0.01°)
+    0xA4  位置控制：按速度限制 (RPM，1RPM = 6°/s) 匀速运动到目标角度，应答格式同 0x94
+    0x80  关闭电机 (停止运动并失能，下一条 0xA4 重新使能)
+    0x81  停止运动 (停在当前位置)
+    0xCD  广播 0x80/0x81 到所有电机，不应答
+
+总线时序按波特率模拟：请求与应答各占一帧线路时间，同一时刻总线上只处理一个请求
+(多个客户端连接共享同一条总线)，应答前加上电机转向延迟与随机抖动。
+
+故障注入 (按应答概率，可运行中通过 set_faults 修改):
+    drop      不应答
+    corrupt   应答帧 CRC 错误
+    garbage   应答前插入 1~8 个噪声字节
+
+单台电机的固定应答故障 (motor_faults 参数或 sim.motor(id).fault，每次应答都发生):
+    wrong_id   应答帧的电机ID错 (motor_id + STRAY_ID_OFFSET)
+    wrong_cmd  应答帧的命令回显错
+    corrupt    应答帧 CRC 错误
+    stray      正确应答之前先到达一帧其他ID的应答和一帧命令回显错的应答
+"""
+from __future__ import annotations
+import random
+import socket
+import socketserver
+import threading
+import time
+from collections import deque
+from typing import Optional, Dict, Any, List, Iterable, Deque, Tuple
+
+from proto_v43 import FRAME_SIZE, FrameDecoder, build_frame
+from bus_timing import BusTiming, sleep_until
+from rs485_comm import (CMD_READ_ANGLE, CMD_READ_STATUS_A4, CMD_CLOSE, CMD_STOP, CMD_BROADCAST,
+                        STATUS_STRUCT, TARGET_STRUCT)
+
+DEG_PER_S_PER_RPM = 6.0
+
+FAULT_WRONG_ID = 'wrong_id'
+FAULT_WRONG_CMD = 'wrong_cmd'
+FAULT_CORRUPT = 'corrupt'
+FAULT_STRAY = 'stray'
+MOTOR_FAULTS = (FAULT_WRONG_ID, FAULT_WRONG_CMD, FAULT_CORRUPT, FAULT_STRAY)
+STRAY_ID_OFFSET = 0x40         # wrong_id / stray 应答使用的电机ID偏移
+
+
+class SimMotor:
+    """单台仿真电机：多圈位置 (度)、匀速运动学、温度"""
+
+    def __init__(self, motor_id: int, angle: float = 0.0, temperature: int = 30,
+                 fault: Optional[str] = None):
+        if fault is not None and fault not in MOTOR_FAULTS:
+            raise ValueError(f'未知的应答故障: {fault}')
+        self.motor_id = motor_id
+        self.fault = fault
+        self.position = angle
+        self.target = angle
+        self.speed = 0.0              # 当前运动速度上限 (°/s)
+        self.enabled = True
+        self.temperature = temperature
+        self.commands = 0
+        self._updated = time.monotonic()
+
+    def update(self, now: float):
+        """推进到 now 时刻的位置"""
+        dt = now - self._updated
+        self._updated = now
+        if dt <= 0 or self.position == self.target:
+            return
+        step = self.speed * dt
+        if abs(self.target - self.position) <= step:
+            self.position = self.target
+        elif self.target > self.position:
+            self.position += step
+        else:
+            self.position -= step
+
+    @property
+    def moving(self) -> bool:
+        return self.position != self.target
+
+    @property
+    def angle(self) -> float:
+        """单圈角度 0~360°"""
+        return self.position % 360.0
+
+    def halt(self):
+        self.target = self.position
+
+    def status_data(self, cmd: int) -> bytes:
+        """0x94/0xA4 应答数据区：命令回显, 温度, 保留4字节, 单圈角度 uint16"""
+        angle_raw = int(round(self.angle * 100.0)) % 36000
+        return STATUS_STRUCT.pack(cmd, self.temperature, 0, 0, 0, 0, angle_raw)
+
+    def handle(self, cmd: int, data: bytes, now: float) -> Optional[bytes]:
+        """处理一条命令，返回应答数据区 (无应答返回None)"""
+        self.update(now)
+        self.commands += 1
+        if cmd == CMD_READ_ANGLE:
+            return self.status_data(cmd)
+        if cmd == CMD_READ_STATUS_A4:
+            _, speed_rpm, angle_control = TARGET_STRUCT.unpack_from(data, 1)
+            self.enabled = True
+            self.speed = speed_rpm * DEG_PER_S_PER_RPM
+            self.target = angle_control / 100.0
+            return self.status_data(cmd)
+        if cmd == CMD_STOP:
+            self.halt()
+            return bytes([cmd]) + bytes(7)
+        if cmd == CMD_CLOSE:
+            self.halt()
+            self.enabled = False
+            return bytes([cmd]) + bytes(7)
+        return None
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'angle': round(self.angle, 2),
+            'position': round(self.position, 2),
+            'target': round(self.target, 2),
+            'moving': self.moving,
+            'enabled': self.enabled,
+            'temperature': self.temperature,
+            'commands': self.commands,
+        }
+
+
+class _GatewayHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        self.server.sim._serve(self.request)
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class MotorSimulator:
+    """仿真网关 + 电机
+
+    Args:
+        motor_ids: 挂在总线上的电机地址
+        host / port: 监听地址 (port=0 自动分配，见 address)
+        baudrate: 模拟的 RS485 波特率
+        latency: 电机转向延迟 (秒，收到请求到开始应答)
+        jitter: 额外的随机延迟上限 (秒，均匀分布)
+        drop / corrupt / garbage: 故障注入概率 (0~1)
+        seed: 随机数种子 (故障注入可复现)
+        angles: 各电机初始角度 {电机ID: 度}
+        motor_faults: 各电机固定的应答故障 {电机ID: 'wrong_id' / 'wrong_cmd' / 'corrupt' / 'stray'}
+        trace: 记录最近多少条收发事件 (见 trace_events)，0 不记录
+    """
+
+    def __init__(self, motor_ids: Iterable[int] = (1, 2), host: str = '127.0.0.1', port: int = 0,
+                 baudrate: int = 115200, latency: float = 0.0005, jitter: float = 0.0,
+                 drop: float = 0.0, corrupt: float = 0.0, garbage: float = 0.0,
+                 seed: Optional[int] = None, angles: Optional[Dict[int, float]] = None,
+                 motor_faults: Optional[Dict[int, str]] = None, trace: int = 0):
+        angles = angles or {}
+        motor_faults = motor_faults or {}
+        self.motors: Dict[int, SimMotor] = {
+            motor_id: SimMotor(motor_id, angles.get(motor_id, 0.0), fault=motor_faults.get(motor_id))
+            for motor_id in motor_ids}
+        self.timing = BusTiming(baudrate)
+        self.latency = latency
+        self.jitter = jitter
+        self.drop = drop
+        self.corrupt = corrupt
+        self.garbage = garbage
+        self._random = random.Random(seed)
+        self._bus_lock = threading.Lock()
+        self._bus_free = 0.0
+        self._conns: List[socket.socket] = []
+        self._conns_lock = threading.Lock()
+        self._stats = {'connections': 0, 'requests': 0, 'replies': 0, 'broadcasts': 0, 'unknown': 0,
+                       'dropped': 0, 'corrupted': 0, 'garbage': 0}
+        self._trace: Optional[Deque[Tuple[str, float, int, int]]] = deque(maxlen=trace) if trace else None
+        self._server = _Server((host, port), _GatewayHandler, bind_and_activate=True)
+        self._server.sim = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> str:
+        """RS485Comm 使用的端口字符串 'host:port'"""
+        host, port = self._server.server_address[:2]
+        return f'{host}:{port}'
+
+    def start(self) -> 'MotorSimulator':
+        if self._thread is None:
+            # 较短的轮询间隔让 close() 很快返回 (测试中频繁启停)
+            self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True,
+                                            name=f'motor-sim {self.address}')
+            self._thread.start()
+        return self
+
+    def close(self):
+        """停止监听并断开所有客户端"""
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        self._server.server_close()
+        with self._conns_lock:
+            conns, self._conns = self._conns, []
+        for conn in conns:
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def __enter__(self) -> 'MotorSimulator':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def motor(self, motor_id: int) -> SimMotor:
+        return self.motors[motor_id]
+
+    def set_faults(self, drop: Optional[float] = None, corrupt: Optional[float] = None,
+                   garbage: Optional[float] = None, latency: Optional[float] = None,
+                   jitter: Optional[float] = None):
+        """运行中修改故障注入参数 (None 表示不变)"""
+        with self._bus_lock:
+            if drop is not None:
+                self.drop = drop
+            if corrupt is not None:
+                self.corrupt = corrupt
+            if garbage is not None:
+                self.garbage = garbage
+            if latency is not None:
+                self.latency = latency
+            if jitter is not None:
+                self.jitter = jitter
+
+    def stats(self) -> Dict[str, Any]:
+        with self._bus_lock:
+            now = time.monotonic()
+            for motor in self.motors.values():
+                motor.update(now)
+            result: Dict[str, Any] = dict(self._stats)
+            result['motors'] = {motor_id: motor.snapshot() for motor_id, motor in self.motors.items()}
+            return result
+
+    def trace_events(self) -> List[Tuple[str, float, int, int]]:
+        """最近的收发事件 [(方向 'rx'/'tx', monotonic 时刻, 电机ID, 命令码)]：
+        rx 为请求帧到达网关，tx 为应答发出 (广播没有 tx)"""
+        with self._bus_lock:
+            return list(self._trace) if self._trace is not None else []
+
+    def _serve(self, conn: socket.socket):
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with self._conns_lock:
+            self._conns.append(conn)
+        with self._bus_lock:
+            self._stats['connections'] += 1
+        dec = FrameDecoder()
+        buf = dec.buffer
+        try:
+            while True:
+                with dec.window() as win:
+                    n = conn.recv_into(win)
+                if not n:
+                    return
+                dec.commit(n)
+                arrived = time.monotonic()
+                off = dec.next_frame()
+                while off >= 0:
+                    motor_id, cmd = buf[off + 1], buf[off + 3]
+                    reply = self._process(motor_id, bytes(buf[off + 3:off + FRAME_SIZE - 2]), arrived)
+                    if reply:
+                        conn.sendall(reply)
+                    if self._trace is not None:
+                        self._record(arrived, time.monotonic() if reply else None, motor_id, cmd)
+                    off = dec.next_frame()
+        except OSError:
+            return
+        finally:
+            with self._conns_lock:
+                if conn in self._conns:
+                    self._conns.remove(conn)
+
+    def _record(self, arrived: float, replied: Optional[float], motor_id: int, cmd: int):
+        with self._bus_lock:
+            self._trace.append(('rx', arrived, motor_id, cmd))
+            if replied is not None:
+                self._trace.append(('tx', replied, motor_id, cmd))
+
+    @staticmethod
+    def _reply_frame(motor: SimMotor, cmd: int, reply_data: bytes) -> bytes:
+        """应答帧 (含该电机固定的应答故障)"""
+        motor_id, fault, data = motor.motor_id, motor.fault, reply_data[1:]
+        if fault == FAULT_WRONG_ID:
+            return build_frame(motor_id + STRAY_ID_OFFSET, cmd, data)
+        if fault == FAULT_WRONG_CMD:
+            return build_frame(motor_id, cmd ^ 0x01, data)
+        reply = build_frame(motor_id, cmd, data)
+        if fault == FAULT_CORRUPT:
+            return reply[:-1] + bytes([reply[-1] ^ 0xFF])
+        if fault == FAULT_STRAY:
+            return (build_frame(motor_id + STRAY_ID_OFFSET, cmd, data)
+                    + build_frame(motor_id, cmd ^ 0x01, data) + reply)
+        return reply
+
+    def _process(self, motor_id: int, data: bytes, arrived: float) -> Optional[bytes]:
+        """在总线上执行一条请求：等待总线空闲与线路时间，返回要发回的字节 (无应答返回None)"""
+        timing = self.timing
+        with self._bus_lock:
+            stats = self._stats
+            stats['requests'] += 1
+            # 请求帧在 RS485 上传输完毕后电机才开始处理
+            start = max(self._bus_free, arrived) + timing.frame_time
+            cmd = data[0]
+            if motor_id == CMD_BROADCAST:
+                stats['broadcasts'] += 1
+                sleep_until(start)
+                for motor in self.motors.values():
+                    motor.handle(cmd, data, start)
+                self._bus_free = start + timing.broadcast_gap
+                return None
+            motor = self.motors.get(motor_id)
+            if motor is None:
+                stats['unknown'] += 1
+                self._bus_free = start
+                return None
+            delay = self.latency + (self._random.uniform(0.0, self.jitter) if self.jitter else 0.0)
+            sleep_until(start + delay)
+            reply_data = motor.handle(cmd, data, start + delay)
+            if reply_data is None:
+                stats['unknown'] += 1
+                self._bus_free = start + delay
+                return None
+            if self.drop and self._random.random() < self.drop:
+                stats['dropped'] += 1
+                self._bus_free = start + delay
+                return None
+            reply = self._reply_frame(motor, cmd, reply_data)
+            if self.corrupt and self._random.random() < self.corrupt:
+                stats['corrupted'] += 1
+                reply = reply[:-1] + bytes([reply[-1] ^ 0xFF])
+            if self.garbage and self._random.random() < self.garbage:
+                stats['garbage'] += 1
+                noise = bytes(self._random.randrange(256) for _ in range(self._random.randint(1, 8)))
+                reply = noise + reply
+            # 应答帧传输完毕才到达网关
+            done = start + delay + timing.wire_time(len(reply))
+            sleep_until(done)
+            self._bus_free = done
+            stats['replies'] += 1
+            return reply
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='V4.3 电机仿真器 (TCP网关替身)')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='监听地址 (默认: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=5020, help='监听端口 (默认: 5020)')
+    parser.add_argument('--motors', type=str, default='1,2', help='电机ID列表，逗号分隔 (默认: 1,2)')
+    parser.add_argument('--baudrate', type=int, default=115200, help='模拟的RS485波特率 (默认: 115200)')
+    parser.add_argument('--latency-ms', type=float, default=0.5, help='电机转向延迟 (默认: 0.5ms)')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='随机抖动上限 (默认: 0)')
+    parser.add_argument('--drop', type=float, default=0.0, help='不应答概率 (0~1)')
+    parser.add_argument('--corrupt', type=float, default=0.0, help='应答CRC错误概率 (0~1)')
+    parser.add_argument('--garbage', type=float, default=0.0, help='应答前插入噪声字节概率 (0~1)')
+    parser.add_argument('--seed', type=int, default=None, help='随机数种子')
+    args = parser.parse_args()
+
+    motor_ids = [int(x) for x in args.motors.split(',') if x.strip()]
+    sim = MotorSimulator(motor_ids, host=args.host, port=args.port, baudrate=args.baudrate,
+                         latency=args.latency_ms / 1000.0, jitter=args.jitter_ms / 1000.0,
+                         drop=args.drop, corrupt=args.corrupt, garbage=args.garbage, seed=args.seed)
+    sim.start()
+    print(f"电机仿真器已启动: {sim.address}  电机: {motor_ids}")
+    print(f"  python api_server.py --port {sim.address}")
+    try:
+        while True:
+            time.sleep(5.0)
+            stats = sim.stats()
+            motors = ', '.join(f"{motor_id}:{m['angle']:.2f}°{'*' if m['moving'] else ''}"
+                               for motor_id, m in stats['motors'].items())
+            print(f"请求 {stats['requests']}  应答 {stats['replies']}  丢弃 {stats['dropped']}  "
+                  f"CRC错误 {stats['corrupted']}  噪声 {stats['garbage']}  |  {motors}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sim.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,349 @@
+"""固定频率轮询调度器：按单调时钟上的绝对截止时间驱动各控制器的状态轮询。
+
+原先每个控制器的轮询线程是 "读一轮 -> sleep(interval)"，实际周期等于
+interval + 总线耗时 + 重试，500ms 的轮询实际是 0.5~2s 且随负载漂移。这里第 k
+次轮询的截止时间固定为 start + k * interval，本轮耗时不会推迟后续周期，长期
+频率没有漂移。
+
+一条总线只有一个调度线程 (BusScheduler.poller)，同一总线上的所有控制器都注册
+为它的任务，轮询按截止时间先后依次执行，互不抢占，也不会与其他控制器的轮询
+在总线上交错。
+
+超时 (overrun): 一次轮询结束时已经过了下一次截止时间。追赶策略:
+    skip   丢弃错过的截止时间，按原相位对齐到下一个未来的截止时间 (默认)
+    burst  错过的周期立即连续补跑，最多落后 max_burst 个周期，超出部分丢弃
+
+每个任务统计滞后 (实际开始 - 截止时间)、周期抖动 (相邻两次开始的间隔与计划
+周期之差的绝对值) 与单次耗时的直方图，以及超时、丢弃、补跑次数。
+
+运动自适应 (AdaptiveInterval): 每个轴各自维护轮询间隔。发出 0xA4 指令后以及角度
+仍在变化时按下限间隔轮询，停稳后每次翻倍退避到上限。控制器的任务间隔取各轴
+间隔的最小值，每个周期只读取到期的轴，总线时间集中在正在运动的轴上。
+
+用法:
+    job = bus.poller.add(poll_once, 0.02, name='ptz 1/2')     # 50 Hz
+    ...
+    job.stats()
+    job.cancel()
+"""
+from __future__ import annotations
+import itertools
+import threading
+import time
+from typing import Optional, Dict, Any, List, Callable
+from bus_metrics import LatencyHistogram
+
+POLICY_SKIP = 'skip'
+POLICY_BURST = 'burst'
+POLICIES = (POLICY_SKIP, POLICY_BURST)
+
+# burst 策略最多连续补跑的周期数
+DEFAULT_MAX_BURST = 4
+
+# 运动自适应轮询默认参数
+DEFAULT_FLOOR = 0.02           # 运动中的轮询间隔 (50 Hz)
+DEFAULT_BACKOFF = 2.0          # 停稳后每个周期间隔乘以该系数，直到上限
+SETTLE_DEG = 0.05              # 相邻两次采样角度变化不超过该值视为静止
+SETTLE_SAMPLES = 2             # 连续静止的采样数达到该值才开始退避
+COMMAND_HOLD = 0.25            # 指令发出后至少保持下限间隔的时长 (等待电机起步)
+
+
+class PollJob:
+    """调度器中的一个周期任务 (由 PollScheduler.add 创建)"""
+
+    def __init__(self, scheduler: 'PollScheduler', seq: int, callback: Callable[[], None],
+                 interval: float, policy: str, max_burst: int, name: str, start: float):
+        self._scheduler = scheduler
+        self.seq = seq
+        self.callback = callback
+        self.interval = interval
+        self.policy = policy
+        self.max_burst = max_burst
+        self.name = name
+        self.deadline = start          # 最近一次 (或正在执行的) 周期的截止时间
+        self.next_due = start
+        self.running = False
+        self.cancelled = False
+        # 统计
+        self.started_at = start
+        self.cycles = 0
+        self.overruns = 0
+        self.skipped = 0
+        self.burst = 0
+        self.errors = 0
+        self.last_start = 0.0
+        self.last_deadline = 0.0
+        self.lateness = LatencyHistogram()
+        self.jitter = LatencyHistogram()
+        self.runtime = LatencyHistogram()
+
+    def _account(self, started: float, finished: float):
+        """记录一次执行并计算下一次截止时间 (调用时持有调度器的锁)"""
+        interval = self.interval
+        self.cycles += 1
+        self.lateness.add(started - self.deadline)
+        self.runtime.add(finished - started)
+        if self.last_start:
+            # 实际周期与计划周期 (两次截止时间之差) 的偏差，间隔变化或丢弃周期时同样适用
+            self.jitter.add(abs((started - self.last_start) - (self.deadline - self.last_deadline)))
+        self.last_start = started
+        self.last_deadline = self.deadline
+
+        next_due = self.deadline + interval
+        if finished > next_due:
+            self.overruns += 1
+            behind = int((finished - next_due) / interval) + 1       # 已错过的截止时间数
+            if self.policy == POLICY_BURST and behind <= self.max_burst:
+                self.burst += 1              # 下一个周期已到期，立即补跑
+            else:
+                self.skipped += behind
+                next_due += behind * interval
+        self.next_due = next_due
+
+    def set_interval(self, interval: float):
+        """修改轮询间隔；下一次截止时间按新间隔从上一周期的截止时间算起 (已过去则立即执行)"""
+        if interval <= 0:
+            raise ValueError('interval 必须大于0')
+        with self._scheduler._cond:
+            if interval != self.interval and self.cycles and not self.running:
+                self.next_due = max(self.deadline + interval, time.monotonic())
+            self.interval = interval
+            self._scheduler._cond.notify_all()
+
+    def cancel(self, timeout: float = 2.0):
+        """取消任务；正在执行时等待本次轮询结束 (在回调内调用则不等待)"""
+        self._scheduler._remove(self, timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        """统计快照 (毫秒)"""
+        with self._scheduler._cond:
+            elapsed = time.monotonic() - self.started_at
+            return {
+                'name': self.name,
+                'interval_ms': round(self.interval * 1000.0, 3),
+                'policy': self.policy,
+                'cycles': self.cycles,
+                'rate_hz': round(self.cycles / elapsed, 2) if elapsed > 0 else 0.0,
+                'overruns': self.overruns,
+                'skipped': self.skipped,
+                'burst': self.burst,
+                'errors': self.errors,
+                'lateness': self.lateness.snapshot(),
+                'jitter': self.jitter.snapshot(),
+                'runtime': self.runtime.snapshot(),
+            }
+
+
+class PollScheduler:
+    """一条总线的轮询调度线程：各任务按绝对截止时间依次执行
+
+    Args:
+        name: 线程名称 (便于调试)
+    """
+
+    def __init__(self, name: str = 'rs485-poll'):
+        self._name = name
+        self._cond = threading.Condition()
+        self._jobs: List[PollJob] = []
+        self._seq = itertools.count()
+        self._closed = False
+        self._worker: Optional[threading.Thread] = None
+        self._busy_total = 0.0
+        self._created = time.monotonic()
+
+    def add(self, callback: Callable[[], None], interval: float, policy: str = POLICY_SKIP,
+            max_burst: int = DEFAULT_MAX_BURST, name: str = '', start: Optional[float] = None) -> PollJob:
+        """
+        注册周期任务 (首次注册时启动调度线程)
+
+        Args:
+            callback: 每个周期调用一次，在调度线程中执行；异常只计数
+            interval: 周期（秒）
+            policy: 超时后的追赶策略 'skip' / 'burst'
+            max_burst: burst 策略最多连续补跑的周期数
+            name: 任务名称 (统计中显示)
+            start: 第一次截止时间 (time.monotonic())，默认立即
+
+        Raises:
+            ValueError: 间隔或策略无效
+            RuntimeError: 调度器已关闭
+        """
+        if interval <= 0:
+            raise ValueError('interval 必须大于0')
+        if policy not in POLICIES:
+            raise ValueError(f'未知的追赶策略: {policy}')
+        with self._cond:
+            if self._closed:
+                raise RuntimeError('轮询调度器已关闭')
+            job = PollJob(self, next(self._seq), callback, interval, policy, max(0, max_burst),
+                          name, time.monotonic() if start is None else start)
+            self._jobs.append(job)
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name=self._name, daemon=True)
+                self._worker.start()
+            self._cond.notify_all()
+            return job
+
+    def _remove(self, job: PollJob, timeout: float):
+        with self._cond:
+            job.cancelled = True
+            if job in self._jobs:
+                self._jobs.remove(job)
+                self._cond.notify_all()
+            if threading.current_thread() is self._worker:
+                return
+            deadline = time.monotonic() + timeout
+            while job.running:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+    def jobs(self) -> List[PollJob]:
+        """当前注册的任务"""
+        with self._cond:
+            return list(self._jobs)
+
+    def _next_job(self) -> Optional[PollJob]:
+        """等待最早到期的任务 (调用时持有 _cond)，关闭时返回 None"""
+        while not self._closed:
+            if not self._jobs:
+                self._cond.wait()
+                continue
+            job = min(self._jobs, key=lambda j: (j.next_due, j.seq))
+            delay = job.next_due - time.monotonic()
+            if delay <= 0:
+                return job
+            self._cond.wait(delay)
+        return None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                job = self._next_job()
+                if job is None:
+                    return
+                job.deadline = job.next_due
+                job.running = True
+            started = time.monotonic()
+            failed = False
+            try:
+                job.callback()
+            except Exception:
+                failed = True
+            finished = time.monotonic()
+            with self._cond:
+                job.running = False
+                self._busy_total += finished - started
+                if failed:
+                    job.errors += 1
+                job._account(started, finished)
+                self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        """各任务统计，以及调度线程忙碌时间占比 (轮询占用的总线时间)"""
+        jobs = self.jobs()
+        with self._cond:
+            elapsed = time.monotonic() - self._created
+            load = self._busy_total / elapsed if elapsed > 0 else 0.0
+        return {'load': round(load, 4), 'jobs': [job.stats() for job in jobs]}
+
+    def close(self, timeout: float = 2.0):
+        """取消所有任务并停止调度线程 (等待正在执行的轮询结束)"""
+        with self._cond:
+            self._closed = True
+            for job in self._jobs:
+                job.cancelled = True
+            self._jobs.clear()
+            self._cond.notify_all()
+            worker = self._worker
+        if worker is not None and worker is not threading.current_thread():
+            worker.join(timeout)
+
+
+def angle_delta(a: float, b: float) -> float:
+    """两个角度 (度) 的最短差值，范围 [-180, 180)"""
+    return (a - b + 180.0) % 360.0 - 180.0
+
+
+class AdaptiveInterval:
+    """单轴运动自适应轮询间隔
+
+    Args:
+        floor: 运动中的轮询间隔（秒）
+        ceiling: 静止时的轮询间隔（秒），None 表示使用控制器的监控间隔
+        backoff: 停稳后每个周期的退避系数
+    """
+
+    def __init__(self, floor: float = DEFAULT_FLOOR, ceiling: Optional[float] = None,
+                 backoff: float = DEFAULT_BACKOFF):
+        self.floor = floor
+        self.ceiling = ceiling
+        self.backoff = backoff
+        self.default_ceiling = floor if ceiling is None else ceiling
+        self.configure(floor, ceiling, backoff)
+        self.reset(0.0)
+
+    def configure(self, floor: Optional[float] = None, ceiling: Optional[float] = None,
+                  backoff: Optional[float] = None):
+        """修改下限/上限/退避系数（None 表示不变）
+
+        Raises:
+            ValueError: 参数无效
+        """
+        floor = self.floor if floor is None else floor
+        ceiling = self.ceiling if ceiling is None else ceiling
+        backoff = self.backoff if backoff is None else backoff
+        if floor <= 0:
+            raise ValueError('floor 必须大于0')
+        if ceiling is not None and ceiling < floor:
+            raise ValueError('ceiling 不能小于 floor')
+        if backoff < 1.0:
+            raise ValueError('backoff 不能小于1')
+        self.floor, self.ceiling, self.backoff = floor, ceiling, backoff
+
+    @property
+    def upper(self) -> float:
+        """实际使用的上限间隔"""
+        ceiling = self.default_ceiling if self.ceiling is None else self.ceiling
+        return max(self.floor, ceiling)
+
+    def reset(self, now: float):
+        """重新开始：立即采样一次，先按下限间隔轮询"""
+        self.interval = self.floor
+        self.next_due = now
+        self.last_angle: Optional[float] = None
+        self.stable = 0
+        self.hold_until = 0.0
+        self.moving = False
+
+    def on_command(self, now: float):
+        """发出运动指令：立即回到下限间隔并保持 COMMAND_HOLD 秒"""
+        self.interval = self.floor
+        self.next_due = min(self.next_due, now)
+        self.stable = 0
+        self.hold_until = now + COMMAND_HOLD
+
+    def on_sample(self, angle: Optional[float], deadline: float):
+        """记录一次采样 (angle 为 None 表示读取失败，间隔不变)，计算下一次到期时间"""
+        if angle is not None:
+            last, self.last_angle = self.last_angle, angle
+            self.moving = last is not None and abs(angle_delta(angle, last)) > SETTLE_DEG
+            if self.moving or deadline < self.hold_until:
+                self.interval = self.floor
+                self.stable = 0
+            elif last is not None:
+                self.stable += 1
+                if self.stable >= SETTLE_SAMPLES:
+                    self.interval = min(self.upper, self.interval * self.backoff)
+        self.interval = min(self.interval, self.upper)
+        self.next_due = deadline + self.interval
+
+    def snapshot(self) -> Dict[str, Any]:
+        """当前间隔与运动状态 (毫秒)"""
+        return {
+            'interval_ms': round(self.interval * 1000.0, 3),
+            'floor_ms': round(self.floor * 1000.0, 3),
+            'ceiling_ms': round(self.upper * 1000.0, 3),
+            'moving': self.moving,
+        }
@@ -33,6 +33,18 @@ cp ptz_controller.py "$DEPLOY_DIR/app/"
 cp rs485_comm.py "$DEPLOY_DIR/app/"
 cp lift_motor.py "$DEPLOY_DIR/app/"
 cp proto_v43.py "$DEPLOY_DIR/app/"
+cp crc16.py "$DEPLOY_DIR/app/"
+cp rtt_estimator.py "$DEPLOY_DIR/app/"
+cp bus_scheduler.py "$DEPLOY_DIR/app/"
+cp bus_registry.py "$DEPLOY_DIR/app/"
+cp bus_timing.py "$DEPLOY_DIR/app/"
+cp bus_metrics.py "$DEPLOY_DIR/app/"
+cp fleet.py "$DEPLOY_DIR/app/"
+cp wire_capture.py "$DEPLOY_DIR/app/"
+cp poll_scheduler.py "$DEPLOY_DIR/app/"
+cp axis_wait.py "$DEPLOY_DIR/app/"
+cp status_feed.py "$DEPLOY_DIR/app/"
+cp telemetry_history.py "$DEPLOY_DIR/app/"
 
 # 复制配置文件
 echo "复制配置文件..."
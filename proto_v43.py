@@ -18,33 +18,53 @@
     data[7]   -> reserved / 扩展
 """
 from __future__ import annotations
+import struct
+from functools import lru_cache
 from typing import Optional, Tuple, List
+from crc16 import modbus_crc, check_crc  # modbus_crc 保留导出，兼容旧脚本
 
 FRAME_HEADER = 0x3E
 CONST_LEN_BYTE = 0x08  # 数据长度=8
 FRAME_SIZE = 13        # 1+1+1+8+2
 DATA_SIZE = 8
 
-def modbus_crc(data: bytes) -> int:
-    crc = 0xFFFF
-    for b in data:
-        crc ^= b
-        for _ in range(8):
-            if crc & 0x0001:
-                crc = (crc >> 1) ^ 0xA001
-            else:
-                crc >>= 1
-    return crc & 0xFFFF
+# 预编译打包格式：帧头4字节 (0x3E, ID, 0x08, 命令码) 与 CRC (低字节在前)
+HEAD_STRUCT = struct.Struct('<BBBB')
+CRC_STRUCT = struct.Struct('<H')
+_ZERO_PAD = bytes(DATA_SIZE)
 
 def verify_crc(frame: bytes) -> bool:
     if len(frame) != FRAME_SIZE:
         return False
-    body = frame[:-2]
-    crc_calc = modbus_crc(body)
-    crc_lo = frame[-2]
-    crc_hi = frame[-1]
-    crc_recv = crc_lo | (crc_hi << 8)
-    return crc_calc == crc_recv
+    return check_crc(frame)
+
+def build_frame_into(buf, offset: int, addr: int, cmd: int, payload=b''):
+    """在预分配缓冲区 buf[offset:offset+13] 中原地构建命令帧 (不创建新的帧对象)"""
+    n = len(payload)
+    if n > DATA_SIZE - 1:
+        raise ValueError('payload too long')
+    HEAD_STRUCT.pack_into(buf, offset, FRAME_HEADER, addr & 0xFF, CONST_LEN_BYTE, cmd & 0xFF)
+    body_end = offset + FRAME_SIZE - 2
+    if n:
+        buf[offset + 4:offset + 4 + n] = payload
+    if n < DATA_SIZE - 1:
+        buf[offset + 4 + n:body_end] = _ZERO_PAD[:DATA_SIZE - 1 - n]
+    with memoryview(buf) as view:
+        CRC_STRUCT.pack_into(buf, body_end, modbus_crc(view[offset:body_end]))
+
+def build_frame(addr: int, cmd: int, payload: bytes = b'') -> bytes:
+    """构建命令帧。payload附加在cmd后，数据区不足8字节补0x00"""
+    frame = bytearray(FRAME_SIZE)
+    build_frame_into(frame, 0, addr, cmd, payload)
+    return bytes(frame)
+
+@lru_cache(maxsize=None)
+def fixed_frame(addr: int, cmd: int) -> bytes:
+    """无参数命令帧缓存 (0x94/0x80/0x81 以及 0xCD 广播)。
+
+    这类帧内容只取决于 (地址, 命令码)，轮询时直接复用，不重复计算CRC。
+    """
+    return build_frame(addr, cmd)
 
 def parse_frame(frame: bytes) -> Optional[Tuple[int, bytes]]:
     """解析单个完整帧。返回 (id, data8bytes) 或 None"""
@@ -60,22 +80,164 @@ def parse_frame(frame: bytes) -> Optional[Tuple[int, bytes]]:
     data = frame[3:3+DATA_SIZE]
     return addr, data
 
+def scan_frames(buf, start: int, end: int, out: List[Tuple[int, bytes]]) -> Tuple[int, int]:
+    """在 buf[start:end] 中搜索合法帧并追加到 out。
+
+    以 find 定位帧头 0x3E，校验长度字节与整帧CRC；校验失败从下一字节继续搜索。
+    返回 (next, skipped): next 为尚未处理的位置(其后不足一帧，可能是半帧)，
+    skipped 为被丢弃的字节数(噪声/错位)。
+    """
+    i = start
+    skipped = 0
+    view = memoryview(buf)
+    try:
+        while True:
+            j = buf.find(FRAME_HEADER, i, end)
+            if j < 0:
+                skipped += end - i
+                return end, skipped
+            skipped += j - i
+            i = j
+            if i + FRAME_SIZE > end:
+                return i, skipped
+            if buf[i + 2] == CONST_LEN_BYTE and check_crc(view[i:i + FRAME_SIZE]):
+                out.append((buf[i + 1], bytes(view[i + 3:i + 3 + DATA_SIZE])))
+                i += FRAME_SIZE
+            else:
+                i += 1
+                skipped += 1
+    finally:
+        view.release()
+
 def extract_frames(stream: bytes) -> List[Tuple[int, bytes]]:
     """在一段连续字节流中提取所有合法帧。"""
     results: List[Tuple[int, bytes]] = []
-    i = 0
-    L = len(stream)
-    while i + FRAME_SIZE <= L:
-        if stream[i] == FRAME_HEADER:
-            candidate = stream[i:i+FRAME_SIZE]
-            parsed = parse_frame(candidate)
-            if parsed:
-                results.append(parsed)
-                i += FRAME_SIZE
-                continue
-        i += 1
+    scan_frames(stream, 0, len(stream), results)
     return results
 
+class FrameDecoder:
+    """流式帧重组器。
+
+    数据分批到达时逐次 feed()，内部预分配缓冲区保存不足一帧的剩余字节，
+    遇到噪声/错位字节时从下一个帧头重新同步，不需要等待超时。
+
+    用法:
+        dec = FrameDecoder()
+        for addr, data in dec.feed(chunk):
+            ...
+
+    零拷贝用法 (recv_into 直接写入内部缓冲区，按偏移读取帧字段):
+        n = sock.recv_into(dec.window())
+        dec.commit(n)
+        off = dec.next_frame()
+        while off >= 0:
+            addr, cmd = dec.buffer[off + 1], dec.buffer[off + 3]
+            ...
+            off = dec.next_frame()
+    """
+
+    def __init__(self, capacity: int = 256):
+        if capacity < FRAME_SIZE * 2:
+            raise ValueError('capacity too small')
+        self._buf = bytearray(capacity)
+        self._view = memoryview(self._buf)
+        self._start = 0          # 尚未扫描数据的起点
+        self._len = 0            # 已写入数据的终点
+        self.frames = 0          # 已输出帧数
+        self.resyncs = 0         # 重新同步次数 (发生丢弃的批次)
+        self.discarded = 0       # 丢弃字节总数
+
+    @property
+    def pending(self) -> int:
+        """缓冲区中尚未组成完整帧的字节数"""
+        return self._len - self._start
+
+    @property
+    def buffer(self) -> bytearray:
+        """内部缓冲区，next_frame() 返回的偏移基于它"""
+        return self._buf
+
+    def reset(self):
+        """丢弃缓冲区中的剩余字节 (如串口清空接收缓冲后)"""
+        self._start = 0
+        self._len = 0
+
+    def window(self, size: Optional[int] = None) -> memoryview:
+        """返回缓冲区空闲部分的可写视图 (最多 size 字节)，写入后调用 commit(n)。
+
+        调用前应先用 next_frame() 取完已有的完整帧，此时剩余不足一帧，
+        空闲空间至少有一帧长度。
+        """
+        cap = len(self._buf)
+        if self._start == self._len:
+            self._start = self._len = 0
+        elif cap - self._len < FRAME_SIZE:
+            # 把半帧移到缓冲区开头
+            rest = self._len - self._start
+            self._buf[:rest] = self._buf[self._start:self._len]
+            self._start = 0
+            self._len = rest
+        end = cap if size is None else min(cap, self._len + size)
+        return self._view[self._len:end]
+
+    def commit(self, n: int):
+        """确认 window() 视图中已写入 n 字节"""
+        self._len += n
+
+    def next_frame(self) -> int:
+        """查找下一个合法帧，返回帧在 buffer 中的偏移；没有完整帧时返回 -1。
+
+        返回的帧内容在下一次 window() / feed() 之前有效。
+        """
+        buf = self._buf
+        i = self._start
+        end = self._len
+        skipped = 0
+        found = -1
+        while True:
+            j = buf.find(FRAME_HEADER, i, end)
+            if j < 0:
+                skipped += end - i
+                i = end
+                break
+            skipped += j - i
+            i = j
+            if i + FRAME_SIZE > end:
+                break
+            if buf[i + 2] == CONST_LEN_BYTE and check_crc(self._view[i:i + FRAME_SIZE]):
+                found = i
+                i += FRAME_SIZE
+                self.frames += 1
+                break
+            i += 1
+            skipped += 1
+        self._start = i
+        if skipped:
+            self.resyncs += 1
+            self.discarded += skipped
+        return found
+
+    def data(self, offset: int) -> bytes:
+        """复制出 offset 处帧的数据区8字节"""
+        return bytes(self._view[offset + 3:offset + 3 + DATA_SIZE])
+
+    def feed(self, data: bytes) -> List[Tuple[int, bytes]]:
+        """输入一段字节，返回本次新组成的完整帧列表 [(id, data8bytes), ...]"""
+        out: List[Tuple[int, bytes]] = []
+        pos = 0
+        total = len(data)
+        while pos < total:
+            win = self.window()
+            n = min(len(win), total - pos)
+            win[:n] = data[pos:pos + n]
+            self.commit(n)
+            pos += n
+            off = self.next_frame()
+            while off >= 0:
+                out.append((self._buf[off + 1], self.data(off)))
+                off = self.next_frame()
+        return out
+
 def demo_decode_fields(data: bytes) -> dict:
     """V4.3协议字段拆解 (命令0x94响应)。
     
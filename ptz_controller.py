@@ -1,9 +1,17 @@
 """PTZ云台控制器：控制YAW（方位）和PITCH（俯仰）两个轴。"""
 from __future__ import annotations
+import asyncio
 import threading
 import time
-from typing import Optional, Dict, Any
-from rs485_comm import RS485Comm
+from concurrent.futures import Future
+from typing import Optional, Dict, Any, Callable, Iterable
+from bus_registry import acquire_bus, release_bus
+from axis_wait import AxisWaiters, DEFAULT_TOLERANCE, DEFAULT_TIMEOUT
+from status_feed import StatusFeed, Subscription, StatusSample, DEFAULT_MAXSIZE
+from telemetry_history import AxisHistory, DEFAULT_HISTORY
+from poll_scheduler import PollJob, AdaptiveInterval, POLICY_SKIP
+from rs485_comm import CMD_READ_STATUS_A4, TransactResult, encode_target_angle
+from wire_capture import WireCapture, DEFAULT_CAPACITY
 
 # 功能码定义
 
@@ -13,7 +21,7 @@ class PTZController:
     """PTZ云台控制器，管理YAW和PITCH两个电机轴"""
     
     def __init__(self, port: str = 'COM9', baudrate: int = 115200, 
-                 yaw_id: int = 1, pitch_id: int = 2):
+                 yaw_id: int = 1, pitch_id: int = 2, history_size: int = DEFAULT_HISTORY):
         """
         初始化PTZ控制器
         
@@ -22,66 +30,286 @@ class PTZController:
             baudrate: 波特率
             yaw_id: YAW电机地址（默认1）
             pitch_id: PITCH电机地址（默认2）
+            history_size: 每轴遥测历史保留的样本数（默认540000，50Hz约3小时）
         """
         self.yaw_id = yaw_id
         self.pitch_id = pitch_id
-        self._comm = RS485Comm(port=port, baudrate=baudrate)
-        self._poll_thread: Optional[threading.Thread] = None
-        self._stop_evt = threading.Event()
-        self._monitoring = False
+        # 同一端口上的控制器共享一个连接和总线调度器
+        self._comm = acquire_bus(port, baudrate)
+        self._comm_acquired = True
+        self._capture: Optional[WireCapture] = None
+        self._poll_job: Optional[PollJob] = None
+        self._adaptive = False
+        # 各轴的运动自适应轮询间隔
+        self._rates: Dict[int, AdaptiveInterval] = {yaw_id: AdaptiveInterval(), pitch_id: AdaptiveInterval()}
         
         # 缓存最新状态
         self._yaw_status: Optional[Dict[str, Any]] = None
         self._pitch_status: Optional[Dict[str, Any]] = None
         self._status_lock = threading.Lock()
+        # 到位等待者，由轮询结果唤醒
+        self._waiters = AxisWaiters(self._status_lock)
+        # 状态订阅者
+        self._feed = StatusFeed()
+        # 各轴遥测历史（只由轮询线程写入）
+        self._history: Dict[int, AxisHistory] = {yaw_id: AxisHistory(history_size),
+                                                 pitch_id: AxisHistory(history_size)}
     
     @property
     def available(self) -> bool:
         """串口是否可用"""
         return self._comm.available
     
-    def start_monitoring(self, interval_ms: int = 500):
+    @property
+    def connection_state(self) -> str:
+        """通信连接状态: connecting / connected / disconnected / closed"""
+        return self._comm.state
+    
+    def add_connection_listener(self, callback):
+        """
+        注册连接状态变化回调（断线/重连）
+        
+        Args:
+            callback: callback(old_state, new_state)
+        """
+        self._comm.add_state_listener(callback)
+    
+    def get_link_stats(self) -> Dict[str, Any]:
+        """获取通信链路统计（各电机往返时间、自适应超时、隔离状态）"""
+        return self._comm.rtt_stats()
+    
+    def get_bus_stats(self) -> Dict[str, Any]:
+        """获取总线调度统计（各优先级队列深度、等待时间、被抢占次数）"""
+        return self._comm.stats()
+    
+    def get_bus_metrics(self) -> Dict[str, Any]:
+        """获取事务统计（各电机/命令的延迟直方图、重试次数、失败原因计数）"""
+        return self._comm.metrics_snapshot()
+
+    def start_wire_capture(self, path: str, capacity: int = DEFAULT_CAPACITY) -> WireCapture:
         """
-        启动后台监控线程，定期读取电机状态
+        开启总线抓包，收发帧写入环形文件（离线查看: python wire_capture.py <path>）
         
         Args:
-            interval_ms: 轮询间隔（毫秒）
+            path: 抓包文件路径
+            capacity: 环形容量（记录数，每条32字节）
         """
-        if self._monitoring:
+        self.stop_wire_capture()
+        self._capture = WireCapture(path, capacity)
+        self._comm.set_capture(self._capture)
+        return self._capture
+    
+    def stop_wire_capture(self):
+        """停止总线抓包并关闭文件"""
+        if self._capture is not None:
+            self._comm.set_capture(None)
+            self._capture.close()
+            self._capture = None
+    
+    def start_monitoring(self, interval_ms: int = 500, policy: str = POLICY_SKIP, adaptive: bool = False):
+        """
+        启动后台监控，按固定频率读取电机状态（同一总线上的控制器共用一个轮询线程）
+        
+        Args:
+            interval_ms: 轮询间隔（毫秒），按绝对截止时间计，不随总线耗时漂移；
+                         adaptive 时为静止轴的默认上限间隔
+            policy: 一次轮询超时后的追赶策略，'skip' 丢弃错过的周期 / 'burst' 立即补跑
+            adaptive: 运动自适应轮询，指令后和运动中按各轴下限间隔轮询，停稳后退避到上限
+        """
+        if self._poll_job is not None:
             return
         
-        self._monitoring = True
-        self._stop_evt.clear()
-        self._poll_thread = threading.Thread(
-            target=self._poll_loop, 
-            args=(interval_ms / 1000.0,),
-            daemon=True
+        interval = interval_ms / 1000.0
+        self._adaptive = adaptive
+        if adaptive:
+            now = time.monotonic()
+            with self._status_lock:
+                for rate in self._rates.values():
+                    rate.default_ceiling = interval
+                    rate.reset(now)
+                interval = min(rate.interval for rate in self._rates.values())
+        self._waiters.resume()
+        self._poll_job = self._comm.poller.add(
+            self._poll_once, interval, policy=policy,
+            name=f'ptz {self.yaw_id}/{self.pitch_id}'
         )
-        self._poll_thread.start()
+    
+    def set_poll_rates(self, motor_id: int, floor_ms: Optional[float] = None,
+                       ceiling_ms: Optional[float] = None):
+        """
+        设置某个轴的自适应轮询下限/上限间隔（adaptive 监控时生效）
+        
+        Args:
+            motor_id: 电机地址（yaw_id 或 pitch_id）
+            floor_ms: 运动中的轮询间隔（毫秒），None 表示不变
+            ceiling_ms: 静止时的轮询间隔（毫秒），None 表示不变（默认为监控间隔）
+        
+        Raises:
+            KeyError: 不是本控制器的电机
+            ValueError: 间隔无效
+        """
+        rate = self._rates[motor_id]
+        with self._status_lock:
+            rate.configure(floor=floor_ms / 1000.0 if floor_ms is not None else None,
+                           ceiling=ceiling_ms / 1000.0 if ceiling_ms is not None else None)
+            rate.interval = min(max(rate.interval, rate.floor), rate.upper)
     
     def stop_monitoring(self):
-        """停止后台监控线程"""
-        if not self._monitoring:
+        """停止后台监控（等待正在进行的一次轮询结束）"""
+        job, self._poll_job = self._poll_job, None
+        if job is not None:
+            job.cancel()
+            # 未完成的到位等待以 False 结束
+            self._waiters.abort()
+    
+    def get_poll_stats(self) -> Optional[Dict[str, Any]]:
+        """
+        获取轮询统计（实际频率、滞后与周期抖动直方图、超时/丢弃/补跑次数），未监控时返回None
+        adaptive 监控时 axes 为各轴当前间隔: {电机地址: {'interval_ms', 'floor_ms', 'ceiling_ms', 'moving'}}
+        """
+        job = self._poll_job
+        if job is None:
+            return None
+        stats = job.stats()
+        if self._adaptive:
+            with self._status_lock:
+                stats['axes'] = {motor_id: rate.snapshot() for motor_id, rate in self._rates.items()}
+        return stats
+    
+    def _poll_once(self):
+        """一个轮询周期（在总线的轮询线程中运行）"""
+        job = self._poll_job
+        if job is None:
+            return
+        motor_ids = [self.yaw_id, self.pitch_id]
+        if self._adaptive:
+            # 只读取到期的轴 (留半个周期余量，避免抖动让到期的轴推迟一整个周期)
+            deadline = job.deadline
+            horizon = deadline + job.interval / 2
+            with self._status_lock:
+                motor_ids = [motor_id for motor_id in motor_ids if self._rates[motor_id].next_due <= horizon]
+            if not motor_ids:
+                return
+        
+        # 一次扫描读取到期的轴状态 (TCP网关下流水线发送)
+        statuses = self._comm.read_status_many(motor_ids)
+        
+        with self._status_lock:
+            if self.yaw_id in statuses:
+                self._yaw_status = statuses[self.yaw_id]
+            if self.pitch_id in statuses:
+                self._pitch_status = statuses[self.pitch_id]
+            if self._adaptive:
+                for motor_id, status in statuses.items():
+                    self._rates[motor_id].on_sample(status['angle_deg'] if status else None, deadline)
+                job.set_interval(min(rate.interval for rate in self._rates.values()))
+        
+        # 唤醒到位等待者并发布给订阅者
+        now = time.monotonic()
+        self._waiters.publish({motor_id: status['angle_deg'] if status else None
+                               for motor_id, status in statuses.items()}, now)
+        self._feed.publish(statuses, now)
+        for motor_id, status in statuses.items():
+            self._history[motor_id].append(now, status)
+    
+    def _on_motion_command(self, motor_ids):
+        """运动指令已被接受：相关轴回到下限间隔并尽快轮询"""
+        job = self._poll_job
+        if not self._adaptive or job is None:
             return
+        now = time.monotonic()
+        with self._status_lock:
+            for motor_id in motor_ids:
+                self._rates[motor_id].on_command(now)
+            job.set_interval(min(rate.interval for rate in self._rates.values()))
+    
+    def wait_until_reached(self, yaw_deg: Optional[float] = None, pitch_deg: Optional[float] = None,
+                           tolerance: float = DEFAULT_TOLERANCE,
+                           timeout: Optional[float] = DEFAULT_TIMEOUT) -> bool:
+        """
+        等待轴到达目标角度（由后台监控的每次轮询结果唤醒，不产生额外总线流量）
         
-        self._monitoring = False
-        self._stop_evt.set()
-        if self._poll_thread:
-            self._poll_thread.join(timeout=2.0)
-            self._poll_thread = None
-    
-    def _poll_loop(self, interval_s: float):
-        """轮询循环（在后台线程中运行）"""
-        while not self._stop_evt.is_set():
-            # 读取YAW状态
-            yaw_status = self._comm.read_status(self.yaw_id)
-            pitch_status = self._comm.read_status(self.pitch_id)
+        Args:
+            yaw_deg: YAW目标角度（度），None 表示不等待该轴
+            pitch_deg: PITCH目标角度（度），None 表示不等待该轴
+            tolerance: 到位容差（度）
+            timeout: 最长等待时间（秒），None 表示一直等待
             
-            with self._status_lock:
-                self._yaw_status = yaw_status
-                self._pitch_status = pitch_status
+        Returns:
+            指定的轴都到位返回True，超时或监控停止返回False
+        
+        Raises:
+            RuntimeError: 未启动监控
+            ValueError: 没有指定任何轴
+        """
+        return self._waiters.wait(self._wait_targets(yaw_deg, pitch_deg), tolerance, timeout)
+    
+    def wait_until_reached_future(self, yaw_deg: Optional[float] = None, pitch_deg: Optional[float] = None,
+                                  tolerance: float = DEFAULT_TOLERANCE,
+                                  timeout: Optional[float] = DEFAULT_TIMEOUT) -> Future:
+        """
+        同 wait_until_reached，但不阻塞：返回 Future，结果为 True（到位）或 False（超时/监控停止）
+        超时在轮询周期上判定，误差约一个轮询周期
+        """
+        return self._waiters.future(self._wait_targets(yaw_deg, pitch_deg), tolerance, timeout)
+    
+    async def wait_until_reached_async(self, yaw_deg: Optional[float] = None, pitch_deg: Optional[float] = None,
+                                       tolerance: float = DEFAULT_TOLERANCE,
+                                       timeout: Optional[float] = DEFAULT_TIMEOUT) -> bool:
+        """wait_until_reached 的协程版本（不占用事件循环线程）"""
+        return await asyncio.wrap_future(self.wait_until_reached_future(yaw_deg, pitch_deg, tolerance, timeout))
+    
+    def _wait_targets(self, yaw_deg: Optional[float], pitch_deg: Optional[float]) -> Dict[int, float]:
+        if self._poll_job is None:
+            raise RuntimeError('未启动监控，请先调用 start_monitoring()')
+        targets = {}
+        if yaw_deg is not None:
+            targets[self.yaw_id] = yaw_deg
+        if pitch_deg is not None:
+            targets[self.pitch_id] = pitch_deg
+        if not targets:
+            raise ValueError('至少指定一个轴的目标角度')
+        return targets
+    
+    def subscribe(self, callback: Optional[Callable[[StatusSample], None]] = None,
+                  maxsize: int = DEFAULT_MAXSIZE, deadband: Optional[float] = None,
+                  motor_ids: Optional[Iterable[int]] = None) -> Subscription:
+        """
+        订阅每个轮询周期的状态样本（需启动监控才有样本）
+        
+        Args:
+            callback: 回调 callback(sample)，在该订阅自己的线程中调用；None 表示用 sub.get() 取样本
+            maxsize: 队列长度，消费不及时丢弃最旧的样本，不会阻塞轮询
+            deadband: 角度死区（度），只在变化超过死区（或温度、读取成败变化）时投递；None 表示每个样本
+            motor_ids: 只接收这些电机的样本，None 表示全部
             
-            time.sleep(interval_s)
+        Returns:
+            Subscription，不再需要时调用 close()
+        """
+        return self._feed.subscribe(callback, maxsize, deadband, motor_ids)
+    
+    def get_history(self, motor_id: int, seconds: Optional[float] = None, last: Optional[int] = None,
+                    max_points: Optional[int] = None) -> Dict[str, Any]:
+        """
+        查询某个轴的遥测历史（后台监控的每个样本：时刻、原始角度、温度、当时的指令目标）
+        
+        Args:
+            motor_id: 电机地址（yaw_id 或 pitch_id）
+            seconds: 最近多少秒，None 表示全部
+            last: 最多最近多少个样本
+            max_points: 抽稀后最多多少个点
+            
+        Returns:
+            见 AxisHistory.window()；time 为 time.monotonic() 时刻
+        
+        Raises:
+            KeyError: 不是本控制器的电机
+        """
+        return self._history[motor_id].window(seconds, last, max_points)
+    
+    def get_history_stats(self) -> Dict[int, Dict[str, Any]]:
+        """各轴遥测历史的样本数、时间跨度与内存占用"""
+        return {motor_id: history.stats() for motor_id, history in self._history.items()}
     
     def get_yaw_status(self) -> Optional[Dict[str, Any]]:
         """获取YAW轴最新状态（缓存）"""
@@ -93,24 +321,30 @@ class PTZController:
         with self._status_lock:
             return self._pitch_status.copy() if self._pitch_status else None
     
-    def read_yaw_angle(self) -> Optional[float]:
+    def read_yaw_angle(self, max_age: float = 0.0) -> Optional[float]:
         """
         实时读取YAW轴角度（归一化到±180°）
         
+        Args:
+            max_age: 可接受的缓存结果年龄（秒），0表示总是实时读取（并发读取仍会合并）
+        
         Returns:
             角度值（度），失败返回None
         """
-        status = self._comm.read_status(self.yaw_id)
+        status = self._comm.read_status(self.yaw_id, max_age=max_age)
         return status['angle_deg'] if status else None
     
-    def read_pitch_angle(self) -> Optional[float]:
+    def read_pitch_angle(self, max_age: float = 0.0) -> Optional[float]:
         """
         实时读取PITCH轴角度（归一化到±180°）
         
+        Args:
+            max_age: 可接受的缓存结果年龄（秒），0表示总是实时读取（并发读取仍会合并）
+        
         Returns:
             角度值（度），失败返回None
         """
-        status = self._comm.read_status(self.pitch_id)
+        status = self._comm.read_status(self.pitch_id, max_age=max_age)
         return status['angle_deg'] if status else None
     
     def set_yaw_angle(self, target_deg: float, speed_rpm: int = 100) -> bool:
@@ -124,8 +358,7 @@ class PTZController:
         Returns:
             成功返回True
         """
-        result = self._comm.set_target_angle(self.yaw_id, target_deg, speed_rpm)
-        return result is not None and result.get('success', False)
+        return self.set_yaw_angle_result(target_deg, speed_rpm).ok
     
     def set_pitch_angle(self, target_deg: float, speed_rpm: int = 100) -> bool:
         """
@@ -138,8 +371,34 @@ class PTZController:
         Returns:
             成功返回True
         """
-        result = self._comm.set_target_angle(self.pitch_id, target_deg, speed_rpm)
-        return result is not None and result.get('success', False)
+        return self.set_pitch_angle_result(target_deg, speed_rpm).ok
+    
+    def set_yaw_angle_result(self, target_deg: float, speed_rpm: int = 100) -> TransactResult:
+        """
+        设置YAW轴目标角度，返回带失败原因的事务结果
+        
+        Returns:
+            TransactResult (status 为 'ok' 或 link_error / timeout / crc 等)
+        """
+        return self._set_angle_result(self.yaw_id, target_deg, speed_rpm)
+    
+    def set_pitch_angle_result(self, target_deg: float, speed_rpm: int = 100) -> TransactResult:
+        """
+        设置PITCH轴目标角度，返回带失败原因的事务结果
+        
+        Returns:
+            TransactResult (status 为 'ok' 或 link_error / timeout / crc 等)
+        """
+        return self._set_angle_result(self.pitch_id, target_deg, speed_rpm)
+    
+    def _set_angle_result(self, motor_id: int, target_deg: float, speed_rpm: int) -> TransactResult:
+        payload, target, _ = encode_target_angle(target_deg, speed_rpm)
+        # 响应按命令回显匹配，收到即表示电机已接受0xA4指令
+        result = self._comm.transact_result(motor_id, CMD_READ_STATUS_A4, payload)
+        if result.ok:
+            self._history[motor_id].set_target(target)
+            self._on_motion_command((motor_id,))
+        return result
     
     def set_ptz_angles(self, yaw_deg: float, pitch_deg: float, speed_rpm: int = 100) -> bool:
         """
@@ -153,10 +412,13 @@ class PTZController:
         Returns:
             两个轴都成功返回True
         """
-        yaw_ok = self.set_yaw_angle(yaw_deg, speed_rpm)
-        time.sleep(0.1)  # 两个电机指令间隔100ms
-        pitch_ok = self.set_pitch_angle(pitch_deg, speed_rpm)
-        return yaw_ok and pitch_ok
+        # 帧间静默间隔由通信层按波特率保证，不再固定等待100ms
+        yaw_result = self.set_yaw_angle_result(yaw_deg, speed_rpm)
+        if yaw_result.transport_down:
+            # 连接已断开，PITCH指令同样无法送达
+            return False
+        pitch_result = self.set_pitch_angle_result(pitch_deg, speed_rpm)
+        return yaw_result.ok and pitch_result.ok
     
     def shutdown_motors(self) -> bool:
         """
@@ -176,13 +438,20 @@ class PTZController:
             成功返回True
         """
         # 发送0xCD广播停止指令（一条指令同时控制所有电机）
-        return self._comm.broadcast_stop()
+        ok = self._comm.broadcast_stop()
+        if ok:
+            # 减速停下的过程按下限间隔跟踪
+            self._on_motion_command(self._rates)
+        return ok
     
     def close(self):
         """关闭控制器，释放资源"""
         self.stop_monitoring()
-        if self._comm:
-            self._comm.close()
+        self._feed.close()
+        self.stop_wire_capture()
+        if self._comm_acquired:
+            self._comm_acquired = False
+            release_bus(self._comm)
 
 
 # 便捷函数：快速创建PTZ控制器
@@ -0,0 +1,464 @@
+"""抓包回放：把现场记录的字节流送入 V4.3 解码栈做离线基准，或作为假网关驱动轮询循环。
+
+输入可以是 wire_capture.py 的环形抓包文件 (.wcap)，也可以是原始字节流文件
+(串口/网关收到的原始数据，例如从 tcpdump 导出的载荷)。
+
+decode: 依次测量各解码层的吞吐
+    extract_frames          整段字节流一次性提取
+    FrameDecoder            按 chunk 字节分批流式重组 (零拷贝路径，统计重新同步次数)
+    parse_frame             proto_v43 单帧校验与拆分
+    RS485Comm._parse_frame  通信层单帧解析
+    decode_status           0x94 状态字段解码 (read_status 使用)
+  报告每层的帧数、耗时、帧/秒，以及 tracemalloc 统计的峰值/残留分配。
+  --pace wire 按波特率的线路速度、--pace capture 按抓包时间戳把字节送入 FrameDecoder，
+  检验解码是否跟得上线路 (报告最大滞后)。
+
+poll: ReplayGateway 按抓包中每个 (电机ID, 命令) 的应答帧与应答延迟 (TX 到匹配 RX 的时间)
+  依次回放，抓包中超时的请求同样不应答。经 RS485Comm(transport=...) 以 socketpair 接入，
+  不经网络；PTZController / LiftMotorController 的轮询循环原样运行，报告事务统计。
+
+用法:
+    python replay.py decode bus.wcap
+    python replay.py decode rx_stream.bin --chunk 32 --pace wire
+    python replay.py poll bus.wcap --controller ptz --duration 10 --interval-ms 100
+    python replay.py poll bus.wcap --controller lift --motor-id 3 --speed 0
+"""
+from __future__ import annotations
+import itertools
+import json
+import socket
+import threading
+import time
+import tracemalloc
+from typing import Optional, Dict, Any, List, Tuple, Callable
+
+from proto_v43 import FRAME_SIZE, FrameDecoder, extract_frames, parse_frame
+from bus_timing import BusTiming, sleep_until
+from bus_registry import acquire_bus, release_bus
+from rs485_comm import RS485Comm, CMD_BROADCAST, CMD_READ_ANGLE, decode_status
+from ptz_controller import PTZController
+from lift_motor import LiftMotorController
+from wire_capture import MAGIC, read_capture
+
+PACE_WIRE = 'wire'
+PACE_CAPTURE = 'capture'
+
+_gateway_ids = itertools.count(1)
+
+
+class Capture:
+    """回放输入：RX 字节流，以及 (抓包文件时) 带时间戳的全部记录"""
+
+    def __init__(self, stream: bytes, rx_times: List[float], records: List[Dict[str, Any]]):
+        self.stream = stream
+        self.rx_times = rx_times        # stream 中各 RX 帧的 monotonic 时间 (原始字节流为空)
+        self.records = records
+
+
+def load_capture(path: str) -> Capture:
+    """读取抓包文件 (.wcap) 或原始字节流文件"""
+    with open(path, 'rb') as f:
+        head = f.read(len(MAGIC))
+    if head == MAGIC:
+        records = list(read_capture(path))
+        rx = [r for r in records if r['dir'] == 'rx']
+        return Capture(b''.join(r['frame'] for r in rx), [r['monotonic'] for r in rx], records)
+    with open(path, 'rb') as f:
+        return Capture(f.read(), [], [])
+
+
+# ---- 解码基准 ----
+
+def _decode_stream(stream: bytes, chunk: int, frames: Optional[List[bytes]] = None) -> FrameDecoder:
+    """按 chunk 字节分批走 FrameDecoder 零拷贝路径 (与 RS485Comm 接收相同)"""
+    dec = FrameDecoder()
+    buf = dec.buffer
+    view = memoryview(stream)
+    pos = 0
+    total = len(stream)
+    while pos < total:
+        with dec.window(chunk) as win:
+            n = min(len(win), total - pos)
+            win[:n] = view[pos:pos + n]
+        dec.commit(n)
+        pos += n
+        off = dec.next_frame()
+        while off >= 0:
+            if frames is not None:
+                frames.append(bytes(buf[off:off + FRAME_SIZE]))
+            off = dec.next_frame()
+    return dec
+
+
+def _measure(fn: Callable[[], int], repeat: int) -> Dict[str, Any]:
+    """计时 repeat 次，再在 tracemalloc 下单独运行一次统计分配 (不计入耗时)"""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        frames = fn()
+    seconds = time.perf_counter() - started
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        fn()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'frames': frames,
+        'seconds': round(seconds, 6),
+        'frames_per_s': round(frames * repeat / seconds) if seconds > 0 else 0,
+        'peak_bytes': peak - base,
+        'retained_bytes': current - base,
+    }
+
+
+def replay_decode(capture: Capture, chunk: int = 64, repeat: int = 1) -> Dict[str, Any]:
+    """尽快回放：逐层测量解码吞吐、重新同步次数与分配"""
+    stream = capture.stream
+    frames: List[bytes] = []
+    dec = _decode_stream(stream, chunk, frames)
+    status_data = [frame[3:3 + 8] for frame in frames if frame[3] == CMD_READ_ANGLE]
+    comm_parse = RS485Comm._parse_frame      # 不依赖实例状态
+
+    def stage_extract():
+        return len(extract_frames(stream))
+
+    def stage_decoder():
+        return _decode_stream(stream, chunk).frames
+
+    def stage_parse():
+        return sum(1 for frame in frames if parse_frame(frame) is not None)
+
+    def stage_comm_parse():
+        return sum(1 for frame in frames if comm_parse(None, frame) is not None)
+
+    def stage_status():
+        return sum(1 for data in status_data if decode_status(data) is not None)
+
+    stages = {}
+    for name, fn in (('extract_frames', stage_extract), ('frame_decoder', stage_decoder),
+                     ('parse_frame', stage_parse), ('comm_parse_frame', stage_comm_parse),
+                     ('decode_status', stage_status)):
+        stages[name] = _measure(fn, repeat)
+    return {
+        'bytes': len(stream),
+        'frames': dec.frames,
+        'resyncs': dec.resyncs,
+        'discarded': dec.discarded,
+        'chunk': chunk,
+        'repeat': repeat,
+        'stages': stages,
+    }
+
+
+def replay_paced(capture: Capture, pace: str = PACE_WIRE, chunk: int = 64,
+                 baudrate: int = 115200) -> Dict[str, Any]:
+    """按线路速度 (wire) 或抓包时间戳 (capture) 送入 FrameDecoder，统计处理滞后"""
+    stream = capture.stream
+    timing = BusTiming(baudrate)
+    if pace == PACE_CAPTURE:
+        if not capture.rx_times:
+            raise ValueError('原始字节流没有时间戳，只能按 wire 速度回放')
+        t0 = capture.rx_times[0]
+        schedule = [(i * FRAME_SIZE, (i + 1) * FRAME_SIZE, t - t0) for i, t in enumerate(capture.rx_times)]
+    elif pace == PACE_WIRE:
+        schedule = [(pos, min(pos + chunk, len(stream)), timing.wire_time(min(pos + chunk, len(stream))))
+                    for pos in range(0, len(stream), chunk)]
+    else:
+        raise ValueError(f'unknown pace: {pace}')
+    dec = FrameDecoder()
+    view = memoryview(stream)
+    lag_max = 0.0
+    lag_total = 0.0
+    started = time.monotonic()
+    for start, end, offset in schedule:
+        due = started + offset
+        sleep_until(due)
+        pos = start
+        while pos < end:
+            with dec.window(end - pos) as win:
+                n = len(win)
+                win[:n] = view[pos:pos + n]
+            dec.commit(n)
+            pos += n
+            while dec.next_frame() >= 0:
+                pass
+        lag = time.monotonic() - due
+        lag_total += lag
+        if lag > lag_max:
+            lag_max = lag
+    seconds = time.monotonic() - started
+    return {
+        'pace': pace,
+        'frames': dec.frames,
+        'resyncs': dec.resyncs,
+        'seconds': round(seconds, 6),
+        'frames_per_s': round(dec.frames / seconds) if seconds > 0 else 0,
+        'max_lag_ms': round(lag_max * 1000.0, 3),
+        'avg_lag_ms': round(lag_total / len(schedule) * 1000.0, 3) if schedule else 0.0,
+    }
+
+
+# ---- 假网关 ----
+
+class ReplayGateway:
+    """按抓包应答的假网关
+
+    每个 (电机ID, 命令) 的应答按记录顺序循环使用：(应答延迟, 应答帧)，
+    应答帧为 None 表示现场该请求超时，回放时同样不应答。抓包中没有的请求不应答。
+
+    Args:
+        replies: {(电机ID, 命令): [(延迟秒, 帧或None), ...]}
+        speed: 回放速度倍数；1.0 为现场时序，0 为不等待立即应答
+    """
+
+    def __init__(self, replies: Dict[Tuple[int, int], List[Tuple[float, Optional[bytes]]]],
+                 speed: float = 1.0):
+        self.port = 'replay-%d:0' % next(_gateway_ids)     # 注册表键，不会真正连接
+        self._replies = replies
+        self._speed = speed
+        self._next: Dict[Tuple[int, int], int] = {}
+        self._lock = threading.Lock()
+        self._socks: List[socket.socket] = []
+        self._closed = False
+        self.requests = 0
+        self.replied = 0
+        self.dropped = 0
+        self.unknown = 0
+
+    @classmethod
+    def from_capture(cls, capture: Capture, speed: float = 1.0,
+                     default_latency: Optional[float] = None) -> 'ReplayGateway':
+        """由抓包记录建立应答表；原始字节流没有请求记录，按帧的 (ID, 命令回显) 以固定延迟应答"""
+        replies: Dict[Tuple[int, int], List[Tuple[float, Optional[bytes]]]] = {}
+        if not capture.records:
+            latency = BusTiming().reply_time if default_latency is None else default_latency
+            frames: List[bytes] = []
+            _decode_stream(capture.stream, 256, frames)
+            for frame in frames:
+                replies.setdefault((frame[1], frame[3]), []).append((latency, frame))
+            return cls(replies, speed)
+        pending: List[Tuple[int, int, float]] = []      # 尚未应答的请求 (电机ID, 命令, 发送时刻)
+        for record in capture.records:
+            direction = record['dir']
+            if direction == 'tx':
+                if record['motor_id'] != CMD_BROADCAST:
+                    pending.append((record['motor_id'], record['frame'][3], record['monotonic']))
+            elif direction == 'rx':
+                if record['result'] != 'matched':
+                    continue
+                key = (record['motor_id'], record['frame'][3])
+                for i, (motor_id, cmd, sent) in enumerate(pending):
+                    if (motor_id, cmd) == key:
+                        del pending[i]
+                        replies.setdefault(key, []).append((record['monotonic'] - sent, record['frame']))
+                        break
+            elif record['result'] != 'ok':
+                for i, (motor_id, cmd, sent) in enumerate(pending):
+                    if motor_id == record['motor_id']:
+                        del pending[i]
+                        replies.setdefault((motor_id, cmd), []).append((0.0, None))
+                        break
+        return cls(replies, speed)
+
+    def connect(self) -> socket.socket:
+        """RS485Comm 的 transport 工厂：返回 socketpair 的一端，另一端由回放线程应答"""
+        ours, theirs = socket.socketpair()
+        with self._lock:
+            if self._closed:
+                ours.close()
+                theirs.close()
+                raise ConnectionError('replay gateway closed')
+            self._socks.append(ours)
+        threading.Thread(target=self._serve, args=(ours,), daemon=True,
+                         name=f'replay {self.port}').start()
+        return theirs
+
+    def _serve(self, sock: socket.socket):
+        dec = FrameDecoder()
+        buf = dec.buffer
+        try:
+            while True:
+                with dec.window() as win:
+                    n = sock.recv_into(win)
+                if not n:
+                    return
+                dec.commit(n)
+                arrived = time.monotonic()
+                off = dec.next_frame()
+                while off >= 0:
+                    self._answer(sock, buf[off + 1], buf[off + 3], arrived)
+                    off = dec.next_frame()
+        except OSError:
+            return
+        finally:
+            sock.close()
+
+    def _answer(self, sock: socket.socket, motor_id: int, cmd: int, arrived: float):
+        key = (motor_id, cmd)
+        with self._lock:
+            self.requests += 1
+            if motor_id == CMD_BROADCAST:
+                return
+            seq = self._replies.get(key)
+            if not seq:
+                self.unknown += 1
+                return
+            i = self._next.get(key, 0)
+            self._next[key] = i + 1
+            latency, frame = seq[i % len(seq)]
+            if frame is None:
+                self.dropped += 1
+                return
+            self.replied += 1
+        if self._speed > 0:
+            sleep_until(arrived + latency / self._speed)
+        sock.sendall(frame)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'keys': len(self._replies),
+                'requests': self.requests,
+                'replied': self.replied,
+                'dropped': self.dropped,
+                'unknown': self.unknown,
+            }
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            socks, self._socks = self._socks, []
+        for sock in socks:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+def bench_poll(gateway: ReplayGateway, controller: str = 'ptz', duration: float = 5.0,
+               interval_ms: int = 100, yaw_id: int = 1, pitch_id: int = 2, motor_id: int = 3,
+               baudrate: int = 115200) -> Dict[str, Any]:
+    """让控制器的轮询循环对着回放网关运行 duration 秒，返回事务统计"""
+    bus = acquire_bus(gateway.port, baudrate, transport=gateway.connect, auto_reconnect=False)
+    try:
+        if controller == 'ptz':
+            ctl = PTZController(port=gateway.port, baudrate=baudrate, yaw_id=yaw_id, pitch_id=pitch_id)
+        elif controller == 'lift':
+            ctl = LiftMotorController(port=gateway.port, baudrate=baudrate, motor_id=motor_id)
+        else:
+            raise ValueError(f'unknown controller: {controller}')
+        try:
+            started = time.monotonic()
+            ctl.start_monitoring(interval_ms)
+            time.sleep(duration)
+            poll = ctl.get_poll_stats()
+            ctl.stop_monitoring()
+            elapsed = time.monotonic() - started
+            metrics = bus.metrics_snapshot()
+        finally:
+            ctl.close()
+    finally:
+        release_bus(bus)
+    totals = metrics['totals']
+    commands = {}
+    for key, m in metrics['commands'].items():
+        commands[key] = {
+            'transactions': m['transactions'],
+            'successes': m['successes'],
+            'failed': m['failed'],
+            'frame_p50_ms': m['frame']['p50_ms'],
+            'frame_p99_ms': m['frame']['p99_ms'],
+        }
+    return {
+        'controller': controller,
+        'duration_s': round(elapsed, 3),
+        'interval_ms': interval_ms,
+        'transactions': totals['transactions'],
+        'successes': totals['successes'],
+        'failed': totals['failed'],
+        'transactions_per_s': round(totals['transactions'] / elapsed, 1) if elapsed > 0 else 0.0,
+        'errors': {name: n for name, n in totals['errors'].items() if n},
+        'commands': commands,
+        'poll': {
+            'rate_hz': poll['rate_hz'],
+            'cycles': poll['cycles'],
+            'overruns': poll['overruns'],
+            'skipped': poll['skipped'],
+            'lateness_p99_ms': poll['lateness']['p99_ms'],
+            'jitter_p99_ms': poll['jitter']['p99_ms'],
+        },
+        'gateway': gateway.stats(),
+    }
+
+
+def _format_bytes(n: int) -> str:
+    return f'{n / 1024.0:.1f} KB' if abs(n) >= 1024 else f'{n} B'
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='抓包回放：解码基准 / 假网关驱动轮询循环')
+    sub = parser.add_subparsers(dest='mode', required=True)
+    p_decode = sub.add_parser('decode', help='回放字节流测量解码栈')
+    p_decode.add_argument('path', help='抓包文件 (.wcap) 或原始字节流文件')
+    p_decode.add_argument('--chunk', type=int, default=64, help='每次送入 FrameDecoder 的字节数 (默认: 64)')
+    p_decode.add_argument('--repeat', type=int, default=1, help='尽快回放时的重复次数 (默认: 1)')
+    p_decode.add_argument('--pace', choices=(PACE_WIRE, PACE_CAPTURE), default=None,
+                          help='按线路速度或抓包时间戳回放 (默认: 尽快)')
+    p_decode.add_argument('--baudrate', type=int, default=115200)
+    p_decode.add_argument('--json', action='store_true', help='输出JSON')
+    p_poll = sub.add_parser('poll', help='回放网关驱动控制器轮询循环')
+    p_poll.add_argument('path', help='抓包文件 (.wcap) 或原始字节流文件')
+    p_poll.add_argument('--controller', choices=('ptz', 'lift'), default='ptz')
+    p_poll.add_argument('--duration', type=float, default=5.0, help='运行秒数 (默认: 5)')
+    p_poll.add_argument('--interval-ms', type=int, default=100, help='轮询间隔 (默认: 100)')
+    p_poll.add_argument('--speed', type=float, default=1.0, help='回放速度倍数，0为立即应答 (默认: 1.0)')
+    p_poll.add_argument('--yaw-id', type=int, default=1)
+    p_poll.add_argument('--pitch-id', type=int, default=2)
+    p_poll.add_argument('--motor-id', type=int, default=3, help='升降电机ID (默认: 3)')
+    p_poll.add_argument('--json', action='store_true', help='输出JSON')
+    args = parser.parse_args()
+
+    capture = load_capture(args.path)
+    if args.mode == 'decode':
+        if args.pace:
+            result = replay_paced(capture, args.pace, args.chunk, args.baudrate)
+        else:
+            result = replay_decode(capture, args.chunk, args.repeat)
+        if args.json:
+            print(json.dumps(result, indent=2))
+        elif args.pace:
+            print(f"{args.path}: {result['frames']} 帧, 重新同步 {result['resyncs']} 次, "
+                  f"{result['seconds']:.3f} s ({result['frames_per_s']} 帧/s), "
+                  f"滞后 平均 {result['avg_lag_ms']} ms / 最大 {result['max_lag_ms']} ms")
+        else:
+            print(f"{args.path}: {result['bytes']} 字节, {result['frames']} 帧, "
+                  f"重新同步 {result['resyncs']} 次 (丢弃 {result['discarded']} 字节)")
+            for name, stage in result['stages'].items():
+                print(f"  {name:<18} {stage['frames']:>8} 帧  {stage['seconds'] * 1000.0:>9.3f} ms  "
+                      f"{stage['frames_per_s']:>10} 帧/s  峰值分配 {_format_bytes(stage['peak_bytes']):>9}  "
+                      f"残留 {_format_bytes(stage['retained_bytes'])}")
+        return
+
+    gateway = ReplayGateway.from_capture(capture, speed=args.speed)
+    try:
+        result = bench_poll(gateway, args.controller, args.duration, args.interval_ms,
+                            args.yaw_id, args.pitch_id, args.motor_id)
+    finally:
+        gateway.close()
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    print(f"{args.controller}: {result['duration_s']} s, {result['transactions']} 事务 "
+          f"({result['transactions_per_s']}/s), 成功 {result['successes']}, 失败 {result['failed']} {result['errors']}")
+    for key, m in result['commands'].items():
+        print(f"  {key:<8} 成功 {m['successes']:>6}  失败 {m['failed']:>4}  "
+              f"整帧 p50 {m['frame_p50_ms']} ms  p99 {m['frame_p99_ms']} ms")
+    print(f"  轮询: {result['poll']}")
+    print(f"  回放网关: {result['gateway']}")
+
+
+if __name__ == '__main__':
+    main()
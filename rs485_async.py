@@ -0,0 +1,253 @@
+"""RS485 异步通信层：RS485Comm 的 asyncio 版本 (协议V4.3)。
+
+- TCP网关 (host:port): asyncio.open_connection
+- 串口: 非阻塞 pyserial + loop.add_reader 监听 fd (需 POSIX 系统)；写出与 flush 会阻塞
+  到帧发送完毕，放到线程池执行 (loop.run_in_executor)，不占用事件循环
+
+一个事件循环可同时驱动多条总线及大量并发等待者，不需要每个请求占一个线程。
+同一总线上的事务由 asyncio.Lock 串行化 (RS485半双工)，等待锁的协程不占线程。
+
+用法:
+    async with AsyncRS485Comm('192.168.25.78:502') as comm:
+        status = await comm.read_status(1)
+"""
+from __future__ import annotations
+import asyncio
+import time
+from typing import Optional, Dict, Any, Tuple
+import serial  # type: ignore
+from proto_v43 import build_frame, fixed_frame, FrameDecoder
+from bus_timing import BusTiming
+from rs485_comm import (
+    CMD_READ_ANGLE, CMD_READ_STATUS_A4, CMD_CLOSE, CMD_STOP, CMD_BROADCAST,
+    decode_angle, decode_status, encode_target_angle, decode_target_reply, decode_ack,
+)
+
+
+class AsyncRS485Comm:
+    """RS485 异步通信类，方法与 RS485Comm 一致，均为协程"""
+
+    def __init__(self, port: str, baudrate: int = 115200, timeout: float = 0.2, max_retries: int = 3,
+                 timing: Optional[BusTiming] = None):
+        self._port = port
+        self._baudrate = baudrate
+        self._timeout = timeout
+        self._max_retries = max_retries
+        self._tcp_mode = bool(port) and (":" in port)
+        self._available = False
+        self._lock: Optional[asyncio.Lock] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._decoder = FrameDecoder()
+        # 当前等待的响应: (motor_id, cmd, future)
+        self._waiter: Optional[Tuple[int, int, asyncio.Future]] = None
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._ser = None
+        # 帧间时序 (同 RS485Comm)：下一帧最早可以开始发送的时刻
+        self._timing = timing if timing is not None else BusTiming(baudrate)
+        self._quiet_until = 0.0
+
+    @property
+    def available(self) -> bool:
+        return self._available
+
+    async def open(self) -> bool:
+        """建立连接，成功返回True"""
+        self._loop = asyncio.get_running_loop()
+        self._lock = asyncio.Lock()
+        if self._tcp_mode:
+            host, port_str = self._port.split(":", 1)
+            try:
+                self._reader, self._writer = await asyncio.wait_for(
+                    asyncio.open_connection(host, int(port_str)), self._timeout)
+                self._reader_task = self._loop.create_task(self._tcp_read_loop())
+                self._available = True
+            except Exception:
+                self._available = False
+        else:
+            try:
+                self._ser = serial.Serial(port=self._port, baudrate=self._baudrate, timeout=0)
+                self._loop.add_reader(self._ser.fileno(), self._on_serial_readable)
+                self._available = True
+            except Exception:
+                if self._ser is not None:
+                    self._ser.close()
+                self._ser = None
+                self._available = False
+        return self._available
+
+    async def __aenter__(self) -> 'AsyncRS485Comm':
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def _dispatch(self, chunk: bytes):
+        """字节流送入重组器，完整帧交给当前等待者"""
+        self._quiet_until = time.monotonic() + self._timing.command_gap
+        for resp_id, data in self._decoder.feed(chunk):
+            waiter = self._waiter
+            if waiter is None:
+                continue
+            motor_id, cmd, fut = waiter
+            if resp_id == motor_id and data[0] == cmd and not fut.done():
+                fut.set_result(data)
+
+    def _fail_waiter(self, exc: Exception):
+        waiter = self._waiter
+        if waiter is not None and not waiter[2].done():
+            waiter[2].set_exception(exc)
+
+    async def _tcp_read_loop(self):
+        try:
+            while True:
+                chunk = await self._reader.read(256)
+                if not chunk:
+                    raise ConnectionError('TCP连接已被对端关闭')
+                self._dispatch(chunk)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._available = False
+            self._fail_waiter(e)
+
+    def _on_serial_readable(self):
+        try:
+            chunk = self._ser.read(self._ser.in_waiting or 1)
+        except Exception as e:
+            self._loop.remove_reader(self._ser.fileno())
+            self._available = False
+            self._fail_waiter(e)
+            return
+        if chunk:
+            self._dispatch(chunk)
+
+    async def _write(self, frame: bytes, gap: Optional[float] = None):
+        """等待上一帧后的静默间隔结束再发送，并记录本帧之后需要的静默时间"""
+        timing = self._timing
+        delay = self._quiet_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self._tcp_mode:
+            self._writer.write(frame)
+            await self._writer.drain()
+            tx_end = time.monotonic() + timing.wire_time(len(frame))
+        else:
+            # 串口写出后 flush 等待发送完毕 (同 RS485Comm)，返回时帧已离开串口
+            await self._loop.run_in_executor(None, self._serial_write, frame)
+            tx_end = time.monotonic()
+        self._quiet_until = tx_end + (timing.command_gap if gap is None else gap)
+
+    def _serial_write(self, frame: bytes):
+        """在线程池中运行：写出并等待发送完毕"""
+        self._ser.write(frame)
+        self._ser.flush()
+
+    def _build_frame(self, motor_id: int, cmd: int, payload: bytes = b'') -> bytes:
+        if not payload:
+            return fixed_frame(motor_id & 0xFF, cmd)
+        return build_frame(motor_id, cmd, payload)
+
+    async def transact(self, motor_id: int, cmd: int, payload: bytes = b'', timeout: float = None) -> Optional[bytes]:
+        """发送命令并等待响应，返回数据区8字节或None"""
+        if timeout is None:
+            timeout = self._timeout
+        if self._lock is None:
+            return None
+        frame = self._build_frame(motor_id, cmd, payload)
+        for attempt in range(self._max_retries + 1):
+            async with self._lock:
+                if not self._available:
+                    return None
+                fut = self._loop.create_future()
+                self._waiter = (motor_id, cmd, fut)
+                try:
+                    await self._write(frame)
+                    data = await asyncio.wait_for(fut, timeout)
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    data = None
+                finally:
+                    self._waiter = None
+            if data is not None:
+                return data
+            if attempt == self._max_retries:
+                return None
+        return None
+
+    async def read_angle(self, motor_id: int) -> Optional[float]:
+        """读取单圈角度 (命令0x94)，返回归一化角度(度)或None"""
+        return decode_angle(await self.transact(motor_id, CMD_READ_ANGLE))
+
+    async def read_status(self, motor_id: int) -> Optional[Dict[str, Any]]:
+        """读取电机状态 (命令0x94)，返回字典或None (格式同 RS485Comm.read_status)"""
+        return decode_status(await self.transact(motor_id, CMD_READ_ANGLE))
+
+    async def set_target_angle(self, motor_id: int, target_deg: float, speed_rpm: int = 100) -> Optional[Dict[str, Any]]:
+        """设置电机目标角度 (命令0xA4)，返回响应字典或None"""
+        payload, target_deg, angle_control = encode_target_angle(target_deg, speed_rpm)
+        data = await self.transact(motor_id, CMD_READ_STATUS_A4, payload)
+        return decode_target_reply(data, target_deg, speed_rpm, angle_control)
+
+    async def close_motor(self, motor_id: int) -> Optional[Dict[str, Any]]:
+        """发送电机关闭指令 (命令0x80)"""
+        return decode_ack(await self.transact(motor_id, CMD_CLOSE), CMD_CLOSE)
+
+    async def stop_motor(self, motor_id: int) -> Optional[Dict[str, Any]]:
+        """发送电机停止指令 (命令0x81)"""
+        return decode_ack(await self.transact(motor_id, CMD_STOP), CMD_STOP)
+
+    async def _broadcast(self, cmd: int) -> bool:
+        """发送广播帧。帧已写出返回True；连接不可用或写出失败返回False (与 RS485Comm 一致)"""
+        if self._lock is None:
+            return False
+        frame = fixed_frame(CMD_BROADCAST, cmd)
+        async with self._lock:
+            if not self._available:
+                return False
+            try:
+                # 广播指令无响应，帧发出即返回 (静默时间由下一帧发送前等待)
+                await self._write(frame, self._timing.broadcast_gap)
+                return True
+            except OSError:
+                # 连接已失效 (含 ConnectionError / SerialException)
+                self._available = False
+                return False
+            except Exception:
+                return False
+
+    async def broadcast_shutdown(self) -> bool:
+        """广播关闭所有电机 (命令0xCD, 数据0x80)，返回广播帧是否已写出"""
+        return await self._broadcast(CMD_CLOSE)
+
+    async def broadcast_stop(self) -> bool:
+        """广播停止所有电机 (命令0xCD, 数据0x81)，返回广播帧是否已写出"""
+        return await self._broadcast(CMD_STOP)
+
+    async def close(self):
+        """关闭串口或TCP连接"""
+        self._available = False
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            try:
+                await self._reader_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._reader_task = None
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except Exception:
+                pass
+            self._writer = None
+        if self._ser is not None:
+            try:
+                self._loop.remove_reader(self._ser.fileno())
+            except Exception:
+                pass
+            self._ser.close()
+            self._ser = None
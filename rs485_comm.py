@@ -2,12 +2,25 @@
 支持命令发送、响应解析、重试与超时。
 """
 from __future__ import annotations
+import os
+import struct
 import time
 import threading
-from typing import Optional, Dict, Any
+import selectors
+from collections import deque
+from typing import Optional, Dict, Any, List, Tuple, Callable, Iterable
 import serial  # type: ignore
 from pymodbus.client import ModbusSerialClient, ModbusTcpClient
 import socket
+from crc16 import modbus_crc, check_crc  # modbus_crc 保留导出，兼容旧脚本
+from proto_v43 import build_frame, build_frame_into, fixed_frame, FrameDecoder
+from rtt_estimator import AdaptiveTimeouts
+from bus_timing import BusTiming, sleep_until
+from wire_capture import WireCapture
+from bus_metrics import (BusMetrics, CommandMetrics, FAIL_TIMEOUT, FAIL_CRC, FAIL_ID_MISMATCH,
+                         FAIL_CMD_MISMATCH, FAIL_LINK_ERROR, FAIL_INTERRUPTED, FAIL_QUARANTINED,
+                         FAIL_UNAVAILABLE, FAIL_REASONS, N_TRANSACTIONS, N_ATTEMPTS, N_RETRIES,
+                         N_SUCCESSES, N_FAILED)
 
 # 协议常量
 FRAME_HEADER = 0x3E
@@ -22,66 +35,441 @@ CMD_CLOSE = 0x80
 CMD_STOP = 0x81
 CMD_BROADCAST = 0xCD  # 广播地址，用于同时控制多个电机
 
-def modbus_crc(data: bytes) -> int:
-    """Modbus CRC16 计算"""
-    crc = 0xFFFF
-    for b in data:
-        crc ^= b
-        for _ in range(8):
-            if crc & 0x0001:
-                crc = (crc >> 1) ^ 0xA001
-            else:
-                crc >>= 1
-    return crc & 0xFFFF
+# 数据区字段的预编译解包格式 (直接从 bytes / memoryview 中按偏移读取，不切片)
+ANGLE_STRUCT = struct.Struct('<H')          # data[6:8] 单圈角度 uint16 (0.01°)
+STATUS_STRUCT = struct.Struct('<Bb4BH')     # 0x94: 命令回显, 温度int8, 保留4字节, 角度uint16
+TEMP_STRUCT = struct.Struct('<b')           # data[1] 温度 int8
+TARGET_STRUCT = struct.Struct('<BHi')       # 0xA4 payload: 保留, 速度uint16, 位置int32
+
+
+def decode_angle(data: bytes) -> Optional[float]:
+    """从0x94响应数据区解析归一化角度 (-180° ~ +180°)"""
+    if data is None or len(data) < 8:
+        return None
+    # 最后2字节为角度 uint16 (0.01°)
+    raw, = ANGLE_STRUCT.unpack_from(data, 6)
+    angle = raw / 100.0
+    # 归一化到 -180 ~ +180
+    if angle > 180.0:
+        angle -= 360.0
+    return angle
+
+
+def decode_status(data: bytes) -> Optional[Dict[str, Any]]:
+    """解析0x94响应数据区为状态字典 (格式见 RS485Comm.read_status)"""
+    if data is None or len(data) != DATA_SIZE:
+        return None
+    
+    # Byte1: 电机温度 (int8_t, 1℃/LSB)；Byte6-7: 单圈角度
+    cmd_echo, temperature, reserved_2, reserved_3, reserved_4, reserved_5, angle_raw = \
+        STATUS_STRUCT.unpack_from(data)
+    angle_0_360 = angle_raw / 100.0
+    # 归一化到 -180 ~ +180
+    angle_deg = angle_0_360 - 360.0 if angle_0_360 > 180.0 else angle_0_360
+    
+    return {
+        'cmd_echo': f'0x{cmd_echo:02X}',
+        'angle_raw': angle_raw,
+        'angle_0_360': angle_0_360,
+        'angle_deg': angle_deg,
+        'temperature': temperature,
+        'reserved_bytes': [reserved_2, reserved_3, reserved_4, reserved_5],
+        'raw_hex': data.hex()
+    }
+
+
+def encode_target_angle(target_deg: float, speed_rpm: int = 100) -> tuple[bytes, float, int]:
+    """构建0xA4命令payload (Byte1-7)。返回 (payload, 归一化目标角度, angle_control)"""
+    # 归一化角度到 -180 ~ +180
+    if target_deg > 180.0:
+        target_deg -= 360.0
+    elif target_deg < -180.0:
+        target_deg += 360.0
+    
+    # 转换为 0.01°/LSB 的 int32
+    angle_control = int(target_deg * 100)
+    # 检查是否在 int32_t 范围内
+    if not (-2147483648 <= angle_control <= 2147483647):
+        raise ValueError(f"angle_control {angle_control} out of int32_t range")
+    
+    # 构建payload (注意: Byte1=0x00保留字节)
+    # Byte2-3: 速度限制 uint16；Byte4-7: 位置控制 int32_t (little-endian)
+    payload = TARGET_STRUCT.pack(0x00, speed_rpm & 0xFFFF, angle_control)
+    return payload, target_deg, angle_control
+
+
+def decode_target_reply(data: bytes, target_deg: float, speed_rpm: int,
+                        angle_control: int) -> Optional[Dict[str, Any]]:
+    """解析0xA4响应数据区 (格式见 RS485Comm.set_target_angle)"""
+    if data is None or len(data) != DATA_SIZE:
+        return None
+    
+    cmd_echo = data[0]
+    # Byte1: 电机温度 (int8_t, 1℃/LSB)
+    temperature, = TEMP_STRUCT.unpack_from(data, 1)
+    
+    return {
+        'cmd_echo': f'0x{cmd_echo:02X}',
+        'success': cmd_echo == CMD_READ_STATUS_A4,
+        'target_deg': target_deg,
+        'speed_rpm': speed_rpm,
+        'angle_control': angle_control,
+        'temperature': temperature,
+        'raw_hex': data.hex()
+    }
+
+
+def decode_ack(data: bytes, cmd: int) -> Optional[Dict[str, Any]]:
+    """解析0x80/0x81等应答数据区，只判断命令回显"""
+    if data is None or len(data) != DATA_SIZE:
+        return None
+    
+    cmd_echo = data[0]
+    
+    return {
+        'cmd_echo': f'0x{cmd_echo:02X}',
+        'success': cmd_echo == cmd,
+        'raw_hex': data.hex()
+    }
+
+
+# 事务结果状态: 'ok' 或失败原因 (与 bus_metrics.FAIL_REASONS 相同)
+STATUS_OK = 'ok'
+TRANSPORT_DOWN = frozenset(('link_error', 'unavailable'))
+MOTOR_ABSENT = frozenset(('timeout', 'quarantined'))
+RETRYABLE = frozenset(('crc', 'id_mismatch', 'cmd_mismatch'))
+
+
+class TransactResult:
+    """一次事务 (含重试) 的结果
+
+    Attributes:
+        status: 'ok' 或失败原因 —— link_error / unavailable (连接不可用，整个请求应立即失败)，
+                timeout / quarantined (电机无应答，不必马上再试)，
+                crc / id_mismatch / cmd_mismatch (线路干扰，电机在线，可立即重试)
+        attempts: 实际发送次数 (隔离期或连接不可用时为0)
+        elapsed: 总耗时(秒)，含重试
+        data: 响应数据区8字节，失败为None
+    """
+
+    __slots__ = ('status', 'attempts', 'elapsed', 'data')
+
+    def __init__(self, status: str, attempts: int = 0, elapsed: float = 0.0, data: Optional[bytes] = None):
+        self.status = status
+        self.attempts = attempts
+        self.elapsed = elapsed
+        self.data = data
+
+    @property
+    def ok(self) -> bool:
+        return self.data is not None
+
+    @property
+    def transport_down(self) -> bool:
+        return self.status in TRANSPORT_DOWN
+
+    @property
+    def motor_absent(self) -> bool:
+        return self.status in MOTOR_ABSENT
+
+    @property
+    def retryable(self) -> bool:
+        return self.status in RETRYABLE
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'status': self.status, 'attempts': self.attempts,
+                'elapsed_ms': round(self.elapsed * 1000.0, 3)}
+
+    def __repr__(self) -> str:
+        return (f'TransactResult({self.status!r}, attempts={self.attempts}, '
+                f'elapsed={self.elapsed * 1000.0:.3f}ms, data={self.data!r})')
+
+
+class BusInterrupted(Exception):
+    """事务被 RS485Comm.interrupt() 中断 (调度器插入更高优先级的帧)"""
+
+
+# 连接状态
+STATE_CONNECTING = 'connecting'
+STATE_CONNECTED = 'connected'
+STATE_DISCONNECTED = 'disconnected'
+STATE_CLOSED = 'closed'
+
+# TCP keepalive 参数 (秒): 空闲5s开始探测，每2s一次，3次无响应判定断开
+KEEPALIVE_IDLE = 5
+KEEPALIVE_INTERVAL = 2
+KEEPALIVE_COUNT = 3
+
 
 class RS485Comm:
-    """RS485 通信类，使用协议V4.3 (0x3E帧头)"""
+    """RS485 通信类，使用协议V4.3 (0x3E帧头)
+    
+    连接状态机: connecting -> connected <-> disconnected -> ... -> closed
+    - 首次连接在构造函数中同步进行，available 立即反映结果
+    - 读到EOF(recv返回b'')或收发出现I/O错误时立即判定断开
+    - 断开期间事务立即失败返回None，不消耗重试
+    - 后台线程按指数退避 (reconnect_min ~ reconnect_max 秒) 重连
+    - 状态变化通过 add_state_listener 注册的回调通知: callback(old_state, new_state)
+
+    帧间时序由 timing (默认按 baudrate 推导的 BusTiming) 决定：每帧发送前只等到
+    上一帧最后一个字节之后的静默间隔结束，不再使用固定睡眠。
+
+    每个 (电机ID, 命令) 的写出/首字节/整帧延迟直方图与失败原因计数见 metrics_snapshot()。
+
+    transport 为连接工厂 (返回已连接的 socket，如 socket.socketpair() 的一端)，给定时代替
+    按 port 建立TCP/串口连接，按TCP网关模式收发；重连时再次调用。供回放 (replay.py) 等
+    不接硬件的场景使用。
+
+    capture (wire_capture.WireCapture) 不为 None 时，收发的每一帧与每次尝试的结果
+    写入环形抓包文件 (总线锁内写入，见 set_capture)。
+    """
     
-    def __init__(self, port: str, baudrate: int = 115200, timeout: float = 0.2, max_retries: int = 3):
+    def __init__(self, port: str, baudrate: int = 115200, timeout: float = 0.2, max_retries: int = 3,
+                 auto_reconnect: bool = True, reconnect_min: float = 0.05, reconnect_max: float = 5.0,
+                 min_timeout: float = 0.005, timing: Optional[BusTiming] = None,
+                 capture: Optional[WireCapture] = None,
+                 transport: Optional[Callable[[], socket.socket]] = None):
         self._lock = threading.Lock()
         self._port = port
         self._baudrate = baudrate
         self._timeout = timeout
         self._max_retries = max_retries
-        self._tcp_mode = False
-        self._tcp_sock = None
         # 支持TCP RTU: 传入格式 host:port 例如 192.168.25.78:502
-        if port and (":" in port):
-            host, port_str = port.split(":", 1)
+        self._transport = transport
+        self._tcp_mode = transport is not None or (bool(port) and (":" in port))
+        self._tcp_sock = None
+        self._ser = None
+        self._selector: Optional[selectors.BaseSelector] = None
+        self._decoder = FrameDecoder()
+        # 预分配发送缓冲区：带参数的命令帧原地构建，流水线批量帧连续存放
+        self._tx = bytearray(FRAME_SIZE * 16)
+        self._tx_view = memoryview(self._tx)
+        self._tx_frame = self._tx_view[:FRAME_SIZE]
+        self._available = False
+        self._state = STATE_CONNECTING
+        self._state_lock = threading.Lock()
+        self._state_listeners: List[Callable[[str, str], None]] = []
+        self._generation = 0          # 每次建立连接+1，避免重复处理同一连接的断开
+        self._auto_reconnect = auto_reconnect
+        self._reconnect_min = reconnect_min
+        self._reconnect_max = reconnect_max
+        self._reconnect_evt = threading.Event()
+        self._closed_evt = threading.Event()
+        # 中断唤醒: interrupt() 写入 _wakeup_w，使等待中的 selector 立即返回
+        self._interrupted = False
+        self._wakeup_r, self._wakeup_w = socket.socketpair()
+        self._wakeup_r.setblocking(False)
+        self._wakeup_w.setblocking(False)
+        self._reconnect_thread: Optional[threading.Thread] = None
+        self.reconnect_count = 0
+        # 总线时序；_quiet_until 为下一帧最早可以开始发送的时刻 (最后一个字节 + 静默间隔)
+        self._timing = timing if timing is not None else BusTiming(baudrate)
+        self._quiet_until = 0.0
+        # 按 (电机ID, 命令) 学习的自适应超时与电机隔离；超时下限不低于一次请求-应答的总线时间
+        self._rtt = AdaptiveTimeouts(min_timeout=max(min_timeout, self._timing.reply_time), max_timeout=timeout)
+        # 事务级延迟直方图与失败原因计数 (在 _lock 内更新)
+        self._metrics = BusMetrics()
+        self._fail_reason = FAIL_TIMEOUT
+        # 抓包 (在 _lock 内写入)；由调用方负责关闭
+        self._capture = capture
+        
+        if self._connect():
+            self._set_state(STATE_CONNECTED)
+        else:
+            self._set_state(STATE_DISCONNECTED)
+        if auto_reconnect:
+            self._reconnect_thread = threading.Thread(target=self._reconnect_loop, daemon=True)
+            self._reconnect_thread.start()
+            if not self._available:
+                self._reconnect_evt.set()
+
+    def _open_tcp(self) -> socket.socket:
+        host, port_str = self._port.split(":", 1)
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(self._timeout)
+            sock.connect((host, int(port_str)))
+            # 13字节小帧，关闭Nagle避免发送被合并延迟
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            # TCP keepalive: 网关掉电/网线断开时由内核探测出半开连接
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            for opt, value in (('TCP_KEEPIDLE', KEEPALIVE_IDLE),
+                               ('TCP_KEEPINTVL', KEEPALIVE_INTERVAL),
+                               ('TCP_KEEPCNT', KEEPALIVE_COUNT)):
+                if hasattr(socket, opt):
+                    sock.setsockopt(socket.IPPROTO_TCP, getattr(socket, opt), value)
+        except Exception:
+            sock.close()
+            raise
+        return sock
+
+    def _connect(self) -> bool:
+        """建立连接 (TCP或串口)，成功返回True。连接过程不持有 _lock"""
+        tcp_sock = None
+        ser = None
+        try:
+            if self._transport is not None:
+                tcp_sock = self._transport()
+            elif self._tcp_mode:
+                tcp_sock = self._open_tcp()
+            else:
+                ser = serial.Serial(
+                    port=self._port,
+                    baudrate=self._baudrate,
+                    timeout=self._timeout
+                )
+            selector = self._make_selector(tcp_sock, ser)
+        except Exception:
+            if tcp_sock is not None:
+                tcp_sock.close()
+            if ser is not None:
+                ser.close()
+            return False
+        with self._lock:
+            if self._closed_evt.is_set():
+                if tcp_sock is not None:
+                    tcp_sock.close()
+                if ser is not None:
+                    ser.close()
+                if selector is not None:
+                    selector.close()
+                return False
+            self._tcp_sock = tcp_sock
+            self._ser = ser
+            self._selector = selector
+            self._decoder.reset()
+            self._generation += 1
+            self._available = True
+        return True
+
+    def _make_selector(self, tcp_sock, ser) -> Optional[selectors.BaseSelector]:
+        """为 socket / 串口 fd 创建 selector；不支持 fileno 的串口返回 None"""
+        if tcp_sock is not None:
+            fileobj = tcp_sock
+        else:
+            try:
+                fileobj = ser.fileno()
+            except (AttributeError, OSError):
+                return None
+            # 由 selector 负责等待，读操作只取已到达的数据
+            ser.timeout = 0
+        sel = selectors.DefaultSelector()
+        sel.register(fileobj, selectors.EVENT_READ)
+        sel.register(self._wakeup_r, selectors.EVENT_READ, data=self._wakeup_r)
+        return sel
+
+    def _release_link(self):
+        """关闭当前连接对象 (需持有 _lock)"""
+        self._available = False
+        if self._selector is not None:
+            self._selector.close()
+            self._selector = None
+        if self._tcp_sock is not None:
             try:
-                tcp_port = int(port_str)
-                self._tcp_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                self._tcp_sock.settimeout(timeout)
-                self._tcp_sock.connect((host, tcp_port))
-                self._available = True
-                self._tcp_mode = True
+                self._tcp_sock.close()
             except Exception:
-                self._tcp_sock = None
-                self._available = False
-        else:
+                pass
+            self._tcp_sock = None
+        if self._ser is not None:
             try:
-                self._ser = serial.Serial(
-                    port=port,
-                    baudrate=baudrate,
-                    timeout=timeout
-                )
-                self._available = True
+                self._ser.close()
+            except Exception:
+                pass
+            self._ser = None
+
+    def _on_link_error(self, generation: int):
+        """收发出现I/O错误或EOF：释放连接，进入断开状态并唤醒重连线程"""
+        with self._lock:
+            if generation != self._generation or not self._available:
+                return
+            self._release_link()
+        self._set_state(STATE_DISCONNECTED)
+        self._reconnect_evt.set()
+
+    def _reconnect_loop(self):
+        """后台重连线程：断开后按指数退避重试连接"""
+        while not self._closed_evt.is_set():
+            self._reconnect_evt.wait()
+            if self._closed_evt.is_set():
+                return
+            self._reconnect_evt.clear()
+            delay = self._reconnect_min
+            while not self._available and not self._closed_evt.is_set():
+                self._set_state(STATE_CONNECTING)
+                if self._connect():
+                    self.reconnect_count += 1
+                    self._set_state(STATE_CONNECTED)
+                    break
+                self._set_state(STATE_DISCONNECTED)
+                if self._closed_evt.wait(delay):
+                    return
+                delay = min(delay * 2, self._reconnect_max)
+
+    def _set_state(self, new_state: str):
+        with self._state_lock:
+            old_state = self._state
+            if old_state == new_state or old_state == STATE_CLOSED:
+                return
+            self._state = new_state
+        for callback in list(self._state_listeners):
+            try:
+                callback(old_state, new_state)
             except Exception:
-                self._ser = None
-                self._available = False
+                pass
+
+    def add_state_listener(self, callback: Callable[[str, str], None]):
+        """注册连接状态变化回调 callback(old_state, new_state)，在触发变化的线程中调用"""
+        self._state_listeners.append(callback)
+
+    def remove_state_listener(self, callback: Callable[[str, str], None]):
+        if callback in self._state_listeners:
+            self._state_listeners.remove(callback)
+
+    @property
+    def state(self) -> str:
+        """连接状态: connecting / connected / disconnected / closed"""
+        return self._state
 
     @property
     def available(self) -> bool:
         return self._available
 
+    @property
+    def timing(self) -> BusTiming:
+        """总线时序参数"""
+        return self._timing
+
+    @property
+    def busy_until(self) -> float:
+        """总线静默期结束的 monotonic 时刻 (如广播后电机执行指令期间)，下一帧在此之后发送"""
+        return self._quiet_until
+
+    def rtt_stats(self) -> Dict[str, Any]:
+        """导出自适应超时统计 (每个电机/命令的SRTT、当前超时、隔离状态)"""
+        return self._rtt.snapshot()
+
+    def metrics_snapshot(self) -> Dict[str, Any]:
+        """导出事务统计 (每个电机/命令的延迟直方图、重试次数与失败原因，见 bus_metrics)"""
+        return self._metrics.snapshot()
+
+    def reset_metrics(self):
+        """清零事务统计"""
+        self._metrics.reset()
+
+    def set_capture(self, capture: Optional[WireCapture]) -> Optional[WireCapture]:
+        """开启 (传入 WireCapture) 或关闭 (None) 抓包，返回之前的抓包对象供调用方关闭"""
+        with self._lock:
+            previous, self._capture = self._capture, capture
+        return previous
+
     def _build_frame(self, motor_id: int, cmd: int, payload: bytes = b'') -> bytes:
-        """构建命令帧。payload附加在cmd后，数据区总长度8字节"""
-        if len(payload) > DATA_SIZE - 1:
-            raise ValueError('payload too long')
-        data = bytes([cmd]) + payload + bytes([0x00] * (DATA_SIZE - 1 - len(payload)))
-        body = bytes([FRAME_HEADER, motor_id & 0xFF, DATA_LENGTH]) + data
-        crc = modbus_crc(body)
-        return body + bytes([crc & 0xFF, (crc >> 8) & 0xFF])
+        """构建命令帧。payload附加在cmd后，数据区总长度8字节
+        
+        无参数命令 (0x94/0x80/0x81/广播) 直接取缓存帧，不重复计算CRC。
+        """
+        if not payload:
+            return fixed_frame(motor_id & 0xFF, cmd)
+        return build_frame(motor_id, cmd, payload)
 
     def _parse_frame(self, frame: bytes) -> Optional[tuple[int, bytes]]:
         """解析响应帧。返回 (motor_id, data8bytes) 或 None"""
@@ -91,85 +479,459 @@ class RS485Comm:
             return None
         if frame[2] != DATA_LENGTH:
             return None
-        # 验证CRC
-        body = frame[:-2]
-        crc_calc = modbus_crc(body)
-        crc_lo = frame[-2]
-        crc_hi = frame[-1]
-        crc_recv = crc_lo | (crc_hi << 8)
-        if crc_calc != crc_recv:
+        # 验证CRC (整帧CRC为0即合法)
+        if not check_crc(frame):
             return None
         motor_id = frame[1]
         data = frame[3:3+DATA_SIZE]
         return motor_id, data
 
+    def _frame_into_tx(self, motor_id: int, cmd: int, payload: bytes = b''):
+        """返回待发送的命令帧：无参数命令取缓存帧，其余写入发送缓冲区开头并返回其视图 (调用时持有 _lock)"""
+        if not payload:
+            return fixed_frame(motor_id & 0xFF, cmd)
+        build_frame_into(self._tx, 0, motor_id, cmd, payload)
+        return self._tx_frame
+
+    def _frames_into_tx(self, requests: List[Tuple[int, int, bytes]], indices: List[int]) -> memoryview:
+        """多个命令帧连续写入发送缓冲区，返回待发送部分的视图 (调用时持有 _lock)"""
+        size = FRAME_SIZE * len(indices)
+        if size > len(self._tx):
+            self._tx = bytearray(size)
+            self._tx_view = memoryview(self._tx)
+            self._tx_frame = self._tx_view[:FRAME_SIZE]
+        tx = self._tx
+        offset = 0
+        for i in indices:
+            motor_id, cmd, payload = requests[i]
+            if payload:
+                build_frame_into(tx, offset, motor_id, cmd, payload)
+            else:
+                tx[offset:offset + FRAME_SIZE] = fixed_frame(motor_id & 0xFF, cmd)
+            offset += FRAME_SIZE
+        return self._tx_view[:size]
+
+    def _send(self, frame: bytes, gap: Optional[float] = None) -> float:
+        """发送帧 (串口模式发送前清空接收缓冲)，返回开始写出的时刻。
+
+        发送前等待上一帧之后的静默间隔结束；发送后把总线静默的起点记为本帧最后一个
+        字节离开线路的时刻，之后的静默时间为 gap (默认 timing.command_gap)。
+        """
+        timing = self._timing
+        sleep_until(self._quiet_until)
+        if self._capture is not None:
+            self._capture.tx(frame)
+        tx_start = time.monotonic()
+        if self._tcp_mode:
+            self._tcp_sock.sendall(frame)
+            # 网关收到后才开始在 RS485 上发送，按线路传输时间估计最后一个字节的时刻
+            tx_end = time.monotonic() + timing.wire_time(len(frame))
+        else:
+            self._ser.reset_input_buffer()
+            self._decoder.reset()
+            self._ser.write(frame)
+            self._ser.flush()
+            tx_end = time.monotonic()
+        self._quiet_until = tx_end + (timing.command_gap if gap is None else gap)
+        return tx_start
+
+    def _recv_into(self, deadline: float, size: Optional[int] = None) -> bool:
+        """等待数据到达后直接读入 FrameDecoder 的缓冲区 (recv_into / readv，无中间bytes)。
+
+        到达截止时间返回False。使用 selectors 监听 socket / 串口 fd，数据到达即唤醒，
+        不再以 1ms 睡眠轮询；截止时间基于 time.monotonic()。
+        调用前应已用 next_frame() 取完缓冲区中的完整帧。
+        """
+        decoder = self._decoder
+        if self._selector is None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            # 串口无 fileno (Windows)：退回 pyserial 自身的阻塞读+超时，只读一帧剩余字节
+            self._ser.timeout = remaining
+            with decoder.window(size) as win:
+                n = self._ser.readinto(win)
+            if not n:
+                return False
+            decoder.commit(n)
+            self._quiet_until = time.monotonic() + self._timing.command_gap
+            return True
+        grace_deadline = None
+        while True:
+            now = time.monotonic()
+            if self._interrupted:
+                # 无半帧在途时立即中断；响应正在到达时给它一帧时间收完
+                if decoder.pending == 0 or (grace_deadline is not None and now >= grace_deadline):
+                    self._interrupted = False
+                    raise BusInterrupted()
+                if grace_deadline is None:
+                    grace_deadline = now + self._timing.frame_time
+            wait_until = deadline if grace_deadline is None else min(deadline, grace_deadline)
+            remaining = wait_until - now
+            if remaining <= 0:
+                if now >= deadline:
+                    return False
+                continue
+            events = self._selector.select(remaining)
+            if not events:
+                if time.monotonic() >= deadline:
+                    return False
+                continue
+            link_ready = False
+            for key, _ in events:
+                if key.data is self._wakeup_r:
+                    self._drain_wakeup()
+                else:
+                    link_ready = True
+            if link_ready:
+                break
+        with decoder.window() as win:
+            if self._tcp_mode:
+                n = self._tcp_sock.recv_into(win)
+                if not n:
+                    raise ConnectionError('TCP连接已被对端关闭')
+            else:
+                n = os.readv(self._ser.fileno(), (win,))
+                if not n:
+                    raise serial.SerialException('串口可读但未返回数据 (设备已断开?)')
+        decoder.commit(n)
+        # 刚收到的字节是总线上最新的活动，静默间隔从此刻算起
+        self._quiet_until = time.monotonic() + self._timing.command_gap
+        return True
+
+    def _discard_stale(self):
+        """丢弃缓冲区中上一次事务剩下的完整帧 (迟到的旧响应等)，保留半帧"""
+        decoder = self._decoder
+        capture = self._capture
+        off = decoder.next_frame()
+        while off >= 0:
+            if capture is not None:
+                capture.rx(decoder.buffer, off, False)
+            off = decoder.next_frame()
+
+    def _drain_wakeup(self):
+        try:
+            while self._wakeup_r.recv(64):
+                pass
+        except OSError:
+            # 已读空 (BlockingIOError)，或 close() 之后 socketpair 已关闭
+            pass
+
+    def interrupt(self):
+        """中断当前事务的等待 (可从其他线程调用)。
+
+        被中断的 transact / transact_many 抛出 BusInterrupted；若中断时没有事务
+        在进行，则下一次事务在发送前被中断。调度器在开始新事务前调用 clear_interrupt()。
+        """
+        self._interrupted = True
+        try:
+            self._wakeup_w.send(b'\x00')
+        except OSError:
+            pass
+
+    def clear_interrupt(self):
+        """清除尚未生效的中断请求"""
+        self._interrupted = False
+        self._drain_wakeup()
+
+    def _check_interrupt(self, metrics: Iterable[CommandMetrics]):
+        """发送前检查尚未生效的中断请求，计入 metrics 的 interrupted 后抛出 (调用时持有 _lock)"""
+        if self._interrupted:
+            self._interrupted = False
+            for m in metrics:
+                m.reasons[FAIL_INTERRUPTED] += 1
+            raise BusInterrupted()
+
+    def _recv_reply(self, motor_id: int, cmd: int, timeout: float,
+                    sent_at: float, m: CommandMetrics) -> Optional[bytes]:
+        """等待指定电机、指定命令回显的响应帧，返回数据区8字节，超时返回None。
+
+        字节流经 FrameDecoder 重组：噪声字节、其他电机或迟到的旧响应帧
+        被直接丢弃并继续等待，不会让本次事务失败重试。
+        首字节与整帧的到达时间 (自 sent_at 起) 记入 m；超时时 _fail_reason 记录
+        期间是否只收到其他电机ID / 其他命令回显的帧。
+        """
+        deadline = time.monotonic() + timeout
+        decoder = self._decoder
+        buf = decoder.buffer
+        reason = FAIL_TIMEOUT
+        first = True
+        capture = self._capture
+        while self._recv_into(deadline, FRAME_SIZE - decoder.pending):
+            if first:
+                m.first_byte.add(time.monotonic() - sent_at)
+                first = False
+            off = decoder.next_frame()
+            while off >= 0:
+                if capture is not None:
+                    capture.rx(buf, off, buf[off + 1] == motor_id and buf[off + 3] == cmd)
+                if buf[off + 1] == motor_id:
+                    if buf[off + 3] == cmd:
+                        m.frame.add(time.monotonic() - sent_at)
+                        return decoder.data(off)
+                    reason = FAIL_CMD_MISMATCH
+                elif reason == FAIL_TIMEOUT:
+                    reason = FAIL_ID_MISMATCH
+                off = decoder.next_frame()
+        self._fail_reason = reason
+        return None
+
+    def _exempt_from_quarantine(self, cmd: int) -> bool:
+        """隔离只拦截读命令；运动/停止/关闭指令始终尝试发送"""
+        return cmd != CMD_READ_ANGLE
+
     def transact(self, motor_id: int, cmd: int, payload: bytes = b'', timeout: float = None) -> Optional[bytes]:
-        """发送命令并等待响应，返回数据区8字节或None"""
-        if timeout is None:
-            timeout = self._timeout
-        frame = self._build_frame(motor_id, cmd, payload)
-        for attempt in range(self._max_retries + 1):
+        """发送命令并等待响应，返回数据区8字节或None (失败原因见 transact_result)"""
+        return self.transact_result(motor_id, cmd, payload, timeout).data
+
+    def transact_result(self, motor_id: int, cmd: int, payload: bytes = b'',
+                        timeout: float = None) -> TransactResult:
+        """发送命令并等待响应，返回 TransactResult (状态、发送次数、耗时、数据区)
+        
+        timeout 为 None 时使用按 (电机ID, 命令) 学习到的自适应超时；无应答的重试超时加倍，
+        CRC错误/ID或回显不符说明电机在线，按原超时立即重试。
+        处于隔离期的电机读取直接返回 quarantined (运动/停止/关闭指令照常发送)，连接断开立即返回。
+        """
+        started = time.monotonic()
+        rtt = self._rtt
+        m = self._metrics.entry(motor_id, cmd)
+        exempt = self._exempt_from_quarantine(cmd)
+        if not exempt and rtt.is_quarantined(motor_id):
+            with self._lock:
+                m.counts[N_TRANSACTIONS] += 1
+                m.reasons[FAIL_QUARANTINED] += 1
+                m.counts[N_FAILED] += 1
+            return TransactResult(FAIL_REASONS[FAIL_QUARANTINED], 0, 0.0)
+        attempt_timeout = rtt.timeout_for(motor_id, cmd) if timeout is None else timeout
+        if timeout is None and not exempt:
+            retries = rtt.retries_for(motor_id, self._max_retries)
+        else:
+            retries = self._max_retries
+        decoder = self._decoder
+        reason = FAIL_TIMEOUT
+        attempts = 0
+        for attempt in range(retries + 1):
+            link_error = False
             with self._lock:
+                if not attempt:
+                    m.counts[N_TRANSACTIONS] += 1
                 if not self._available:
-                    return None
+                    m.reasons[FAIL_UNAVAILABLE] += 1
+                    m.counts[N_FAILED] += 1
+                    return TransactResult(FAIL_REASONS[FAIL_UNAVAILABLE], attempts, time.monotonic() - started)
+                generation = self._generation
+                self._check_interrupt((m,))
+                attempts += 1
+                m.counts[N_ATTEMPTS] += 1
+                if attempt:
+                    m.counts[N_RETRIES] += 1
+                reason = FAIL_TIMEOUT
                 try:
-                    if self._tcp_mode and self._tcp_sock:
-                        self._tcp_sock.sendall(frame)
-                        t0 = time.time()
-                        buf = b''
-                        while time.time() - t0 < timeout:
-                            remaining = FRAME_SIZE - len(buf)
-                            if remaining > 0:
-                                chunk = self._tcp_sock.recv(remaining)
-                                if chunk:
-                                    buf += chunk
-                            if len(buf) >= FRAME_SIZE:
-                                break
-                            time.sleep(0.001)
-                        if len(buf) < FRAME_SIZE:
-                            if attempt == self._max_retries:
-                                return None
-                            time.sleep(0.01)
-                            continue
-                    else:
-                        self._ser.reset_input_buffer()
-                        self._ser.write(frame)
-                        self._ser.flush()
-                        t0 = time.time()
-                        buf = b''
-                        while time.time() - t0 < timeout:
-                            remaining = FRAME_SIZE - len(buf)
-                            if remaining > 0:
-                                chunk = self._ser.read(remaining)
-                                if chunk:
-                                    buf += chunk
-                            if len(buf) >= FRAME_SIZE:
-                                break
-                            time.sleep(0.001)
-                        if len(buf) < FRAME_SIZE:
-                            if attempt == self._max_retries:
-                                return None
-                            time.sleep(0.01)
-                            continue
+                    frame = self._frame_into_tx(motor_id, cmd, payload)
+                    self._discard_stale()
+                    resyncs = decoder.resyncs
+                    sent_at = self._send(frame)
+                    m.write.add(time.monotonic() - sent_at)
+                    data = self._recv_reply(motor_id, cmd, attempt_timeout, sent_at, m)
+                    if data is None:
+                        reason = FAIL_CRC if decoder.resyncs != resyncs else self._fail_reason
+                except BusInterrupted:
+                    m.reasons[FAIL_INTERRUPTED] += 1
+                    raise
+                except OSError:
+                    # 含 ConnectionError(EOF) / SerialException：连接已失效
+                    data = None
+                    link_error = True
                 except Exception:
-                    if attempt == self._max_retries:
-                        return None
-                    time.sleep(0.01)
-                    continue
-            parsed = self._parse_frame(buf[:FRAME_SIZE])
-            if parsed is None:
-                if attempt == self._max_retries:
-                    return None
-                time.sleep(0.01)
-                continue
-            resp_id, data = parsed
-            if resp_id != motor_id:
-                if attempt == self._max_retries:
-                    return None
-                time.sleep(0.01)
-                continue
-            return data
-        return None
+                    data = None
+                if link_error:
+                    m.reasons[FAIL_LINK_ERROR] += 1
+                    m.counts[N_FAILED] += 1
+                elif data is not None:
+                    m.counts[N_SUCCESSES] += 1
+                else:
+                    m.reasons[reason] += 1
+                    if attempt == retries:
+                        m.counts[N_FAILED] += 1
+                if self._capture is not None:
+                    self._capture.result(motor_id, FAIL_LINK_ERROR if link_error
+                                         else None if data is not None else reason)
+            if link_error:
+                self._on_link_error(generation)
+                return TransactResult(FAIL_REASONS[FAIL_LINK_ERROR], attempts, time.monotonic() - started)
+            if data is not None:
+                now = time.monotonic()
+                rtt.on_success(motor_id, cmd, now - sent_at)
+                return TransactResult(STATUS_OK, attempts, now - started, data)
+            if reason == FAIL_TIMEOUT:
+                # CRC错误/ID或回显不符说明电机在线，不计入超时
+                rtt.on_timeout(motor_id, cmd)
+            if attempt == retries:
+                break
+            if timeout is None and reason == FAIL_TIMEOUT:
+                attempt_timeout = rtt.backoff_timeout(attempt_timeout)
+        rtt.on_failure(motor_id)
+        return TransactResult(FAIL_REASONS[reason], attempts, time.monotonic() - started)
+
+    def _recv_replies(self, requests: List[Tuple[int, int, bytes]], pending: List[int],
+                      results: List[Optional[bytes]], timeout: float, sent_at: float,
+                      metrics: List[CommandMetrics]):
+        """流水线接收：按 (电机ID, 命令回显) 把到达的响应帧填入 results 对应位置。
+
+        同一 (ID, 命令) 出现多次时按发送顺序依次匹配。全部匹配或超时返回。
+        只有第一个到达的响应计入往返时间样本 (后续响应包含排队等待时间)。
+        批次的首字节时间记入批次中每个请求，整帧时间按各自响应到达的时刻记录。
+        """
+        deadline = time.monotonic() + timeout
+        decoder = self._decoder
+        buf = decoder.buffer
+        waiting: Dict[Tuple[int, int], deque] = {}
+        for i in pending:
+            motor_id, cmd, _ = requests[i]
+            waiting.setdefault((motor_id & 0xFF, cmd), deque()).append(i)
+        remaining = len(pending)
+        first = True
+        first_byte = True
+        capture = self._capture
+        while remaining and self._recv_into(deadline):
+            if first_byte:
+                elapsed = time.monotonic() - sent_at
+                for i in pending:
+                    metrics[i].first_byte.add(elapsed)
+                first_byte = False
+            off = decoder.next_frame()
+            while off >= 0:
+                resp_id, echo = buf[off + 1], buf[off + 3]
+                slots = waiting.get((resp_id, echo))
+                if capture is not None:
+                    capture.rx(buf, off, bool(slots))
+                if slots:
+                    i = slots.popleft()
+                    results[i] = decoder.data(off)
+                    metrics[i].frame.add(time.monotonic() - sent_at)
+                    remaining -= 1
+                    self._rtt.on_success(resp_id, echo, time.monotonic() - sent_at if first else None)
+                    first = False
+                off = decoder.next_frame()
+
+    def transact_many(self, requests: List[Tuple[int, int, bytes]], timeout: float = None) -> List[Optional[bytes]]:
+        """批量事务：requests 为 [(motor_id, cmd, payload), ...]，返回对应的数据区列表(失败项为None)"""
+        return [result.data for result in self.transact_many_results(requests, timeout)]
+
+    def transact_many_results(self, requests: List[Tuple[int, int, bytes]],
+                              timeout: float = None) -> List[TransactResult]:
+        """批量事务，返回与 requests 对应的 TransactResult 列表。
+
+        TCP网关模式下流水线发送：所有命令帧连续发出，再按电机ID和命令回显
+        (data[0]) 匹配陆续到达的响应，一次扫描只花一个网络往返加总线传输时间。
+        超时与重试按请求计算，只重发未收到响应的请求。
+        要求网关按顺序转发并排队处理请求 (Modbus网关的常规行为)。
+
+        串口模式下RS485半双工不能并发，退化为逐个 transact。
+        """
+        if not self._tcp_mode:
+            return [self.transact_result(motor_id, cmd, payload, timeout)
+                    for motor_id, cmd, payload in requests]
+        started = time.monotonic()
+        results: List[Optional[bytes]] = [None] * len(requests)
+        # 各请求的最近失败原因与发送次数，结束时转换为 TransactResult
+        reasons = [FAIL_QUARANTINED] * len(requests)
+        attempts = [0] * len(requests)
+        durations: List[float] = [0.0] * len(requests)
+        rtt = self._rtt
+        metrics = [self._metrics.entry(motor_id, cmd) for motor_id, cmd, _ in requests]
+        pending = [i for i, (motor_id, cmd, _) in enumerate(requests)
+                   if not rtt.is_quarantined(motor_id) or self._exempt_from_quarantine(cmd)]
+        with self._lock:
+            for m in metrics:
+                m.counts[N_TRANSACTIONS] += 1
+            if len(pending) != len(requests):
+                for i in set(range(len(requests))).difference(pending):
+                    metrics[i].reasons[FAIL_QUARANTINED] += 1
+                    metrics[i].counts[N_FAILED] += 1
+        budget = {i: (self._max_retries if timeout is not None or self._exempt_from_quarantine(requests[i][1])
+                      else rtt.retries_for(requests[i][0], self._max_retries)) for i in pending}
+        attempt = 0
+        while pending:
+            if timeout is None:
+                # 每个请求按自己的超时排队累计，重试时加倍
+                batch_timeout = sum(rtt.timeout_for(requests[i][0], requests[i][1]) for i in pending)
+                batch_timeout = min(self._timeout, batch_timeout * (2 ** attempt))
+            else:
+                batch_timeout = timeout
+            link_error = False
+            with self._lock:
+                if not self._available:
+                    for i in pending:
+                        metrics[i].reasons[FAIL_UNAVAILABLE] += 1
+                        metrics[i].counts[N_FAILED] += 1
+                        reasons[i] = FAIL_UNAVAILABLE
+                    break
+                generation = self._generation
+                self._check_interrupt([metrics[i] for i in pending])
+                for i in pending:
+                    attempts[i] += 1
+                    metrics[i].counts[N_ATTEMPTS] += 1
+                    if attempt:
+                        metrics[i].counts[N_RETRIES] += 1
+                reason = FAIL_TIMEOUT
+                try:
+                    frames = self._frames_into_tx(requests, pending)
+                    self._discard_stale()
+                    resyncs = self._decoder.resyncs
+                    sent_at = self._send(frames)
+                    elapsed = time.monotonic() - sent_at
+                    for i in pending:
+                        metrics[i].write.add(elapsed)
+                    self._recv_replies(requests, pending, results, batch_timeout, sent_at, metrics)
+                    if self._decoder.resyncs != resyncs:
+                        reason = FAIL_CRC
+                except BusInterrupted:
+                    for i in pending:
+                        metrics[i].reasons[FAIL_INTERRUPTED] += 1
+                    raise
+                except OSError:
+                    link_error = True
+                except Exception:
+                    pass
+                now = time.monotonic()
+                for i in pending:
+                    durations[i] = now - started
+                    if link_error:
+                        metrics[i].reasons[FAIL_LINK_ERROR] += 1
+                        metrics[i].counts[N_FAILED] += 1
+                        reasons[i] = FAIL_LINK_ERROR
+                    elif results[i] is not None:
+                        metrics[i].counts[N_SUCCESSES] += 1
+                    else:
+                        metrics[i].reasons[reason] += 1
+                        reasons[i] = reason
+                        if budget[i] <= attempt:
+                            metrics[i].counts[N_FAILED] += 1
+                if self._capture is not None:
+                    for i in pending:
+                        self._capture.result(requests[i][0], None if results[i] is not None else reasons[i])
+            if link_error:
+                self._on_link_error(generation)
+                break
+            failed = [i for i in pending if results[i] is None]
+            for i in failed:
+                if reasons[i] == FAIL_TIMEOUT:
+                    rtt.on_timeout(requests[i][0], requests[i][1])
+            pending = [i for i in failed if budget[i] > attempt]
+            for i in failed:
+                if budget[i] <= attempt:
+                    rtt.on_failure(requests[i][0])
+            if pending:
+                attempt += 1
+        return [TransactResult(STATUS_OK, attempts[i], durations[i], data) if data is not None
+                else TransactResult(FAIL_REASONS[reasons[i]], attempts[i], durations[i])
+                for i, data in enumerate(results)]
+
+    def read_status_many(self, motor_ids: List[int]) -> Dict[int, Optional[Dict[str, Any]]]:
+        """一次扫描读取多个电机状态 (0x94，流水线)，返回 {motor_id: 状态字典或None}"""
+        datas = self.transact_many([(motor_id, CMD_READ_ANGLE, b'') for motor_id in motor_ids])
+        return {motor_id: decode_status(data) for motor_id, data in zip(motor_ids, datas)}
 
     def read_angle(self, motor_id: int) -> Optional[float]:
         """读取单圈角度 (命令0x94)，返回角度值(度)或None
@@ -183,15 +945,7 @@ class RS485Comm:
         返回值: -180.00° ~ +180.00° (超过180°转换为负角度)
         """
         data = self.transact(motor_id, CMD_READ_ANGLE)
-        if data is None or len(data) < 8:
-            return None
-        # 最后2字节为角度 uint16 (0.01°)
-        raw = int.from_bytes(data[6:8], 'little', signed=False)
-        angle = raw / 100.0
-        # 归一化到 -180 ~ +180
-        if angle > 180.0:
-            angle -= 360.0
-        return angle
+        return decode_angle(data)
 
     def read_status(self, motor_id: int) -> Optional[Dict[str, Any]]:
         """读取电机状态（角度+温度+其他数据），返回字典或None
@@ -203,30 +957,7 @@ class RS485Comm:
           Byte6-7: 单圈角度 uint16 (0.01°/LSB, 0-35999 => 0-359.99°)
         """
         data = self.transact(motor_id, CMD_READ_ANGLE)
-        if data is None or len(data) != DATA_SIZE:
-            return None
-        
-        cmd_echo = data[0]
-        # Byte1: 电机温度 (int8_t, 1℃/LSB)
-        temperature = int.from_bytes([data[1]], 'little', signed=True)
-        reserved_2 = data[2]
-        reserved_3 = data[3]
-        reserved_4 = data[4]
-        reserved_5 = data[5]
-        angle_raw = int.from_bytes(data[6:8], 'little', signed=False)
-        angle_0_360 = angle_raw / 100.0
-        # 归一化到 -180 ~ +180
-        angle_deg = angle_0_360 - 360.0 if angle_0_360 > 180.0 else angle_0_360
-        
-        return {
-            'cmd_echo': f'0x{cmd_echo:02X}',
-            'angle_raw': angle_raw,
-            'angle_0_360': angle_0_360,
-            'angle_deg': angle_deg,
-            'temperature': temperature,
-            'reserved_bytes': [reserved_2, reserved_3, reserved_4, reserved_5],
-            'raw_hex': data.hex()
-        }
+        return decode_status(data)
 
     def set_target_angle(self, motor_id: int, target_deg: float, speed_rpm: int = 100) -> Optional[Dict[str, Any]]:
         """设置电机目标角度（命令0xA4）
@@ -255,52 +986,9 @@ class RS485Comm:
         
         返回: 响应字典或None
         """
-        # 归一化角度到 -180 ~ +180
-        if target_deg > 180.0:
-            target_deg -= 360.0
-        elif target_deg < -180.0:
-            target_deg += 360.0
-        
-        # 转换为 0.01°/LSB 的 int32
-        angle_control = int(target_deg * 100)
-        # 检查是否在 int32_t 范围内
-        if not (-2147483648 <= angle_control <= 2147483647):
-            raise ValueError(f"angle_control {angle_control} out of int32_t range")
-        
-        # 构建payload (注意: Byte1=0x00保留字节)
-        speed_low = speed_rpm & 0xFF
-        speed_high = (speed_rpm >> 8) & 0xFF
-        
-        # 位置控制 int32_t (4字节, little-endian)
-        angle_bytes = angle_control.to_bytes(4, byteorder='little', signed=True)
-        
-        payload = bytes([
-            0x00,              # Byte1: 保留字节
-            speed_low,         # Byte2: 速度限制低字节
-            speed_high,        # Byte3: 速度限制高字节
-            angle_bytes[0],    # Byte4: 位置控制字节0 (低字节)
-            angle_bytes[1],    # Byte5: 位置控制字节1
-            angle_bytes[2],    # Byte6: 位置控制字节2
-            angle_bytes[3]     # Byte7: 位置控制字节3 (高字节)
-        ])
-        
+        payload, target_deg, angle_control = encode_target_angle(target_deg, speed_rpm)
         data = self.transact(motor_id, CMD_READ_STATUS_A4, payload)
-        if data is None or len(data) != DATA_SIZE:
-            return None
-        
-        cmd_echo = data[0]
-        # Byte1: 电机温度 (int8_t, 1℃/LSB)
-        temperature = int.from_bytes([data[1]], 'little', signed=True)
-        
-        return {
-            'cmd_echo': f'0x{cmd_echo:02X}',
-            'success': cmd_echo == CMD_READ_STATUS_A4,
-            'target_deg': target_deg,
-            'speed_rpm': speed_rpm,
-            'angle_control': angle_control,
-            'temperature': temperature,
-            'raw_hex': data.hex()
-        }
+        return decode_target_reply(data, target_deg, speed_rpm, angle_control)
 
     def close_motor(self, motor_id: int) -> Optional[Dict[str, Any]]:
         """发送电机关闭指令 (命令0x80)
@@ -320,16 +1008,7 @@ class RS485Comm:
         """
         # 发送关闭命令，payload 为空（全0）
         data = self.transact(motor_id, CMD_CLOSE)
-        if data is None or len(data) != DATA_SIZE:
-            return None
-        
-        cmd_echo = data[0]
-        
-        return {
-            'cmd_echo': f'0x{cmd_echo:02X}',
-            'success': cmd_echo == CMD_CLOSE,
-            'raw_hex': data.hex()
-        }
+        return decode_ack(data, CMD_CLOSE)
     
     def stop_motor(self, motor_id: int) -> Optional[Dict[str, Any]]:
         """发送电机停止指令 (命令0x81)
@@ -349,16 +1028,41 @@ class RS485Comm:
         """
         # 发送停止命令，payload 为空（全0）
         data = self.transact(motor_id, CMD_STOP)
-        if data is None or len(data) != DATA_SIZE:
-            return None
-        
-        cmd_echo = data[0]
+        return decode_ack(data, CMD_STOP)
+    
+    def _broadcast(self, cmd: int) -> bool:
+        """发送 0xCD 广播帧 (电机不应答)
         
-        return {
-            'cmd_echo': f'0x{cmd_echo:02X}',
-            'success': cmd_echo == CMD_STOP,
-            'raw_hex': data.hex()
-        }
+        帧已写出返回True；连接不可用、链路错误 (随即进入断开状态) 或写出失败返回False，
+        调用方据此判断广播是否真正发到了总线上。
+        """
+        # motor_id=0xCD, payload为空（会自动填充7个0x00）
+        frame = self._build_frame(CMD_BROADCAST, cmd, b'')
+        m = self._metrics.entry(CMD_BROADCAST, cmd)
+        with self._lock:
+            m.counts[N_TRANSACTIONS] += 1
+            if not self._available:
+                m.reasons[FAIL_UNAVAILABLE] += 1
+                m.counts[N_FAILED] += 1
+                return False
+            generation = self._generation
+            m.counts[N_ATTEMPTS] += 1
+            try:
+                # 广播指令无响应，帧发出即返回；电机执行所需的静默时间记入 busy_until，
+                # 由下一帧发送前等待
+                sent_at = self._send(frame, self._timing.broadcast_gap)
+                m.write.add(time.monotonic() - sent_at)
+                m.counts[N_SUCCESSES] += 1
+                return True
+            except OSError:
+                # 含 ConnectionError / SerialException：连接已失效
+                m.reasons[FAIL_LINK_ERROR] += 1
+                m.counts[N_FAILED] += 1
+            except Exception:
+                m.counts[N_FAILED] += 1
+                return False
+        self._on_link_error(generation)
+        return False
     
     def broadcast_shutdown(self) -> bool:
         """广播关闭所有电机 (命令0xCD, 数据0x80)
@@ -370,27 +1074,9 @@ class RS485Comm:
           数据区: 0x80 00 00 00 00 00 00 00 (8字节)
           CRC: 2字节
         
-        返回: 成功返回True，广播指令无响应
+        返回: 广播帧已写出返回True (广播指令无响应)；连接不可用或写出失败返回False
         """
-        # 构建广播帧：0x3E 0xCD 0x08 0x80 00 00 00 00 00 00 00 + CRC
-        # motor_id=0xCD, cmd=0x80, payload为空（会自动填充7个0x00）
-        frame = self._build_frame(CMD_BROADCAST, CMD_CLOSE, b'')
-        
-        with self._lock:
-            if not self._available:
-                return False
-            try:
-                if self._tcp_mode and self._tcp_sock:
-                    self._tcp_sock.sendall(frame)
-                else:
-                    self._ser.write(frame)
-                    self._ser.flush()
-                # 广播指令无响应，稍等后返回
-                time.sleep(0.05)
-            except Exception as e:
-                # 忽略异常，认为已发出
-                pass
-            return True
+        return self._broadcast(CMD_CLOSE)
     
     def broadcast_stop(self) -> bool:
         """广播停止所有电机 (命令0xCD, 数据0x81)
@@ -402,34 +1088,19 @@ class RS485Comm:
           数据区: 0x81 00 00 00 00 00 00 00 (8字节)
           CRC: 2字节
         
-        返回: 成功返回True，广播指令无响应
+        返回: 广播帧已写出返回True (广播指令无响应)；连接不可用或写出失败返回False
         """
-        # 构建广播帧：0x3E 0xCD 0x08 0x81 00 00 00 00 00 00 00 + CRC
-        # motor_id=0xCD, cmd=0x81, payload为空（会自动填充7个0x00）
-        frame = self._build_frame(CMD_BROADCAST, CMD_STOP, b'')
-        
-        with self._lock:
-            if not self._available:
-                return False
-            try:
-                if self._tcp_mode and self._tcp_sock:
-                    self._tcp_sock.sendall(frame)
-                else:
-                    self._ser.write(frame)
-                    self._ser.flush()
-                # 广播指令无响应，稍等后返回
-                time.sleep(0.05)
-                return True
-            except Exception:
-                return False
+        return self._broadcast(CMD_STOP)
 
     def close(self):
-        """关闭串口或TCP连接"""
-        if self._tcp_mode and self._tcp_sock:
-            try:
-                self._tcp_sock.close()
-            except Exception:
-                pass
-            self._tcp_sock = None
-        elif hasattr(self, '_ser') and self._ser:
-            self._ser.close()
+        """关闭串口或TCP连接，停止后台重连"""
+        self._closed_evt.set()
+        self._reconnect_evt.set()
+        with self._lock:
+            self._release_link()
+            self._wakeup_r.close()
+            self._wakeup_w.close()
+        self._set_state(STATE_CLOSED)
+        if self._reconnect_thread is not None and self._reconnect_thread is not threading.current_thread():
+            self._reconnect_thread.join(timeout=1.0)
+            self._reconnect_thread = None
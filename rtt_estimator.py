@@ -0,0 +1,180 @@
+"""自适应超时：按 (电机ID, 命令码) 统计响应往返时间，参照 TCP RTO (RFC 6298) 计算超时。
+
+    SRTT   = 7/8 * SRTT + 1/8 * R
+    RTTVAR = 3/4 * RTTVAR + 1/4 * |SRTT - R|
+    RTO    = SRTT + 4 * RTTVAR   (限制在 [min_timeout, max_timeout])
+
+连续失败的电机进入隔离期 (指数退避)，隔离期内的读取直接失败，不再占用总线；
+隔离期满后的事务只做一次探测 (不重试)，成功即恢复，失败则隔离期加倍。
+未进入隔离的电机偶尔失败一次不影响之后事务的重试次数。
+"""
+from __future__ import annotations
+import threading
+import time
+from typing import Dict, Any, Tuple, Optional
+
+RTT_ALPHA = 0.125
+RTT_BETA = 0.25
+RTT_K = 4.0
+
+
+class RttEstimator:
+    """单个 (motor_id, cmd) 的往返时间估计"""
+
+    __slots__ = ('srtt', 'rttvar', 'samples', 'timeouts', 'last_rtt')
+
+    def __init__(self):
+        self.srtt: Optional[float] = None
+        self.rttvar = 0.0
+        self.samples = 0
+        self.timeouts = 0
+        self.last_rtt = 0.0
+
+    def update(self, rtt: float):
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2.0
+        else:
+            self.rttvar = (1.0 - RTT_BETA) * self.rttvar + RTT_BETA * abs(self.srtt - rtt)
+            self.srtt = (1.0 - RTT_ALPHA) * self.srtt + RTT_ALPHA * rtt
+        self.last_rtt = rtt
+        self.samples += 1
+
+    def rto(self, min_timeout: float, max_timeout: float) -> float:
+        """当前超时值；尚无样本时取上限"""
+        if self.srtt is None:
+            return max_timeout
+        return min(max_timeout, max(min_timeout, self.srtt + RTT_K * self.rttvar))
+
+
+class MotorHealth:
+    """单个电机的连续失败计数与隔离状态"""
+
+    __slots__ = ('failures', 'quarantine_until', 'backoff', 'quarantines')
+
+    def __init__(self):
+        self.failures = 0
+        self.quarantine_until = 0.0
+        self.backoff = 0.0
+        self.quarantines = 0
+
+
+class AdaptiveTimeouts:
+    """RS485Comm 使用的自适应超时与电机隔离策略 (线程安全)
+
+    Args:
+        min_timeout: 超时下限(秒)
+        max_timeout: 超时上限(秒)，即 RS485Comm 的 timeout 参数
+        quarantine_after: 连续失败多少次事务后隔离该电机
+        quarantine_min: 首次隔离时长(秒)
+        quarantine_max: 隔离时长上限(秒)
+    """
+
+    def __init__(self, min_timeout: float = 0.005, max_timeout: float = 0.2,
+                 quarantine_after: int = 3, quarantine_min: float = 0.5, quarantine_max: float = 30.0):
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.quarantine_after = quarantine_after
+        self.quarantine_min = quarantine_min
+        self.quarantine_max = quarantine_max
+        self._lock = threading.Lock()
+        self._rtt: Dict[Tuple[int, int], RttEstimator] = {}
+        # 同一命令在整条总线上的估计，用于尚无样本的电机 (如刚上线或已掉线的轴)
+        self._cmd_rtt: Dict[int, RttEstimator] = {}
+        self._health: Dict[int, MotorHealth] = {}
+
+    def _estimator(self, motor_id: int, cmd: int) -> RttEstimator:
+        key = (motor_id, cmd)
+        est = self._rtt.get(key)
+        if est is None:
+            est = self._rtt[key] = RttEstimator()
+        return est
+
+    def _motor(self, motor_id: int) -> MotorHealth:
+        health = self._health.get(motor_id)
+        if health is None:
+            health = self._health[motor_id] = MotorHealth()
+        return health
+
+    def timeout_for(self, motor_id: int, cmd: int) -> float:
+        """首次尝试的超时值(秒)；该电机尚无样本时借用同命令的总线级估计"""
+        with self._lock:
+            est = self._estimator(motor_id, cmd)
+            if est.srtt is None:
+                est = self._cmd_rtt.get(cmd, est)
+            return est.rto(self.min_timeout, self.max_timeout)
+
+    def backoff_timeout(self, timeout: float) -> float:
+        """重试时超时加倍 (不超过上限)"""
+        return min(self.max_timeout, timeout * 2.0)
+
+    def is_quarantined(self, motor_id: int, now: float = None) -> bool:
+        health = self._health.get(motor_id)
+        if health is None:
+            return False
+        if now is None:
+            now = time.monotonic()
+        return now < health.quarantine_until
+
+    def retries_for(self, motor_id: int, max_retries: int) -> int:
+        """重试次数预算：隔离期满、尚未恢复的电机只做一次探测，不再重试"""
+        health = self._health.get(motor_id)
+        if health is not None and health.quarantine_until:
+            return 0
+        return max_retries
+
+    def on_success(self, motor_id: int, cmd: int, rtt: Optional[float] = None):
+        """事务成功；rtt 为本次往返时间(秒)，流水线中排队的响应不计样本时传 None"""
+        with self._lock:
+            if rtt is not None:
+                self._estimator(motor_id, cmd).update(rtt)
+                bus_est = self._cmd_rtt.get(cmd)
+                if bus_est is None:
+                    bus_est = self._cmd_rtt[cmd] = RttEstimator()
+                bus_est.update(rtt)
+            health = self._motor(motor_id)
+            health.failures = 0
+            health.backoff = 0.0
+            health.quarantine_until = 0.0
+
+    def on_timeout(self, motor_id: int, cmd: int):
+        """单次尝试超时"""
+        with self._lock:
+            self._estimator(motor_id, cmd).timeouts += 1
+
+    def on_failure(self, motor_id: int):
+        """整个事务(含重试)失败；连续失败达到阈值后隔离该电机"""
+        with self._lock:
+            health = self._motor(motor_id)
+            health.failures += 1
+            if health.failures >= self.quarantine_after:
+                if health.backoff:
+                    health.backoff = min(self.quarantine_max, health.backoff * 2.0)
+                else:
+                    health.backoff = self.quarantine_min
+                health.quarantine_until = time.monotonic() + health.backoff
+                health.quarantines += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """导出统计: {'motors': {id: {...}}, 'rtt': {'id:0xCMD': {...}}}，时间单位毫秒"""
+        now = time.monotonic()
+        with self._lock:
+            rtt = {}
+            for (motor_id, cmd), est in sorted(self._rtt.items()):
+                rtt[f'{motor_id}:0x{cmd:02X}'] = {
+                    'samples': est.samples,
+                    'timeouts': est.timeouts,
+                    'srtt_ms': None if est.srtt is None else round(est.srtt * 1000.0, 3),
+                    'rttvar_ms': round(est.rttvar * 1000.0, 3),
+                    'last_rtt_ms': round(est.last_rtt * 1000.0, 3),
+                    'timeout_ms': round(est.rto(self.min_timeout, self.max_timeout) * 1000.0, 3),
+                }
+            motors = {}
+            for motor_id, health in sorted(self._health.items()):
+                motors[motor_id] = {
+                    'consecutive_failures': health.failures,
+                    'quarantined': now < health.quarantine_until,
+                    'quarantine_remaining_s': round(max(0.0, health.quarantine_until - now), 3),
+                    'quarantines': health.quarantines,
+                }
+        return {'motors': motors, 'rtt': rtt}
@@ -0,0 +1,232 @@
+"""状态订阅：控制器每个轮询周期的采样发布给订阅者，不必再轮询控制器的缓存。
+
+订阅方式:
+    - 有界队列: sub = ptz.subscribe(maxsize=16)，消费者 sub.get(timeout) 取样本
+    - 回调: ptz.subscribe(callback=fn)，每个回调订阅有自己的投递线程
+
+过滤:
+    - motor_ids: 只接收指定电机的样本
+    - deadband: 只在角度相对上次投递的样本变化超过该值 (度)，或温度变化、读取
+      成败变化时投递；None 表示每个样本都投递
+
+发布在轮询线程中进行，对每个订阅只做一次不阻塞的入队 (deque 定长，满时丢弃
+最旧的样本并计数)，慢订阅者只会丢样本，不会拖慢轮询，也不影响其他订阅者。
+所有订阅者共享同一个 StatusSample 对象，不复制状态字典 (订阅者不应修改它)。
+
+用法:
+    sub = ptz.subscribe(deadband=0.1)
+    while True:
+        sample = sub.get(timeout=1.0)
+        if sample is not None:
+            print(sample.motor_id, sample.status['angle_deg'] if sample.status else None)
+"""
+from __future__ import annotations
+import threading
+import time
+from collections import deque
+from typing import Optional, Dict, Any, List, Callable, Iterable
+from poll_scheduler import angle_delta
+
+DEFAULT_MAXSIZE = 16
+
+
+class StatusSample:
+    """一次轮询采样
+
+    Attributes:
+        motor_id: 电机地址
+        timestamp: 采样时刻 (time.monotonic())
+        status: 状态字典 (格式见 RS485Comm.read_status)，读取失败为None
+        seq: 该电机的采样序号 (从1开始，订阅者可据此发现被丢弃的样本)
+    """
+
+    __slots__ = ('motor_id', 'timestamp', 'status', 'seq')
+
+    def __init__(self, motor_id: int, timestamp: float, status: Optional[Dict[str, Any]], seq: int):
+        self.motor_id = motor_id
+        self.timestamp = timestamp
+        self.status = status
+        self.seq = seq
+
+    @property
+    def angle_deg(self) -> Optional[float]:
+        return self.status['angle_deg'] if self.status else None
+
+    def __repr__(self) -> str:
+        return f'StatusSample(motor_id={self.motor_id}, seq={self.seq}, angle_deg={self.angle_deg})'
+
+
+class Subscription:
+    """一个订阅 (由 StatusFeed.subscribe 创建)"""
+
+    def __init__(self, feed: 'StatusFeed', maxsize: int, deadband: Optional[float],
+                 motor_ids: Optional[Iterable[int]], callback: Optional[Callable[[StatusSample], None]]):
+        self._feed = feed
+        self._cond = threading.Condition()
+        self._queue: deque = deque(maxlen=maxsize)
+        self.maxsize = maxsize
+        self.deadband = deadband
+        self.motor_ids = frozenset(motor_ids) if motor_ids is not None else None
+        self.callback = callback
+        self.closed = False
+        # 每个电机上次投递的样本 (死区比较用)，只在发布线程中访问
+        self._last: Dict[int, StatusSample] = {}
+        self.delivered = 0
+        self.dropped = 0
+        self.errors = 0
+        self._worker: Optional[threading.Thread] = None
+        if callback is not None:
+            self._worker = threading.Thread(target=self._dispatch, name='status-subscriber', daemon=True)
+            self._worker.start()
+
+    def _wants(self, sample: StatusSample) -> bool:
+        """是否投递该样本 (电机过滤与死区)"""
+        if self.motor_ids is not None and sample.motor_id not in self.motor_ids:
+            return False
+        if self.deadband is None:
+            return True
+        last = self._last.get(sample.motor_id)
+        if last is None or (last.status is None) != (sample.status is None):
+            return True
+        if sample.status is None:
+            return False
+        return (abs(angle_delta(sample.status['angle_deg'], last.status['angle_deg'])) > self.deadband
+                or sample.status['temperature'] != last.status['temperature'])
+
+    def _offer(self, sample: StatusSample):
+        """不阻塞地入队；队列满时丢弃最旧的样本"""
+        if not self._wants(sample):
+            return
+        self._last[sample.motor_id] = sample
+        with self._cond:
+            if self.closed:
+                return
+            if len(self._queue) == self.maxsize:
+                self.dropped += 1
+            self._queue.append(sample)
+            self._cond.notify()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[StatusSample]:
+        """
+        取下一个样本
+
+        Args:
+            timeout: 最长等待时间（秒），None 表示一直等待
+
+        Returns:
+            样本；超时或订阅已关闭 (且队列已空) 返回None
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._queue or self.closed, timeout) or not self._queue:
+                return None
+            self.delivered += 1
+            return self._queue.popleft()
+
+    def drain(self) -> List[StatusSample]:
+        """取出队列中所有样本 (不等待)"""
+        with self._cond:
+            samples = list(self._queue)
+            self._queue.clear()
+            self.delivered += len(samples)
+            return samples
+
+    def __iter__(self):
+        """逐个产出样本，直到订阅关闭"""
+        while True:
+            sample = self.get()
+            if sample is None:
+                return
+            yield sample
+
+    def _dispatch(self):
+        for sample in self:
+            try:
+                self.callback(sample)
+            except Exception:
+                with self._cond:
+                    self.errors += 1
+
+    def close(self):
+        """取消订阅；回调订阅等待投递线程退出 (在回调内调用则不等待)"""
+        self._feed._remove(self)
+        with self._cond:
+            self.closed = True
+            self._queue.clear()
+            self._cond.notify_all()
+        if self._worker is not None and self._worker is not threading.current_thread():
+            self._worker.join(timeout=2.0)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                'pending': len(self._queue),
+                'delivered': self.delivered,
+                'dropped': self.dropped,
+                'errors': self.errors,
+                'deadband': self.deadband,
+                'callback': self.callback is not None,
+            }
+
+
+class StatusFeed:
+    """一个控制器的状态发布点"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subs: List[Subscription] = []
+        self._seq: Dict[int, int] = {}
+
+    def subscribe(self, callback: Optional[Callable[[StatusSample], None]] = None,
+                  maxsize: int = DEFAULT_MAXSIZE, deadband: Optional[float] = None,
+                  motor_ids: Optional[Iterable[int]] = None) -> Subscription:
+        """
+        订阅状态样本
+
+        Args:
+            callback: 回调 callback(sample)，在该订阅自己的投递线程中调用；None 表示用 get() 取样本
+            maxsize: 队列长度，满时丢弃最旧的样本
+            deadband: 角度死区（度），None 表示每个样本都投递
+            motor_ids: 只接收这些电机的样本，None 表示全部
+
+        Raises:
+            ValueError: 参数无效
+        """
+        if maxsize < 1:
+            raise ValueError('maxsize 必须大于0')
+        if deadband is not None and deadband < 0:
+            raise ValueError('deadband 不能为负数')
+        sub = Subscription(self, maxsize, deadband, motor_ids, callback)
+        with self._lock:
+            # 复制后替换，发布时不必持锁遍历
+            self._subs = self._subs + [sub]
+        return sub
+
+    def _remove(self, sub: Subscription):
+        with self._lock:
+            self._subs = [s for s in self._subs if s is not sub]
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subs)
+
+    def publish(self, statuses: Dict[int, Optional[Dict[str, Any]]], now: Optional[float] = None):
+        """发布一个轮询周期的采样 (在轮询线程中调用，不阻塞)"""
+        subs = self._subs
+        now = time.monotonic() if now is None else now
+        for motor_id, status in statuses.items():
+            seq = self._seq[motor_id] = self._seq.get(motor_id, 0) + 1
+            if subs:
+                sample = StatusSample(motor_id, now, status, seq)
+                for sub in subs:
+                    sub._offer(sample)
+
+    def close(self):
+        """关闭所有订阅"""
+        with self._lock:
+            subs, self._subs = self._subs, []
+        for sub in subs:
+            sub.close()
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """各订阅的投递/丢弃统计"""
+        return [sub.stats() for sub in self._subs]
@@ -0,0 +1,173 @@
+"""单轴遥测历史：定长环形缓冲区，按列存放在 array 中。
+
+每个样本五列 (每样本 16 字节):
+    time         'd'  采样时刻 (time.monotonic())
+    angle_raw    'H'  原始角度 0~35999 (0.01°/LSB)
+    temperature  'b'  温度 (℃，int8 全范围都是有效读数)
+    target       'i'  当时的指令目标 (0.01°，int32)，尚未下发过指令为 NO_TARGET
+    valid        'B'  1 读取成功 / 0 读取失败 (此时角度与温度列无意义)
+
+容量固定、一次分配，追加是 O(1) 的原地写入，运行多久内存都不变；默认容量
+540000 个样本，50Hz 轮询约 3 小时 (每轴约 8.6MB)，500ms 轮询约 75 小时。
+
+只有控制器的轮询线程写入 (单写者)。写入先填好各列再递增 count，读者按 count
+确定可见范围，复制完窗口后再读一次 count，丢弃在复制期间可能已被覆盖或正在
+被写入的最旧样本 (类似 seqlock)，读写都不加锁。
+
+窗口查询先在时间列上二分查找起点 (O(log n))，只复制窗口内 (按 max_points
+抽稀后) 的样本，不复制整个缓冲区。
+
+用法:
+    history = AxisHistory(capacity=540000)
+    history.append(time.monotonic(), status)
+    window = history.window(seconds=60, max_points=500)
+    window['time'], window['angle_deg'], window['temperature'], window['target_deg']
+"""
+from __future__ import annotations
+import time
+from array import array
+from typing import Optional, Dict, Any
+
+DEFAULT_HISTORY = 540000       # 50Hz 约 3 小时
+
+NO_TARGET = -2 ** 31
+
+COLUMNS = (('time', 'd'), ('angle_raw', 'H'), ('temperature', 'b'), ('target', 'i'), ('valid', 'B'))
+
+
+def raw_to_deg(raw: int) -> float:
+    """原始角度转换为归一化角度 (±180°)，与 decode_status 的 angle_deg 一致"""
+    angle = raw / 100.0
+    return angle - 360.0 if angle > 180.0 else angle
+
+
+class AxisHistory:
+    """单轴遥测历史环形缓冲区
+
+    Args:
+        capacity: 最多保留的样本数
+    """
+
+    def __init__(self, capacity: int = DEFAULT_HISTORY):
+        if capacity < 1:
+            raise ValueError('capacity 必须大于0')
+        self.capacity = capacity
+        # 多留一个位置给正在写入的样本，读者复制时可见的 capacity 个样本不会被它覆盖
+        self.slots = slots = capacity + 1
+        self.time = array('d', bytes(8 * slots))
+        self.angle_raw = array('H', bytes(2 * slots))
+        self.temperature = array('b', bytes(slots))
+        self.target = array('i', bytes(4 * slots))
+        self.valid = array('B', bytes(slots))
+        self.count = 0                 # 累计写入的样本数 (逻辑序号上界)
+        self._target = NO_TARGET
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
+
+    @property
+    def memory_bytes(self) -> int:
+        """缓冲区占用的字节数"""
+        return sum(arr.itemsize * len(arr) for arr in (self.time, self.angle_raw, self.temperature, self.target,
+                                                       self.valid))
+
+    def set_target(self, target_deg: Optional[float]):
+        """记录新的指令目标 (度)，之后的样本都带上它；None 表示清除"""
+        self._target = NO_TARGET if target_deg is None else int(round(target_deg * 100))
+
+    def append(self, timestamp: float, status: Optional[Dict[str, Any]]):
+        """追加一个样本 (status 为 decode_status 的结果，读取失败为 None)"""
+        i = self.count % self.slots
+        self.time[i] = timestamp
+        if status is not None:
+            self.angle_raw[i] = status['angle_raw']
+            self.temperature[i] = status['temperature']
+            self.valid[i] = 1
+        else:
+            self.valid[i] = 0
+        self.target[i] = self._target
+        # 各列写完后再发布
+        self.count += 1
+
+    def _bisect_time(self, lo: int, hi: int, t: float) -> int:
+        """逻辑序号 [lo, hi) 中第一个时间 >= t 的位置"""
+        times, cap = self.time, self.slots
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if times[mid % cap] < t:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _slice(self, arr: array, start: int, end: int, step: int) -> array:
+        """复制逻辑序号 [start, end) 中每隔 step 个的样本 (可跨越环形边界)"""
+        cap = self.slots
+        a = start % cap
+        n = end - start
+        if a + n <= cap:
+            return arr[a:a + n:step]
+        first = arr[a:cap:step]
+        b = len(first) * step - (cap - a)         # 第二段的起始偏移
+        return first + arr[b:n - (cap - a):step]
+
+    def window(self, seconds: Optional[float] = None, last: Optional[int] = None,
+               max_points: Optional[int] = None, now: Optional[float] = None) -> Dict[str, Any]:
+        """
+        查询最近的样本窗口
+
+        Args:
+            seconds: 最近多少秒 (相对 now)，None 表示不按时间限制
+            last: 最多最近多少个样本，None 表示不限
+            max_points: 抽稀后最多多少个点 (等间隔取样，总是包含最新样本)，None 表示不抽稀
+            now: 参考时刻，默认 time.monotonic()
+
+        Returns:
+            {'time', 'angle_raw', 'temperature', 'target', 'valid' (array 列),
+             'angle_deg', 'target_deg' (列表，无值为 None), 'step' (抽稀间隔), 'total' (抽稀前样本数)}
+        """
+        end = self.count
+        start = max(0, end - self.capacity)
+        if last is not None:
+            start = max(start, end - last)
+        if seconds is not None:
+            now = time.monotonic() if now is None else now
+            start = self._bisect_time(start, end, now - seconds)
+        total = end - start
+        step = 1
+        if max_points is not None and max_points > 0 and total > max_points:
+            step = -(-total // max_points)
+            # 对齐到最新样本
+            start += (total - 1) % step
+
+        columns = {name: self._slice(getattr(self, name), start, end, step) for name, _ in COLUMNS}
+
+        # 复制期间写者可能已覆盖最旧的样本，并可能正在写第 count 个样本 (占用第
+        # count - slots 个样本的位置，写完才递增 count)：丢弃这部分
+        overwritten = self.count + 1 - self.slots
+        if start < overwritten:
+            skip = -(-(overwritten - start) // step)
+            columns = {name: col[skip:] for name, col in columns.items()}
+
+        columns['angle_deg'] = [raw_to_deg(raw) if ok else None
+                                for raw, ok in zip(columns['angle_raw'], columns['valid'])]
+        columns['target_deg'] = [None if t == NO_TARGET else t / 100.0 for t in columns['target']]
+        columns['step'] = step
+        columns['total'] = total
+        return columns
+
+    def stats(self) -> Dict[str, Any]:
+        """样本数、时间跨度与内存占用"""
+        n = len(self)
+        span = 0.0
+        if n > 1:
+            cap = self.slots
+            end = self.count
+            span = self.time[(end - 1) % cap] - self.time[(end - n) % cap]
+        return {
+            'samples': n,
+            'capacity': self.capacity,
+            'written': self.count,
+            'span_s': round(span, 3),
+            'memory_bytes': self.memory_bytes,
+        }
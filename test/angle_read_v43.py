@@ -16,18 +16,13 @@ from __future__ import annotations
 import serial  # type: ignore
 from typing import Optional, Dict, Any
 import time
-from proto_v43 import modbus_crc, FRAME_HEADER, CONST_LEN_BYTE, FRAME_SIZE, DATA_SIZE, parse_frame
+from proto_v43 import FRAME_SIZE, DATA_SIZE, parse_frame, build_frame
 
 CMD_READ_SINGLE_TURN = 0x94
 
 def build_cmd_frame(motor_id: int, cmd: int, payload: bytes = b'') -> bytes:
     """构建命令帧。payload 附加在 cmd 后面 (总数据区不超过8字节)"""
-    if len(payload) > DATA_SIZE - 1:
-        raise ValueError('payload too long')
-    data = bytes([cmd]) + payload + bytes([0x00] * (DATA_SIZE - 1 - len(payload)))
-    body = bytes([FRAME_HEADER, motor_id & 0xFF, CONST_LEN_BYTE]) + data
-    crc = modbus_crc(body)
-    return body + bytes([crc & 0xFF, (crc >> 8) & 0xFF])
+    return build_frame(motor_id, cmd, payload)
 
 def decode_angle_from_data(data: bytes) -> Optional[float]:
     """从响应数据中提取角度 (Byte6-7: uint16, 0.01°/LSB)
@@ -0,0 +1,81 @@
+"""CRC16 微基准：对比逐位计算(旧实现)与查表/整帧校验/帧缓存(crc16.py)的每秒帧数。
+
+运行:
+    python test/bench_crc.py --count 20000
+"""
+from __future__ import annotations
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from crc16 import modbus_crc, check_crc
+from proto_v43 import build_frame, fixed_frame, FRAME_HEADER, CONST_LEN_BYTE
+
+
+def bitwise_crc(data: bytes) -> int:
+    """旧实现：每字节8次分支的逐位计算"""
+    crc = 0xFFFF
+    for b in data:
+        crc ^= b
+        for _ in range(8):
+            if crc & 0x0001:
+                crc = (crc >> 1) ^ 0xA001
+            else:
+                crc >>= 1
+    return crc & 0xFFFF
+
+
+def old_build(motor_id: int, cmd: int) -> bytes:
+    data = bytes([cmd]) + bytes([0x00] * 7)
+    body = bytes([FRAME_HEADER, motor_id & 0xFF, CONST_LEN_BYTE]) + data
+    crc = bitwise_crc(body)
+    return body + bytes([crc & 0xFF, (crc >> 8) & 0xFF])
+
+
+def old_verify(frame: bytes) -> bool:
+    body = frame[:-2]
+    return bitwise_crc(body) == (frame[-2] | (frame[-1] << 8))
+
+
+def rate(stmt, count: int) -> float:
+    """返回每秒执行次数(取3轮最好成绩)"""
+    best = min(timeit.repeat(stmt, number=count, repeat=3))
+    return count / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='CRC16 微基准')
+    parser.add_argument('--count', type=int, default=20000, help='每轮帧数')
+    args = parser.parse_args()
+
+    frame = build_frame(1, 0x94, bytes(7))
+    # 正确性交叉验证
+    for i in range(256):
+        sample = bytes([i, (i * 7) & 0xFF, 0x3E, 0x08]) * 3
+        assert bitwise_crc(sample) == modbus_crc(sample)
+    assert old_build(1, 0x94) == fixed_frame(1, 0x94) == frame
+    assert old_verify(frame) and check_crc(frame)
+
+    results = [
+        ('构建帧 逐位CRC(旧)', rate(lambda: old_build(1, 0x94), args.count)),
+        ('构建帧 查表CRC', rate(lambda: build_frame(1, 0x94), args.count)),
+        ('构建帧 缓存命中', rate(lambda: fixed_frame(1, 0x94), args.count)),
+        ('校验帧 逐位CRC(旧)', rate(lambda: old_verify(frame), args.count)),
+        ('校验帧 整帧查表', rate(lambda: check_crc(frame), args.count)),
+    ]
+
+    print(f"{'项目':<20} {'帧/秒':>14}")
+    print('-' * 36)
+    for name, fps in results:
+        print(f"{name:<20} {fps:>14,.0f}")
+    print('-' * 36)
+    print(f"构建加速: x{results[1][1] / results[0][1]:.1f} (查表), "
+          f"x{results[2][1] / results[0][1]:.1f} (缓存)")
+    print(f"校验加速: x{results[4][1] / results[3][1]:.1f}")
+
+
+if __name__ == '__main__':
+    main()
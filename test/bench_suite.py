@@ -0,0 +1,286 @@
+"""协议与通信热路径基准套件：输出 JSON 结果，并与保存的基线比较，部署前发现性能回退。
+
+项目 (数值越小越好):
+    crc.modbus_crc          11字节CRC计算 (ns/次)
+    crc.check_crc           13字节整帧校验 (ns/次)
+    frame.build_fixed       RS485Comm._build_frame 无参数命令 (缓存帧)
+    frame.build_payload     RS485Comm._build_frame 0xA4 带参数
+    frame.parse             RS485Comm._parse_frame
+    stream.extract_clean    proto_v43.extract_frames 干净字节流 (ns/帧)
+    stream.extract_noisy    同上，帧间夹杂噪声字节
+    stream.decoder_noisy    FrameDecoder 按64字节分批流式重组噪声字节流 (ns/帧)
+    status.decode           decode_status (read_status 字段解码)
+    transact.p50 / p99      端到端 transact 延迟 (us)，进程内假网关 (socketpair，立即应答)；
+                            p99 受调度抖动影响大，只列出不判定回退
+    transact.per_txn        连续 transact 的平均每事务耗时 (us)
+    transact_many.sweep3    3个电机流水线扫描的中位耗时 (us)
+
+微基准取 repeat 轮中最快的一轮 (不受偶发调度干扰)，并给出中位数参考。
+另测一个纯Python参考负载 (calibration)，与基线比较时按它归一化，抵消机器整体快慢的波动。
+假网关不模拟 RS485 线路时间 (BusTiming 波特率取极大、静默间隔为0)，只测软件开销。
+
+运行:
+    python test/bench_suite.py                            # 运行并与 test/bench_baseline.json 比较
+    python test/bench_suite.py --json result.json         # 同时写出结果
+    python test/bench_suite.py --only crc,frame --tolerance 0.3
+    python test/bench_suite.py --save-baseline            # 以本次结果更新基线
+有项目慢于基线超过 tolerance (默认20%) 时退出码为 1。基线与机器相关，应在同一台
+(或同型号) 机器上生成和比较。
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from crc16 import modbus_crc, check_crc
+from proto_v43 import FrameDecoder, build_frame, extract_frames
+from bus_timing import BusTiming
+from rs485_comm import RS485Comm, CMD_READ_ANGLE, CMD_READ_STATUS_A4, decode_status, encode_target_angle
+from replay import ReplayGateway
+
+CALIBRATION = 'calibration'
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_baseline.json')
+STATUS_DATA = bytes([25, 0, 0, 0, 0, 0x10, 0x27])
+MOTORS = (1, 2, 3)
+REFERENCE_DATA = bytes(range(1, 9))
+
+
+def reference_workload():
+    """与被测代码无关的纯Python参考负载 (整数运算+字节索引)，用于扣除机器整体快慢"""
+    acc = 0
+    data = REFERENCE_DATA
+    for i in range(64):
+        acc = (acc ^ data[i & 7]) * 31 & 0xFFFF
+    return acc
+
+
+def make_stream(frames: int, noisy: bool) -> bytes:
+    """固定种子生成的 0x94 应答字节流；noisy 时帧间插入 0~6 个噪声字节 (含假帧头)"""
+    rng = random.Random(0)
+    out = bytearray()
+    for i in range(frames):
+        if noisy:
+            out += bytes(rng.choice((0x00, 0x3E, 0xFF, rng.randrange(256))) for _ in range(rng.randint(0, 6)))
+        out += build_frame(MOTORS[i % len(MOTORS)], CMD_READ_ANGLE, STATUS_DATA)
+    return bytes(out)
+
+
+def start_fake_gateway() -> ReplayGateway:
+    """进程内假网关：每个电机的 0x94 / 0xA4 立即应答"""
+    replies = {}
+    for motor_id in MOTORS:
+        for cmd in (CMD_READ_ANGLE, CMD_READ_STATUS_A4):
+            replies[(motor_id, cmd)] = [(0.0, build_frame(motor_id, cmd, STATUS_DATA))]
+    return ReplayGateway(replies, speed=0)
+
+
+def calibrate(timer: timeit.Timer, min_time: float) -> int:
+    """按 min_time 自动确定每轮循环次数"""
+    number, elapsed = timer.autorange()
+    if elapsed < min_time:
+        number = max(1, int(number * min_time / max(elapsed, 1e-9)))
+    return number
+
+
+def micro(benches, repeat: int, min_time: float) -> dict:
+    """timeit 微基准，返回每次操作的纳秒数
+
+    各项目轮流各跑一轮、共 repeat 遍 (而不是一个项目连跑 repeat 轮)，机器偶发变慢的
+    时段会分摊到所有项目上，取最快一轮时不会只拖慢某一个项目。
+    """
+    timers = [(name, timeit.Timer(fn), per_call) for name, fn, per_call in benches]
+    numbers = [calibrate(timer, min_time) for _, timer, _ in timers]
+    runs = {name: [] for name, _, _ in timers}
+    for _ in range(repeat):
+        for (name, timer, per_call), number in zip(timers, numbers):
+            runs[name].append(timer.timeit(number) / number / per_call * 1e9)
+    return {name: {'value': round(min(r), 1), 'unit': 'ns', 'median': round(statistics.median(r), 1)}
+            for name, r in runs.items()}
+
+
+def percentile(ordered, pct: float) -> float:
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def bench_micro(only, repeat: int, min_time: float, comm: RS485Comm) -> dict:
+    payload, _, _ = encode_target_angle(45.0, 100)
+    body = build_frame(1, CMD_READ_ANGLE, STATUS_DATA)[:-2]
+    frame = build_frame(1, CMD_READ_ANGLE, STATUS_DATA)
+    data = frame[3:3 + 8]
+    clean = make_stream(300, noisy=False)
+    noisy = make_stream(300, noisy=True)
+
+    def decode_noisy():
+        dec = FrameDecoder()
+        pos = 0
+        while pos < len(noisy):
+            with dec.window(64) as win:
+                n = min(len(win), len(noisy) - pos)
+                win[:n] = noisy[pos:pos + n]
+            dec.commit(n)
+            pos += n
+            while dec.next_frame() >= 0:
+                pass
+
+    benches = (
+        (CALIBRATION, reference_workload, 1),
+        ('crc.modbus_crc', lambda: modbus_crc(body), 1),
+        ('crc.check_crc', lambda: check_crc(frame), 1),
+        ('frame.build_fixed', lambda: comm._build_frame(1, CMD_READ_ANGLE), 1),
+        ('frame.build_payload', lambda: comm._build_frame(1, CMD_READ_STATUS_A4, payload), 1),
+        ('frame.parse', lambda: comm._parse_frame(frame), 1),
+        ('stream.extract_clean', lambda: extract_frames(clean), 300),
+        ('stream.extract_noisy', lambda: extract_frames(noisy), 300),
+        ('stream.decoder_noisy', decode_noisy, 300),
+        ('status.decode', lambda: decode_status(data), 1),
+    )
+    assert len(extract_frames(noisy)) == 300, '噪声流应能提取出全部帧'
+    return micro([bench for bench in benches if bench[0] == CALIBRATION or selected(bench[0], only)],
+                 repeat, min_time)
+
+
+def bench_transact(only, count: int, comm: RS485Comm) -> dict:
+    results = {}
+    if selected('transact', only):
+        for _ in range(200):                           # 预热: RTT表、帧缓存
+            comm.transact(1, CMD_READ_ANGLE)
+        samples = []
+        started = time.perf_counter()
+        for i in range(count):
+            t0 = time.perf_counter()
+            assert comm.transact(MOTORS[i % len(MOTORS)], CMD_READ_ANGLE) is not None
+            samples.append(time.perf_counter() - t0)
+        total = time.perf_counter() - started
+        samples.sort()
+        results['transact.p50'] = {'value': round(percentile(samples, 50) * 1e6, 2), 'unit': 'us'}
+        results['transact.p99'] = {'value': round(percentile(samples, 99) * 1e6, 2), 'unit': 'us',
+                                   'check': False}
+        results['transact.per_txn'] = {'value': round(total / count * 1e6, 2), 'unit': 'us',
+                                       'ops_per_s': round(count / total)}
+    if selected('transact_many', only):
+        requests = [(motor_id, CMD_READ_ANGLE, b'') for motor_id in MOTORS]
+        samples = []
+        for _ in range(max(1, count // 3)):
+            t0 = time.perf_counter()
+            assert all(data is not None for data in comm.transact_many(requests))
+            samples.append(time.perf_counter() - t0)
+        samples.sort()
+        results['transact_many.sweep3'] = {'value': round(percentile(samples, 50) * 1e6, 2), 'unit': 'us',
+                                           'p99': round(percentile(samples, 99) * 1e6, 2)}
+    return results
+
+
+def selected(name: str, only) -> bool:
+    return not only or any(name == prefix or name.startswith(prefix + '.') for prefix in only)
+
+
+def run_suite(only=None, repeat: int = 15, min_time: float = 0.02, count: int = 2000) -> dict:
+    """运行基准，返回 {'meta': {...}, 'results': {名称: {'value', 'unit', ...}}}"""
+    gateway = start_fake_gateway()
+    comm = RS485Comm(port=gateway.port, auto_reconnect=False, transport=gateway.connect,
+                     timing=BusTiming(baudrate=10 ** 9, turnaround=0.0, silent_interval=0.0))
+    try:
+        assert comm.available, '无法连接假网关'
+        results = bench_micro(only, repeat, min_time, comm)
+        results.update(bench_transact(only, count, comm))
+    finally:
+        comm.close()
+        gateway.close()
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'repeat': repeat,
+            'count': count,
+        },
+        'results': results,
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    """逐项与基线比较，返回 [(名称, 基线值, 当前值, 比值, 是否回退)]；基线中没有的项目跳过
+
+    比值先按各自的 calibration (参考负载) 归一化，抵消机器整体变快/变慢 (CPU降频、
+    虚拟机争用)，只反映被测代码相对参考负载的变化。
+    """
+    rows = []
+    base_results = baseline.get('results', {})
+    scale = 1.0
+    if CALIBRATION in current['results'] and CALIBRATION in base_results:
+        scale = base_results[CALIBRATION]['value'] / current['results'][CALIBRATION]['value']
+    for name, result in current['results'].items():
+        base = base_results.get(name)
+        if name == CALIBRATION or base is None or not base['value']:
+            continue
+        ratio = result['value'] * scale / base['value']
+        rows.append((name, base['value'], result['value'], ratio,
+                     result.get('check', True) and ratio > 1.0 + tolerance))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='协议与通信热路径基准套件')
+    parser.add_argument('--only', type=str, default=None,
+                        help='只运行指定项目或前缀，逗号分隔 (如 crc,frame.parse,transact)')
+    parser.add_argument('--repeat', type=int, default=15, help='微基准轮数，取最快一轮 (默认: 15)')
+    parser.add_argument('--min-time', type=float, default=0.02, help='微基准每轮最少耗时秒数 (默认: 0.02)')
+    parser.add_argument('--count', type=int, default=2000, help='端到端事务数 (默认: 2000)')
+    parser.add_argument('--json', type=str, default=None, help='结果写入JSON文件 (- 为标准输出)')
+    parser.add_argument('--baseline', type=str, default=DEFAULT_BASELINE, help='基线文件')
+    parser.add_argument('--save-baseline', action='store_true', help='以本次结果覆盖基线文件')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='允许慢于基线的比例 (默认: 0.2)')
+    args = parser.parse_args()
+
+    only = [x.strip() for x in args.only.split(',') if x.strip()] if args.only else None
+    current = run_suite(only, args.repeat, args.min_time, args.count)
+
+    if args.json == '-':
+        print(json.dumps(current, indent=2))
+    elif args.json:
+        with open(args.json, 'w') as f:
+            json.dump(current, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(current, f, indent=2)
+            f.write('\n')
+        print(f"基线已保存: {args.baseline}")
+
+    baseline = None
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    rows = {name: row for name, *row in compare(current, baseline, args.tolerance)} if baseline else {}
+
+    if baseline and CALIBRATION in baseline['results']:
+        speed = baseline['results'][CALIBRATION]['value'] / current['results'][CALIBRATION]['value']
+        print(f"参考负载: 本机速度为基线的 {speed:.2f} 倍，比值已按此归一化")
+    print(f"{'项目':<24}{'当前':>12}{'基线':>12}{'比值':>8}")
+    regressions = []
+    for name, result in current['results'].items():
+        line = f"{name:<24}{result['value']:>10.2f}{result['unit']:>2}"
+        if name in rows:
+            base, _, ratio, regressed = rows[name]
+            line += f"{base:>10.2f}{result['unit']:>2}{ratio:>8.2f}"
+            if regressed:
+                line += '  回退'
+                regressions.append(name)
+        print(line)
+    if regressions:
+        print(f"\n{len(regressions)} 项慢于基线超过 {args.tolerance:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+"""RS485Comm.transact 时延测试：本地TCP替身网关，统计 p50/p99。
+
+对比两种接收方式:
+  - 旧实现: recv + time.sleep(0.001) 轮询 (按原 transact 逻辑复刻)
+  - 新实现: RS485Comm.transact (selectors 事件驱动, monotonic 截止时间)
+
+运行:
+    python test/bench_transact_latency.py --count 2000 --delay-ms 0.5
+    python test/bench_transact_latency.py --sweep --count 200 --delay-ms 5 --motors 3
+"""
+from __future__ import annotations
+import argparse
+import os
+import socket
+import socketserver
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from proto_v43 import build_frame, FRAME_SIZE
+from rs485_comm import RS485Comm, CMD_READ_ANGLE
+from bus_timing import BusTiming
+
+
+class StandInHandler(socketserver.BaseRequestHandler):
+    """替身网关：收到13字节命令帧后按0x94格式回复 (分两段发送模拟线上传输)。
+
+    每帧占用总线 wire_s 秒 (按顺序排队)，应答在总线处理完后再经 delay_s 回到客户端，
+    用于模拟网关往返时延。
+    """
+
+    def handle(self):
+        sock = self.request
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        buf = b''
+        bus_free = 0.0
+        while True:
+            data = sock.recv(256)
+            if not data:
+                return
+            buf += data
+            now = time.perf_counter()
+            replies = []
+            while len(buf) >= FRAME_SIZE:
+                req, buf = buf[:FRAME_SIZE], buf[FRAME_SIZE:]
+                motor_id = req[1]
+                reply = build_frame(motor_id, req[3], bytes([25, 0, 0, 0, 0, 0x1E, 0x1A]))
+                bus_free = max(bus_free, now) + self.server.wire_s
+                replies.append((bus_free + self.server.delay_s, reply))
+            for due, reply in replies:
+                wait = due - time.perf_counter()
+                if wait > 0:
+                    time.sleep(wait)
+                sock.sendall(reply[:6])
+                sock.sendall(reply[6:])
+
+
+def start_stand_in(delay_s: float, wire_s: float = 0.0):
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), StandInHandler)
+    server.daemon_threads = True
+    server.delay_s = delay_s
+    server.wire_s = wire_s
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def legacy_transact(sock: socket.socket, frame: bytes, timeout: float = 0.2) -> bytes:
+    """复刻旧版 transact 的 TCP 接收循环 (1ms 睡眠轮询)"""
+    sock.sendall(frame)
+    t0 = time.time()
+    buf = b''
+    while time.time() - t0 < timeout:
+        remaining = FRAME_SIZE - len(buf)
+        if remaining > 0:
+            chunk = sock.recv(remaining)
+            if chunk:
+                buf += chunk
+        if len(buf) >= FRAME_SIZE:
+            break
+        time.sleep(0.001)
+    return buf
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def report(name: str, samples_s):
+    ms = [x * 1000.0 for x in samples_s]
+    print(f"{name:<22} p50={percentile(ms, 50):7.3f}ms  p99={percentile(ms, 99):7.3f}ms  "
+          f"mean={statistics.mean(ms):7.3f}ms  n={len(ms)}")
+
+
+def bench_sweep(args):
+    """多电机状态扫描：逐个 transact vs 流水线 transact_many"""
+    server = start_stand_in(args.delay_ms / 1000.0, args.wire_ms / 1000.0)
+    host, port = server.server_address
+    comm = RS485Comm(port=f'{host}:{port}')
+    assert comm.available, '无法连接替身网关'
+    ids = list(range(1, args.motors + 1))
+    sequential, pipelined = [], []
+    for _ in range(args.count):
+        t0 = time.perf_counter()
+        assert all(comm.read_status(motor_id) for motor_id in ids)
+        sequential.append(time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        assert all(comm.read_status_many(ids).values())
+        pipelined.append(time.perf_counter() - t0)
+    comm.close()
+    server.shutdown()
+    print(f"{args.motors}个电机, 网关往返 {args.delay_ms}ms, 单帧总线 {args.wire_ms}ms")
+    report('逐个事务扫描', sequential)
+    report('流水线扫描', pipelined)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='transact 时延 (本地TCP替身)')
+    parser.add_argument('--count', type=int, default=2000, help='每种方式的事务数')
+    parser.add_argument('--delay-ms', type=float, default=0.0, help='替身网关应答延迟(毫秒)')
+    parser.add_argument('--sweep', action='store_true',
+                        help='对比逐个事务与流水线 transact_many 的多电机扫描耗时')
+    parser.add_argument('--motors', type=int, default=3, help='扫描的电机数量 (--sweep)')
+    parser.add_argument('--wire-ms', type=float, default=1.1, help='单帧总线占用时间(毫秒, --sweep)')
+    args = parser.parse_args()
+
+    if args.sweep:
+        bench_sweep(args)
+        return
+
+    server = start_stand_in(args.delay_ms / 1000.0)
+    host, port = server.server_address
+    frame = build_frame(1, CMD_READ_ANGLE)
+
+    # 旧实现
+    sock = socket.create_connection((host, port))
+    sock.settimeout(0.2)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    legacy = []
+    for _ in range(args.count):
+        t0 = time.perf_counter()
+        assert len(legacy_transact(sock, frame)) == FRAME_SIZE
+        legacy.append(time.perf_counter() - t0)
+    sock.close()
+
+    # 新实现 (替身网关没有真实 RS485 线路，不计帧间静默间隔，只比较软件开销)
+    comm = RS485Comm(port=f'{host}:{port}', timing=BusTiming(silent_interval=0.0))
+    assert comm.available, '无法连接替身网关'
+    current = []
+    for _ in range(args.count):
+        t0 = time.perf_counter()
+        assert comm.transact(1, CMD_READ_ANGLE) is not None
+        current.append(time.perf_counter() - t0)
+    comm.close()
+    server.shutdown()
+
+    report('旧: sleep(1ms)轮询', legacy)
+    report('新: selectors事件驱动', current)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,21 @@
+"""测试共用的小工具：轮询等待条件成立、构造 decode_status 格式的状态字典
+
+总线替身一律使用 motor_sim.MotorSimulator (按 FrameDecoder 拆帧，支持流水线与故障注入)。
+"""
+import time
+
+
+def wait_for(predicate, timeout=2.0):
+    """每10ms检查一次 predicate，timeout 秒内成立返回True"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+def status(angle_deg, temperature=30):
+    """decode_status 格式的状态字典 (只含角度与温度字段)"""
+    return {'angle_deg': angle_deg, 'angle_raw': int(round(angle_deg * 100.0)) % 36000,
+            'temperature': temperature}
@@ -24,17 +24,8 @@ REG_FAULT = 0x0002
 # 一次性读取连续3个寄存器
 READ_COUNT = 3
 
-# ---------------- Modbus RTU CRC16 -----------------
-def modbus_crc(data: bytes) -> int:
-    crc = 0xFFFF
-    for b in data:
-        crc ^= b
-        for _ in range(8):
-            if crc & 0x0001:
-                crc = (crc >> 1) ^ 0xA001
-            else:
-                crc >>= 1
-    return crc & 0xFFFF
+# ---------------- Modbus RTU CRC16 (查表实现，见 crc16.py) -----------------
+from crc16 import modbus_crc
 
 def build_read_req(address: int, start_reg: int, count: int) -> bytes:
     p = struct.pack('>B B H H', address & 0xFF, 0x03, start_reg & 0xFFFF, count & 0xFFFF)
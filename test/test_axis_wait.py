@@ -0,0 +1,155 @@
+"""测试到位等待：条件变量/Future 由轮询结果驱动、超时与中止，控制器与 API 的 wait 参数
+
+运行:
+    python test/test_axis_wait.py
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from axis_wait import AxisWaiters, within
+from motor_sim import MotorSimulator
+from bus_registry import acquire_bus, release_bus
+from ptz_controller import PTZController
+
+
+def test_waiters_driven_by_samples():
+    lock = threading.Lock()
+    waiters = AxisWaiters(lock)
+    assert within(179.8, -179.9, 0.5) and not within(None, 0.0, 0.5)
+
+    reached = waiters.future({1: 30.0, 2: 10.0}, tolerance=0.5, timeout=None)
+    late = waiters.future({1: 90.0}, tolerance=0.5, timeout=0.05)
+    # 回调里读取受同一把锁保护的状态不会死锁
+    seen = []
+    reached.add_done_callback(lambda f: seen.append((f.result(), lock.acquire(timeout=1.0) and lock.release())))
+    assert not reached.cancel()
+
+    results = []
+    worker = threading.Thread(target=lambda: results.append(waiters.wait({1: 30.0}, 0.5, timeout=2.0)))
+    worker.start()
+    waiters.publish({1: 12.0, 2: 10.0}, time.monotonic())
+    assert not reached.done() and not late.done()
+    waiters.publish({1: 29.7, 2: None}, time.monotonic() + 0.1)      # 2号读取失败，沿用上次角度
+    worker.join(1.0)
+    assert results == [True]
+    assert reached.result(0) is True and seen == [(True, None)]
+    assert late.result(0) is False                                      # 在下一次采样时判定超时
+
+    pending = waiters.future({1: 90.0}, timeout=None)
+    blocked = []
+    worker = threading.Thread(target=lambda: blocked.append(waiters.wait({1: 90.0}, timeout=5.0)))
+    worker.start()
+    time.sleep(0.05)
+    waiters.abort()
+    worker.join(1.0)
+    assert pending.result(0) is False and blocked == [False]
+    assert waiters.wait({1: 29.7}, timeout=0.01) is False             # 中止后清空已知角度
+
+
+def test_future_after_stop_resolves():
+    waiters = AxisWaiters(threading.Lock())
+    waiters.publish({1: 10.0}, time.monotonic())
+    waiters.abort()
+    # 停止后登记的等待立即以 False 结束，不会因没有 publish() 而永远挂起
+    started = time.monotonic()
+    assert waiters.future({1: 90.0}, timeout=None).result(0) is False
+    assert waiters.wait({1: 90.0}, timeout=5.0) is False
+    assert time.monotonic() - started < 0.1
+    waiters.resume()
+    pending = waiters.future({1: 10.0}, timeout=None)
+    assert not pending.done()
+    waiters.publish({1: 10.0}, time.monotonic())
+    assert pending.result(0) is True
+
+    # 控制器：stop_monitoring() 恰好发生在检查监控状态之后、登记等待之前
+    with MotorSimulator(motor_ids=(1, 2)) as sim:
+        ptz = PTZController(port=sim.address)
+        try:
+            ptz.start_monitoring(interval_ms=20)
+            check = ptz._wait_targets
+
+            def racing_check(*args):
+                targets = check(*args)
+                ptz.stop_monitoring()
+                return targets
+
+            ptz._wait_targets = racing_check
+            assert ptz.wait_until_reached_future(yaw_deg=-90.0, timeout=None).result(1.0) is False
+            del ptz._wait_targets
+            ptz.start_monitoring(interval_ms=20)
+            assert ptz.wait_until_reached_future(yaw_deg=0.0, pitch_deg=0.0, timeout=1.0).result(2.0)
+        finally:
+            ptz.close()
+
+
+def test_controller_wait_until_reached():
+    with MotorSimulator(motor_ids=(1, 2)) as sim:
+        bus = acquire_bus(sim.address)
+        ptz = PTZController(port=sim.address)
+        try:
+            try:
+                ptz.wait_until_reached(yaw_deg=0.0)
+                assert False, '未启动监控应抛出 RuntimeError'
+            except RuntimeError:
+                pass
+            ptz.start_monitoring(interval_ms=20)
+            assert ptz.wait_until_reached(yaw_deg=0.0, pitch_deg=0.0, timeout=1.0)
+            reads = lambda: sum(m['transactions'] for m in bus.metrics_snapshot()['commands'].values())
+
+            # 10 RPM = 60°/s：30° 约 0.5s；多个等待者共用同一条轮询流
+            assert ptz.set_yaw_angle(30.0, speed_rpm=10)
+            futures = [ptz.wait_until_reached_future(yaw_deg=30.0) for _ in range(20)]
+            cycles, before, started = ptz.get_poll_stats()['cycles'], reads(), time.monotonic()
+            assert ptz.wait_until_reached(yaw_deg=30.0, timeout=3.0)
+            elapsed = time.monotonic() - started
+            assert 0.35 < elapsed < 1.0, elapsed
+            assert all(f.result(1.0) for f in futures)
+            # 等待期间的总线事务只有轮询本身 (每周期两轴一次)
+            assert reads() - before <= 2 * (ptz.get_poll_stats()['cycles'] - cycles) + 2
+
+            assert ptz.set_pitch_angle(-6.0, speed_rpm=10)
+            assert asyncio.run(ptz.wait_until_reached_async(pitch_deg=-6.0, timeout=3.0))
+            assert not ptz.wait_until_reached(pitch_deg=60.0, timeout=0.1)
+            assert ptz.wait_until_reached_future(yaw_deg=-90.0, timeout=0.1).result(1.0) is False
+
+            pending = ptz.wait_until_reached_future(yaw_deg=-90.0, timeout=None)
+            ptz.stop_monitoring()
+            assert pending.result(1.0) is False
+        finally:
+            ptz.close()
+            release_bus(bus)
+
+
+def test_api_set_position_wait():
+    import api_server
+
+    with MotorSimulator(motor_ids=(1, 2)) as sim:
+        api_server.init_ptz_controller(port=sim.address)
+        client = api_server.app.test_client()
+        try:
+            resp = client.post('/set_position', json={'yaw': 10.0, 'pitch': 5.0, 'wait': 3.0})
+            assert resp.status_code == 200 and resp.get_json() == {'success': True, 'reached': True}
+            resp = client.post('/set_position', json={'yaw': 10.0, 'pitch': 5.0, 'wait': -1})
+            assert resp.status_code == 400
+            resp = client.post('/set_position', json={'yaw': 10.0, 'pitch': 5.0, 'wait': 1, 'tolerance': 0})
+            assert resp.status_code == 400
+            assert client.post('/set_position', json=['yaw', 'pitch']).status_code == 400
+        finally:
+            api_server.ptz_controller.close()
+            api_server.ptz_controller = None
+
+
+if __name__ == '__main__':
+    test_waiters_driven_by_samples()
+    print("✓ 等待者由采样驱动，超时在采样时判定，中止唤醒所有等待")
+    test_future_after_stop_resolves()
+    print("✓ 停止监控后登记的等待立即以 False 结束")
+    test_controller_wait_until_reached()
+    print("✓ 控制器同步/Future/协程等待到位，不增加总线流量")
+    test_api_set_position_wait()
+    print("✓ /set_position 的 wait 参数")
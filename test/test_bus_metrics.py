@@ -0,0 +1,172 @@
+"""测试事务统计：延迟直方图、重试次数与各失败原因计数，以及 TransactResult 状态
+
+运行:
+    python test/test_bus_metrics.py
+"""
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from bus_metrics import LatencyHistogram
+from motor_sim import MotorSimulator
+from rs485_comm import (RS485Comm, BusInterrupted, CMD_READ_ANGLE, CMD_READ_STATUS_A4, CMD_STOP, STATUS_OK,
+                        encode_target_angle)
+
+def gateway():
+    """仿真网关：1号正常应答，2号回其他ID，3号CRC错误，4号不在总线上 (不应答)，5号回错误命令"""
+    return MotorSimulator(motor_ids=(1, 2, 3, 5), motor_faults={2: 'wrong_id', 3: 'corrupt', 5: 'wrong_cmd'})
+
+
+def test_histogram_buckets():
+    hist = LatencyHistogram()
+    for seconds in (0.00005, 0.0015, 0.0015, 0.003, 2.0):
+        hist.add(seconds)
+    snap = hist.snapshot()
+    assert snap['count'] == 5
+    assert snap['buckets'] == {'0.1': 1, '2': 2, '5': 1, 'inf': 1}
+    assert snap['p50_ms'] == 2.0
+    assert snap['max_ms'] == 2000.0
+
+
+def test_failure_reasons_and_retries():
+    with gateway() as sim:
+        comm = RS485Comm(port=sim.address, timeout=0.02, max_retries=1, auto_reconnect=False)
+        try:
+            assert comm.transact(1, CMD_READ_ANGLE) is not None
+            for motor_id in (2, 3, 4, 5):
+                assert comm.transact(motor_id, CMD_READ_ANGLE) is None
+            assert comm.broadcast_stop()
+            commands = comm.metrics_snapshot()['commands']
+
+            ok = commands['1:0x94']
+            assert (ok['transactions'], ok['attempts'], ok['retries'], ok['successes']) == (1, 1, 0, 1)
+            for name in ('write', 'first_byte', 'frame'):
+                assert ok[name]['count'] == 1, name
+            assert ok['first_byte']['max_ms'] <= ok['frame']['max_ms']
+
+            expected = {2: 'id_mismatch', 3: 'crc', 4: 'timeout', 5: 'cmd_mismatch'}
+            for motor_id, reason in expected.items():
+                m = commands['%d:0x94' % motor_id]
+                assert (m['attempts'], m['retries'], m['failed']) == (2, 1, 1), (motor_id, m)
+                assert m['errors'][reason] == 2, (motor_id, m['errors'])
+                assert m['frame']['count'] == 0
+
+            bcast = commands['205:0x%02X' % CMD_STOP]
+            assert bcast['successes'] == 1 and bcast['write']['count'] == 1
+
+            totals = comm.metrics_snapshot()['totals']
+            assert totals['failed'] == 4 and totals['retries'] == 4
+            comm.reset_metrics()
+            assert comm.metrics_snapshot()['commands'] == {}
+        finally:
+            comm.close()
+
+
+def test_pipelined_and_unavailable():
+    with gateway() as sim:
+        comm = RS485Comm(port=sim.address, timeout=0.05, max_retries=0, auto_reconnect=False)
+        try:
+            results = comm.transact_many([(1, CMD_READ_ANGLE, b''), (4, CMD_READ_ANGLE, b'')])
+            assert results[0] is not None and results[1] is None
+            commands = comm.metrics_snapshot()['commands']
+            assert commands['1:0x94']['frame']['count'] == 1
+            assert commands['4:0x94']['errors']['timeout'] == 1
+            comm.close()
+            assert comm.transact(1, CMD_READ_ANGLE) is None
+            assert comm.metrics_snapshot()['commands']['1:0x94']['errors']['unavailable'] == 1
+        finally:
+            comm.close()
+
+
+def test_interrupted_and_concurrent_counts():
+    with gateway() as sim:
+        comm = RS485Comm(port=sim.address, timeout=1.0, max_retries=0, auto_reconnect=False)
+        try:
+            # 发送前已有中断请求：不发送，计入 interrupted
+            comm.interrupt()
+            try:
+                comm.transact_result(1, CMD_READ_ANGLE)
+                assert False, '应抛出 BusInterrupted'
+            except BusInterrupted:
+                pass
+            m = comm.metrics_snapshot()['commands']['1:0x94']
+            assert (m['transactions'], m['attempts'], m['errors']['interrupted']) == (1, 0, 1)
+
+            # 等待应答时被中断 (4号不应答)，批量事务中每个待发请求各计一次
+            threading.Timer(0.05, comm.interrupt).start()
+            try:
+                comm.transact_result(4, CMD_READ_ANGLE)
+                assert False, '应抛出 BusInterrupted'
+            except BusInterrupted:
+                pass
+            comm.interrupt()
+            try:
+                comm.transact_many_results([(1, CMD_READ_ANGLE, b''), (4, CMD_READ_ANGLE, b'')])
+                assert False, '应抛出 BusInterrupted'
+            except BusInterrupted:
+                pass
+            commands = comm.metrics_snapshot()['commands']
+            assert commands['4:0x94']['errors']['interrupted'] == 2
+            assert commands['1:0x94']['errors']['interrupted'] == 2
+            assert comm.metrics_snapshot()['totals']['errors']['interrupted'] == 4
+
+            # 多线程并发事务：计数在总线锁内更新，不丢失
+            comm.reset_metrics()
+            threads = [threading.Thread(target=lambda: [comm.transact(1, CMD_READ_ANGLE) for _ in range(50)])
+                       for _ in range(8)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            m = comm.metrics_snapshot()['commands']['1:0x94']
+            assert (m['transactions'], m['attempts'], m['successes']) == (400, 400, 400), m
+            assert m['frame']['count'] == 400
+        finally:
+            comm.close()
+
+
+def test_transact_result_status():
+    with gateway() as sim:
+        comm = RS485Comm(port=sim.address, timeout=0.02, max_retries=1, auto_reconnect=False)
+        try:
+            ok = comm.transact_result(1, CMD_READ_ANGLE)
+            assert ok.ok and ok.status == STATUS_OK and ok.attempts == 1 and len(ok.data) == 8
+            crc = comm.transact_result(3, CMD_READ_ANGLE)
+            assert crc.status == 'crc' and crc.retryable and crc.attempts == 2 and crc.data is None
+            absent = comm.transact_result(4, CMD_READ_ANGLE)
+            assert absent.status == 'timeout' and absent.motor_absent
+            # 连续失败后进入隔离期：不发送，立即返回
+            for _ in range(3):
+                comm.transact_result(4, CMD_READ_ANGLE)
+            quarantined = comm.transact_result(4, CMD_READ_ANGLE)
+            assert quarantined.status == 'quarantined' and quarantined.attempts == 0
+            # 隔离只拦截读命令：运动/停止指令照常发送并重试
+            move = comm.transact_result(4, CMD_READ_STATUS_A4, encode_target_angle(10.0, 10)[0])
+            assert move.status == 'timeout' and move.attempts == 2
+            assert comm.transact_result(4, CMD_STOP).attempts == 2
+            # CRC错误说明电机在线，不计入超时
+            rtt = comm.rtt_stats()
+            assert rtt['rtt']['3:0x94']['timeouts'] == 0 and rtt['rtt']['4:0x94']['timeouts'] > 0
+            results = comm.transact_many_results([(1, CMD_READ_ANGLE, b''), (2, CMD_READ_ANGLE, b'')])
+            assert [r.status for r in results] == ['ok', 'timeout']
+            comm.close()
+            down = comm.transact_result(1, CMD_READ_ANGLE)
+            assert down.transport_down and down.attempts == 0
+            assert down.to_dict()['status'] == 'unavailable'
+        finally:
+            comm.close()
+
+
+if __name__ == '__main__':
+    test_histogram_buckets()
+    print("✓ 直方图分桶与分位数")
+    test_failure_reasons_and_retries()
+    print("✓ 失败原因与重试计数")
+    test_pipelined_and_unavailable()
+    print("✓ 流水线与连接不可用计数")
+    test_interrupted_and_concurrent_counts()
+    print("✓ 中断计数与并发事务计数")
+    test_transact_result_status()
+    print("✓ TransactResult 状态与失败原因")
@@ -0,0 +1,129 @@
+"""测试进程级总线注册表：同一端口共享一个连接，引用计数归零才关闭
+
+运行:
+    python test/test_bus_registry.py
+"""
+import os
+import socket
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from bus_registry import acquire_bus, release_bus, active_buses, normalize_port, broadcast_stop_all, fire_broadcast
+from bus_scheduler import BusScheduler
+from rs485_comm import RS485Comm, CMD_CLOSE, CMD_STOP, STATE_DISCONNECTED
+from ptz_controller import PTZController
+from lift_motor import LiftMotorController
+from motor_sim import MotorSimulator
+
+
+def test_normalize_port():
+    assert normalize_port('Gateway.local:0502') == 'tcp://gateway.local:502'
+    assert normalize_port(' com9 ') == 'COM9'
+
+
+def test_controllers_share_one_connection():
+    with MotorSimulator(motor_ids=(1, 2, 3)) as sim:
+        port = sim.address.replace('127.0.0.1', 'localhost')
+        ptz = PTZController(port=port)
+        lift = LiftMotorController(port=port.upper())
+        try:
+            assert ptz._comm is lift._comm
+            assert sim.stats()['connections'] == 1
+            assert active_buses()[normalize_port(port)]['refs'] == 2
+            assert ptz.read_yaw_angle() is not None
+            assert lift.read_position() is not None
+            ptz.close()
+            ptz.close()                                 # 重复关闭只释放一次
+            assert lift.available
+            assert lift.read_position() is not None
+        finally:
+            lift.close()
+        assert normalize_port(port) not in active_buses()
+
+
+def test_conflicting_options_rejected():
+    with MotorSimulator() as sim:
+        bus = acquire_bus(sim.address, timeout=0.5)
+        try:
+            assert acquire_bus(sim.address) is bus               # 省略参数：沿用已打开的总线
+            assert acquire_bus(sim.address, timeout=0.5) is bus
+            for baudrate, kwargs in ((9600, {}), (115200, {'timeout': 1.0}), (115200, {'max_retries': 0})):
+                try:
+                    acquire_bus(sim.address, baudrate, **kwargs)
+                    assert False, (baudrate, kwargs)
+                except ValueError:
+                    pass
+            assert active_buses()[normalize_port(sim.address)]['refs'] == 3
+        finally:
+            for _ in range(3):
+                release_bus(bus)
+        assert normalize_port(sim.address) not in active_buses()
+
+
+def test_concurrent_polls_batched():
+    with MotorSimulator(motor_ids=(1, 2, 3)) as sim:
+        bus = acquire_bus(sim.address)
+        try:
+            futures = [bus.submit(motor_id, 0x94) for motor_id in (1, 2, 3) for _ in range(5)]
+            assert all(f.result(timeout=2.0).ok for f in futures)
+            many = bus.submit_many([(1, 0x94, b''), (2, 0x94, b'')])
+            assert all(result.ok for result in many.result(timeout=2.0))
+        finally:
+            release_bus(bus)
+
+
+def test_broadcast_stop_on_all_buses():
+    sims = [MotorSimulator().start() for _ in range(3)]
+    buses = [acquire_bus(sim.address) for sim in sims]
+    try:
+        assert broadcast_stop_all(buses) == [True, True, True]
+        assert all(bus.busy_until > 0 for bus in buses)
+    finally:
+        for bus in buses:
+            release_bus(bus)
+        for sim in sims:
+            sim.close()
+
+
+def test_broadcast_link_error_reports_failure():
+    def broken_link():
+        # 对端已关闭的 socketpair：写出立即失败 (EPIPE)
+        ours, theirs = socket.socketpair()
+        theirs.close()
+        return ours
+
+    for cmd in (CMD_STOP, CMD_CLOSE):
+        comm = RS485Comm(port='', transport=broken_link, auto_reconnect=False)
+        try:
+            send = comm.broadcast_stop if cmd == CMD_STOP else comm.broadcast_shutdown
+            assert comm.available and send() is False
+            assert comm.state == STATE_DISCONNECTED
+            m = comm.metrics_snapshot()['commands']['205:0x%02X' % cmd]
+            assert m['errors']['link_error'] == 1 and m['failed'] == 1 and m['successes'] == 0
+            assert send() is False                           # 断开后：连接不可用
+        finally:
+            comm.close()
+
+    # 经调度器与 fire_broadcast 汇总时同样报告失败
+    bus = BusScheduler(RS485Comm(port='', transport=broken_link, auto_reconnect=False))
+    try:
+        assert fire_broadcast(CMD_CLOSE, [bus]) == [False]
+        assert bus.broadcast_shutdown() is False and bus.broadcast_stop() is False
+    finally:
+        bus.close()
+
+
+if __name__ == '__main__':
+    test_normalize_port()
+    print("✓ 端口归一化")
+    test_controllers_share_one_connection()
+    print("✓ 控制器共享连接")
+    test_conflicting_options_rejected()
+    print("✓ 以不同波特率或参数再次打开时报错")
+    test_concurrent_polls_batched()
+    print("✓ 并发轮询合并扫描")
+    test_broadcast_stop_on_all_buses()
+    print("✓ 多总线同时广播停止")
+    test_broadcast_link_error_reports_failure()
+    print("✓ 广播写出失败时返回False")
@@ -0,0 +1,136 @@
+"""测试总线优先级调度：急停广播抢占正在等待响应的状态轮询
+
+运行:
+    python test/test_bus_scheduler.py
+"""
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from rs485_comm import RS485Comm, CMD_READ_ANGLE, CMD_READ_STATUS_A4, encode_target_angle
+from bus_scheduler import BusScheduler, priority_for, PRIORITY_EMERGENCY, PRIORITY_MOTION, PRIORITY_POLL
+from motor_sim import MotorSimulator
+
+
+def test_priority_classes():
+    assert priority_for(0x81) == PRIORITY_EMERGENCY
+    assert priority_for(0x80) == PRIORITY_EMERGENCY
+    assert priority_for(0xA4) == PRIORITY_MOTION
+    assert priority_for(0x94) == PRIORITY_POLL
+
+
+def test_broadcast_preempts_poll():
+    with MotorSimulator(motor_ids=(1,)) as sim:              # 2号为死轴，不应答
+        bus = BusScheduler(RS485Comm(port=sim.address, timeout=1.0, max_retries=0))
+        try:
+            assert bus.read_status(1) is not None
+            poll = bus.submit(2, CMD_READ_ANGLE, timeout=1.0)  # 死轴：等待1秒超时
+            time.sleep(0.05)
+            t0 = time.monotonic()
+            assert bus.broadcast_stop()
+            assert time.monotonic() - t0 < 0.5
+            stats = bus.stats()
+            assert stats['poll']['interrupted'] == 1
+            assert stats['emergency']['wait_max_ms'] < 20.0
+            # 被抢占的轮询重新排队，最终正常结束
+            result = poll.result(timeout=5.0)
+            assert result.data is None and result.status == 'timeout'
+            assert result.attempts == 1
+            assert bus.stats()['poll']['completed'] == 2
+        finally:
+            bus.close()
+    # 关闭后唤醒 socketpair 已关闭，中断与清除中断都是空操作
+    comm = bus._comm
+    comm.interrupt()
+    comm.clear_interrupt()
+    comm.close()
+
+
+def test_preempted_move_not_replayed_after_stop():
+    # 电机转向延迟50ms：0xA4 已发出、正在等待应答时急停到达
+    with MotorSimulator(motor_ids=(1,), latency=0.05) as sim:
+        bus = BusScheduler(RS485Comm(port=sim.address, timeout=1.0, max_retries=0))
+        try:
+            move = bus.submit(1, CMD_READ_STATUS_A4, encode_target_angle(90.0, 10)[0])
+            time.sleep(0.01)
+            assert bus.broadcast_stop()
+            result = move.result(timeout=2.0)
+            assert result.status == 'interrupted' and not result.ok
+            assert bus.stats()['motion']['interrupted'] == 1
+            # 急停之后不再重发 0xA4，电机停在原地
+            time.sleep(0.3)
+            stats = sim.stats()
+            motor = stats['motors'][1]
+            assert stats['requests'] == 2 and stats['broadcasts'] == 1
+            assert not motor['moving'] and motor['angle'] < 5.0, motor
+            time.sleep(0.2)
+            assert sim.stats()['motors'][1]['angle'] == motor['angle']
+            assert bus.read_status(1) is not None
+        finally:
+            bus.close()
+
+
+def test_stop_during_poll_completion_reaches_wire():
+    # 电机转向延迟30ms；中断请求晚50ms才到达 (模拟提交急停与轮询结束之间的竞争)
+    with MotorSimulator(motor_ids=(1, 2), latency=0.03) as sim:
+        comm = RS485Comm(port=sim.address, timeout=1.0, max_retries=0)
+        bus = BusScheduler(comm)
+        interrupt = comm.interrupt
+
+        def late_interrupt():
+            time.sleep(0.05)
+            interrupt()
+
+        try:
+            comm.interrupt = late_interrupt
+            poll = bus.submit(1, CMD_READ_ANGLE)
+            time.sleep(0.01)
+            # 轮询在中断到达前正常结束，迟到的中断不能落在随后执行的 0x81 上
+            reply = bus.stop_motor(2)
+            assert reply is not None and reply['success'], reply
+            assert poll.result(timeout=1.0).ok
+            assert sim.motor(2).commands == 1
+            assert bus.stats()['emergency']['interrupted'] == 0
+        finally:
+            bus.close()
+
+
+def test_concurrent_reads_coalesced():
+    with MotorSimulator(motor_ids=(1,), latency=0.02) as sim:
+        bus = BusScheduler(RS485Comm(port=sim.address))
+        requests = lambda: sim.stats()['requests']
+        try:
+            assert bus.read_status(1) is not None
+            before = requests()
+            threads = [threading.Thread(target=bus.read_status, args=(1,)) for _ in range(20)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            # 20个调用方 -> 至多两次往返 (一次在途、一次在其后排队)
+            assert requests() - before <= 2
+            assert bus.stats()['poll']['coalesced'] >= 18
+            # 新鲜度窗口内直接返回缓存结果
+            before = requests()
+            assert bus.read_angle(1, max_age=1.0) is not None
+            assert requests() == before
+            assert bus.read_angle(1) is not None
+            assert requests() == before + 1
+        finally:
+            bus.close()
+
+
+if __name__ == '__main__':
+    test_priority_classes()
+    print("✓ 优先级分类")
+    test_broadcast_preempts_poll()
+    print("✓ 急停广播抢占轮询")
+    test_preempted_move_not_replayed_after_stop()
+    print("✓ 被急停中断的运动命令不重放")
+    test_stop_during_poll_completion_reaches_wire()
+    print("✓ 轮询结束时提交的急停不被迟到的中断取消")
+    test_concurrent_reads_coalesced()
+    print("✓ 并发读取合并")
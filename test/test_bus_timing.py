@@ -0,0 +1,67 @@
+"""测试按波特率推导的总线时序，以及帧间静默间隔从最后一个字节算起
+
+运行:
+    python test/test_bus_timing.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from bus_timing import BusTiming
+from motor_sim import MotorSimulator
+from rs485_comm import RS485Comm, CMD_READ_ANGLE
+
+
+def test_timing_from_baudrate():
+    t = BusTiming(115200)
+    assert abs(t.frame_time - 13 * 10 / 115200) < 1e-9
+    assert abs(t.silent_interval - 3.5 * 10 / 115200) < 1e-9
+    assert t.reply_time > 2 * t.frame_time
+    slow = BusTiming(9600)
+    assert slow.frame_time > 0.013
+    assert slow.broadcast_gap > slow.silent_interval
+
+
+def test_gap_measured_from_last_byte():
+    """仿真网关记录应答发出与下一条命令到达的时刻，间隔应约等于静默间隔"""
+    gap = 0.02
+    with MotorSimulator(motor_ids=(1,), trace=32) as sim:
+        comm = RS485Comm(port=sim.address, timing=BusTiming(silent_interval=gap, turnaround=0.0))
+        try:
+            for _ in range(5):
+                assert comm.transact(1, CMD_READ_ANGLE) is not None
+        finally:
+            comm.close()
+        marks = sim.trace_events()
+    assert [direction for direction, _, _, _ in marks] == ['rx', 'tx'] * 5
+    gaps = [marks[i + 1][1] - marks[i][1] for i in range(1, len(marks) - 1, 2)]
+    assert len(gaps) == 4
+    assert all(gap * 0.9 <= g < gap + 0.015 for g in gaps), gaps
+
+
+def test_broadcast_defers_quiet_period():
+    """广播发出即返回，静默期由下一条命令发送前等待"""
+    settle = 0.05
+    with MotorSimulator(motor_ids=(1,), trace=32) as sim:
+        comm = RS485Comm(port=sim.address, timing=BusTiming(broadcast_settle=settle))
+        try:
+            t0 = time.monotonic()
+            assert comm.broadcast_stop()
+            assert time.monotonic() - t0 < settle / 2
+            assert comm.busy_until - t0 >= settle
+            assert comm.transact(1, CMD_READ_ANGLE) is not None
+        finally:
+            comm.close()
+        arrivals = [t for direction, t, _, _ in sim.trace_events() if direction == 'rx']
+    assert arrivals[1] - arrivals[0] >= settle * 0.9
+
+
+if __name__ == '__main__':
+    test_timing_from_baudrate()
+    print("✓ 波特率推导时序")
+    test_gap_measured_from_last_byte()
+    print("✓ 静默间隔从最后一个字节算起")
+    test_broadcast_defers_quiet_period()
+    print("✓ 广播不阻塞，静默期延后执行")
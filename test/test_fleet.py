@@ -0,0 +1,161 @@
+"""测试多网关机群控制器：按名称路由，所有网关并行轮询
+
+运行:
+    python test/test_fleet.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from bus_registry import active_buses, normalize_port
+from fleet import FleetController, HeadConfig
+from ptz_controller import PTZController
+from motor_sim import MotorSimulator
+from helpers import wait_for
+
+
+def test_sweep_time_is_slowest_gateway():
+    delays = (0.01, 0.01, 0.01, 0.04)
+    sims = [MotorSimulator(latency=delay).start() for delay in delays]
+    ports = [sim.address for sim in sims]
+    fleet = FleetController([HeadConfig('head-%d' % i, port) for i, port in enumerate(ports)])
+    try:
+        fleet.sweep(timeout=2.0)                      # 预热: 建立连接、RTT表
+        started = time.monotonic()
+        results = fleet.sweep(timeout=2.0)
+        elapsed = time.monotonic() - started
+        assert all(status['yaw'] and status['pitch'] for status in results.values())
+        serial_total = sum(2 * delay for delay in delays)
+        assert elapsed < serial_total * 0.75, (elapsed, serial_total)
+        assert len(active_buses()) >= len(ports)
+    finally:
+        fleet.close()
+        for sim in sims:
+            sim.close()
+    assert not any(normalize_port(port) in active_buses() for port in ports)
+
+
+def test_route_by_name_and_shared_gateway():
+    with MotorSimulator(motor_ids=(1, 2, 3, 4)) as sim_a, MotorSimulator() as sim_b:
+        port_a = sim_a.address
+        fleet = FleetController([
+            {'name': 'north', 'port': port_a},
+            {'name': 'south', 'port': port_a, 'yaw_id': 3, 'pitch_id': 4},
+            {'name': 'east', 'port': sim_b.address},
+        ])
+        try:
+            assert fleet.bus_for('north') is fleet.bus_for('south')
+            assert fleet.set_angles('south', 10.0, 20.0)
+            assert [sim_a.motor(motor_id).commands for motor_id in (1, 2, 3, 4)] == [0, 0, 1, 1]
+            assert sim_a.motor(3).target == 10.0 and sim_a.motor(4).target == 20.0
+            assert sim_b.stats()['requests'] == 0
+            try:
+                fleet.get_status('west')
+                assert False, 'unknown head should raise'
+            except KeyError:
+                pass
+        finally:
+            fleet.close()
+
+        try:
+            FleetController([{'name': 'a', 'port': port_a}, {'name': 'b', 'port': port_a}])
+            assert False, 'duplicate motor id on one bus should raise'
+        except ValueError:
+            pass
+        assert normalize_port(port_a) not in active_buses()
+
+
+def test_monitoring_and_fleet_stop():
+    sims = [MotorSimulator().start() for _ in range(3)]
+    fleet = FleetController([HeadConfig('h%d' % i, sim.address, interval_ms=20)
+                             for i, sim in enumerate(sims)])
+    try:
+        fleet.start_monitoring()
+        assert wait_for(lambda: all(status['yaw'] for status in fleet.get_all_status().values()))
+        statuses = fleet.get_all_status()
+        assert all(status['yaw'] and status['pitch'] for status in statuses.values()), statuses
+        assert all(bus['sweeps'] >= 1 for bus in fleet.stats()['buses'].values())
+        results = fleet.stop_all()
+        assert list(results.values()) == [True, True, True]
+        # 广播发出即返回，等仿真器收到
+        assert wait_for(lambda: all(sim.stats()['broadcasts'] == 1 for sim in sims), timeout=1.0)
+    finally:
+        fleet.close()
+        for sim in sims:
+            sim.close()
+
+
+def test_polling_runs_on_bus_poller():
+    with MotorSimulator(motor_ids=(1, 2, 3, 4), latency=0.05) as sim:
+        fleet = FleetController([{'name': 'north', 'port': sim.address, 'interval_ms': 1000}])
+        ptz = PTZController(port=sim.address, yaw_id=3, pitch_id=4)
+        try:
+            assert fleet.get_poll_stats() is None
+            fleet.start_monitoring()
+            ptz.start_monitoring(interval_ms=1000)
+            bus = fleet.bus_for('north')
+            # 与同一总线上的控制器共用一个轮询线程
+            assert sorted(job.name for job in bus.poller.jobs()) == ['fleet ' + normalize_port(sim.address), 'ptz 3/4']
+            # 后台扫描正在进行：sweep() 等待该轮结果，不重复提交
+            assert wait_for(lambda: sim.stats()['requests'] >= 1)
+            results = fleet.sweep(timeout=2.0)
+            assert results['north']['yaw'] and results['north']['pitch']
+            assert sim.motor(1).commands == 1 and sim.motor(2).commands == 1
+            assert wait_for(lambda: fleet.stats()['buses'][normalize_port(sim.address)]['sweeps'] == 1)
+            poll = fleet.get_poll_stats()[normalize_port(sim.address)]
+            assert poll['cycles'] == 1 and poll['runtime']['count'] == 1
+        finally:
+            ptz.close()
+            fleet.close()
+        assert not bus.poller.jobs()
+
+
+def test_api_fleet_set_position():
+    import api_server
+
+    full = MotorSimulator(motor_ids=(1, 2)).start()
+    half = MotorSimulator(motor_ids=(1,)).start()         # PITCH 电机离线
+    api_server.fleet_controller = FleetController([{'name': 'full', 'port': full.address},
+                                                   {'name': 'half', 'port': half.address}])
+    client = api_server.app.test_client()
+    try:
+        for body in ([1, 2], 'yaw', 3, None):
+            resp = client.post('/fleet/full/set_position', json=body)
+            assert resp.status_code == 400 and not resp.get_json()['success'], body
+        assert client.post('/fleet/full/set_position', json={'yaw': 10.0}).status_code == 400
+        assert client.post('/fleet/full/set_position', json={'yaw': 500.0, 'pitch': 0.0}).status_code == 400
+        assert client.post('/fleet/west/set_position', json={'yaw': 1.0, 'pitch': 2.0}).status_code == 404
+
+        resp = client.post('/fleet/full/set_position', json={'yaw': 10.0, 'pitch': 5.0})
+        assert resp.status_code == 200 and resp.get_json() == {'success': True}
+        assert full.motor(1).target == 10.0 and full.motor(2).target == 5.0
+
+        # 事务失败按原因映射：电机无应答 504，连接断开 503
+        resp = client.post('/fleet/half/set_position', json={'yaw': 10.0, 'pitch': 5.0})
+        body = resp.get_json()
+        assert resp.status_code == 504 and (body['axis'], body['reason']) == ('pitch', 'timeout'), body
+        half.close()
+        resp = client.post('/fleet/half/set_position', json={'yaw': 10.0, 'pitch': 5.0})
+        body = resp.get_json()
+        assert resp.status_code == 503 and body['axis'] == 'yaw', body
+        assert body['reason'] in ('link_error', 'unavailable')
+    finally:
+        api_server.fleet_controller.close()
+        api_server.fleet_controller = None
+        full.close()
+        half.close()
+
+
+if __name__ == '__main__':
+    test_sweep_time_is_slowest_gateway()
+    print("✓ 扫描耗时取决于最慢的网关")
+    test_route_by_name_and_shared_gateway()
+    print("✓ 按名称路由，同一网关多台云台")
+    test_monitoring_and_fleet_stop()
+    print("✓ 机群轮询与广播停止")
+    test_polling_runs_on_bus_poller()
+    print("✓ 机群扫描注册在总线的轮询调度器上，sweep() 等待进行中的扫描")
+    test_api_fleet_set_position()
+    print("✓ /fleet/<name>/set_position 校验请求体并按失败原因返回")
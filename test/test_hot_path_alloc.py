@@ -0,0 +1,87 @@
+"""测试 transact 热路径不产生累积内存分配 (tracemalloc)
+
+预分配的发送/接收缓冲区应被重复使用：大量事务之后，rs485_comm / proto_v43 / crc16
+中残留的分配不随事务数增长，瞬时峰值也保持在很小的常数以内。
+
+运行:
+    python test/test_hot_path_alloc.py
+"""
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from proto_v43 import FRAME_SIZE, FrameDecoder, build_frame
+from motor_sim import MotorSimulator
+from rs485_comm import RS485Comm, CMD_READ_ANGLE, CMD_READ_STATUS_A4, encode_target_angle
+
+HOT_FILES = ('rs485_comm.py', 'proto_v43.py', 'crc16.py', 'bus_metrics.py')
+
+
+def hot_size(snapshot) -> int:
+    return sum(stat.size for stat in snapshot.statistics('filename')
+               if stat.traceback[0].filename.endswith(HOT_FILES))
+
+
+def run(comm, count: int, payload: bytes):
+    for i in range(count):
+        motor_id = 1 + i % 3
+        assert comm.transact(motor_id, CMD_READ_ANGLE) is not None
+        assert comm.transact(motor_id, CMD_READ_STATUS_A4, payload) is not None
+
+
+def test_transact_no_retained_allocations():
+    # 仿真线路按 3Mbps 计时，几千次事务只需几秒
+    with MotorSimulator(motor_ids=(1, 2, 3), baudrate=3000000, latency=0.0) as sim:
+        comm = RS485Comm(port=sim.address)
+        try:
+            payload, _, _ = encode_target_angle(45.0, 100)
+            run(comm, 200, payload)                    # 预热: 帧缓存、RTT表
+            tracemalloc.start()
+            try:
+                run(comm, 100, payload)
+                before = hot_size(tracemalloc.take_snapshot())
+                tracemalloc.reset_peak()
+                base = tracemalloc.get_traced_memory()[0]
+                run(comm, 2000, payload)
+                peak = tracemalloc.get_traced_memory()[1] - base
+                after = hot_size(tracemalloc.take_snapshot())
+            finally:
+                tracemalloc.stop()
+            assert after - before < 512, after - before
+            assert peak < 16 * 1024, peak
+        finally:
+            comm.close()
+
+
+def test_decoder_zero_copy_path():
+    frame = build_frame(2, CMD_READ_ANGLE, bytes(7))
+    dec = FrameDecoder()
+    tracemalloc.start()
+    try:
+        for _ in range(50):
+            with dec.window() as win:
+                win[:FRAME_SIZE] = frame
+            dec.commit(FRAME_SIZE)
+            assert dec.next_frame() >= 0
+        before = tracemalloc.take_snapshot()
+        for _ in range(5000):
+            with dec.window() as win:
+                win[:FRAME_SIZE] = frame
+            dec.commit(FRAME_SIZE)
+            off = dec.next_frame()
+            assert dec.buffer[off + 1] == 2
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    grown = sum(stat.size_diff for stat in after.compare_to(before, 'filename')
+                if stat.traceback[0].filename.endswith(HOT_FILES))
+    assert grown < 256, grown
+
+
+if __name__ == '__main__':
+    test_transact_no_retained_allocations()
+    print("✓ transact 无累积分配")
+    test_decoder_zero_copy_path()
+    print("✓ FrameDecoder 零拷贝路径")
@@ -0,0 +1,118 @@
+"""测试 V4.3 电机仿真器：运动学、停止/关闭/广播、故障注入，以及控制器与API服务器原样运行
+
+运行:
+    python test/test_motor_sim.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from motor_sim import MotorSimulator
+from rs485_comm import RS485Comm, CMD_READ_ANGLE
+from ptz_controller import PTZController
+from helpers import wait_for
+
+
+def test_kinematics_stop_and_broadcast():
+    with MotorSimulator(motor_ids=(1, 2), angles={2: -30.0}) as sim:
+        comm = RS485Comm(port=sim.address, auto_reconnect=False)
+        try:
+            status = comm.read_status(2)
+            assert status['angle_deg'] == -30.0 and status['temperature'] == 30
+            # 10 RPM = 60°/s：移动 30° 约需 0.5s
+            reply = comm.set_target_angle(1, 30.0, speed_rpm=10)
+            assert reply['success']
+            time.sleep(0.2)
+            mid = comm.read_angle(1)
+            assert 3.0 < mid < 27.0, mid
+            assert wait_for(lambda: comm.read_angle(1) == 30.0)
+
+            comm.set_target_angle(1, -90.0, speed_rpm=10)
+            time.sleep(0.1)
+            assert comm.stop_motor(1)['success']
+            stopped = comm.read_angle(1)
+            time.sleep(0.1)
+            assert comm.read_angle(1) == stopped and stopped > 0.0
+
+            comm.set_target_angle(1, 90.0, speed_rpm=10)
+            comm.set_target_angle(2, 90.0, speed_rpm=10)
+            assert comm.broadcast_stop()
+            assert wait_for(lambda: sim.stats()['broadcasts'] == 1)
+            motors = sim.stats()['motors']
+            assert not motors[1]['moving'] and not motors[2]['moving']
+            assert comm.close_motor(2)['success'] and not sim.motor(2).enabled
+            assert comm.read_status(7) is None           # 不存在的电机不应答
+        finally:
+            comm.close()
+
+
+def test_fault_injection():
+    with MotorSimulator(motor_ids=(1,), seed=1) as sim:
+        comm = RS485Comm(port=sim.address, timeout=0.05, max_retries=0, auto_reconnect=False)
+        try:
+            sim.set_faults(drop=1.0)
+            assert comm.transact_result(1, CMD_READ_ANGLE).status == 'timeout'
+            sim.set_faults(drop=0.0, corrupt=1.0)
+            assert comm.transact_result(1, CMD_READ_ANGLE).status == 'crc'
+            sim.set_faults(corrupt=0.0, garbage=1.0)
+            for _ in range(5):
+                assert comm.transact_result(1, CMD_READ_ANGLE).ok
+            sim.set_faults(garbage=0.0, latency=0.02, jitter=0.005)
+            result = comm.transact_result(1, CMD_READ_ANGLE, timeout=0.1)
+            assert result.ok and result.elapsed >= 0.02
+            stats = sim.stats()
+            assert (stats['dropped'], stats['corrupted'], stats['garbage']) == (1, 1, 5)
+        finally:
+            comm.close()
+
+    # 单台电机的固定应答故障；trace 记录收发事件
+    faults = {2: 'wrong_id', 3: 'wrong_cmd', 4: 'corrupt', 5: 'stray'}
+    with MotorSimulator(motor_ids=(1, 2, 3, 4, 5), motor_faults=faults, trace=8) as sim:
+        comm = RS485Comm(port=sim.address, timeout=0.05, max_retries=0, auto_reconnect=False)
+        try:
+            statuses = [comm.transact_result(motor_id, CMD_READ_ANGLE).status for motor_id in (2, 3, 4, 5)]
+            assert statuses == ['id_mismatch', 'cmd_mismatch', 'crc', 'ok']
+            assert sim.stats()['connections'] == 1
+            events = sim.trace_events()
+            assert len(events) == 8 and [e[0] for e in events[:2]] == ['rx', 'tx']
+            assert [e[2] for e in events if e[0] == 'rx'] == [2, 3, 4, 5]
+        finally:
+            comm.close()
+
+
+def test_controller_and_api_server_unchanged():
+    import api_server
+
+    with MotorSimulator(motor_ids=(1, 2)) as sim:
+        ptz = PTZController(port=sim.address)
+        try:
+            assert ptz.set_ptz_angles(20.0, -10.0, speed_rpm=200)
+            assert wait_for(lambda: ptz.read_yaw_angle() == 20.0 and ptz.read_pitch_angle() == -10.0)
+        finally:
+            ptz.close()
+
+        api_server.init_ptz_controller(port=sim.address)
+        client = api_server.app.test_client()
+        try:
+            resp = client.post('/set_position', json={'yaw': 45.0, 'pitch': 15.0})
+            assert resp.status_code == 200, resp.get_json()
+            motors = lambda: sim.stats()['motors']
+            assert wait_for(lambda: motors()[1]['angle'] == 45.0 and motors()[2]['angle'] == 15.0)
+            time.sleep(0.6)                               # 等一次 500ms 轮询
+            status = client.get('/get_status').get_json()
+            assert status['success'] and status['yaw_angle'] == 45.0 and status['pitch_angle'] == 15.0
+            assert client.post('/stop').status_code == 200
+        finally:
+            api_server.ptz_controller.close()
+            api_server.ptz_controller = None
+
+
+if __name__ == '__main__':
+    test_kinematics_stop_and_broadcast()
+    print("✓ 运动学、停止、广播与关闭")
+    test_fault_injection()
+    print("✓ 故障注入：丢帧、CRC错误、噪声字节、延迟")
+    test_controller_and_api_server_unchanged()
+    print("✓ PTZController 与 API 服务器对仿真器原样运行")
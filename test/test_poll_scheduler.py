@@ -0,0 +1,177 @@
+"""测试固定频率轮询调度器：无漂移的绝对截止时间、超时追赶策略、统计，以及控制器共用总线轮询线程
+
+运行:
+    python test/test_poll_scheduler.py
+"""
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from poll_scheduler import PollScheduler, AdaptiveInterval, POLICY_BURST, COMMAND_HOLD
+from motor_sim import MotorSimulator
+from bus_registry import acquire_bus, release_bus
+from ptz_controller import PTZController
+from lift_motor import LiftMotorController
+from helpers import wait_for
+
+
+def run_job(interval, duration, work, policy='skip'):
+    """运行一个任务 duration 秒，返回 (各次开始时间, 统计)"""
+    poller = PollScheduler()
+    starts = []
+
+    def callback():
+        starts.append(time.monotonic())
+        time.sleep(work(len(starts)))
+
+    try:
+        job = poller.add(callback, interval, policy=policy)
+        time.sleep(duration)
+        job.cancel()
+        return starts, job.stats()
+    finally:
+        poller.close()
+
+
+def test_no_drift():
+    # 每次耗时 8ms：sleep 式循环周期约 28ms，固定频率仍为 20ms
+    starts, stats = run_job(0.02, 0.5, lambda n: 0.008)
+    assert 23 <= len(starts) <= 26, len(starts)
+    span = starts[-1] - starts[0]
+    assert abs(span - (len(starts) - 1) * 0.02) < 0.01, span
+    assert stats['overruns'] == 0 and stats['skipped'] == 0
+    assert stats['lateness']['count'] == len(starts) and stats['runtime']['p50_ms'] >= 5.0
+
+
+def test_overrun_skip_keeps_phase():
+    # 第3次耗时 50ms：错过两个截止时间，之后仍对齐原来的 20ms 网格
+    starts, stats = run_job(0.02, 0.4, lambda n: 0.05 if n == 3 else 0.0)
+    assert stats['overruns'] == 1 and stats['skipped'] == 2 and stats['burst'] == 0, stats
+    after = starts[3]
+    assert after - starts[2] >= 0.055
+    phase = ((after - starts[0]) / 0.02) % 1.0
+    assert min(phase, 1.0 - phase) < 0.25, phase
+
+
+def test_overrun_burst_catches_up():
+    starts, stats = run_job(0.02, 0.4, lambda n: 0.05 if n == 3 else 0.0, policy=POLICY_BURST)
+    assert stats['overruns'] >= 1 and stats['burst'] >= 1 and stats['skipped'] == 0, stats
+    # 补跑的周期紧接着执行，总次数与没有超时时相同
+    assert starts[3] - starts[2] < 0.06 and starts[4] - starts[3] < 0.01
+    assert 19 <= len(starts) <= 22, len(starts)
+
+
+def test_cancel_waits_and_errors_counted():
+    poller = PollScheduler()
+    entered = threading.Event()
+    finished = []
+
+    def slow():
+        entered.set()
+        time.sleep(0.05)
+        finished.append(True)
+
+    def broken():
+        raise RuntimeError('boom')
+
+    try:
+        bad = poller.add(broken, 0.01)
+        job = poller.add(slow, 1.0)
+        assert entered.wait(1.0)
+        job.cancel()
+        assert finished == [True]
+        time.sleep(0.05)
+        assert bad.stats()['errors'] >= 2
+        assert poller.jobs() == [bad]
+    finally:
+        poller.close()
+
+
+def test_controllers_share_bus_poller():
+    with MotorSimulator(motor_ids=(1, 2, 3)) as sim:
+        bus = acquire_bus(sim.address)
+        ptz = PTZController(port=sim.address)
+        lift = LiftMotorController(port=sim.address, motor_id=3)
+        try:
+            ptz.start_monitoring(interval_ms=20)
+            lift.start_monitoring(interval_ms=20)
+            assert len(bus.poller.jobs()) == 2
+            time.sleep(0.5)
+            for stats in (ptz.get_poll_stats(), lift.get_poll_stats()):
+                assert stats['cycles'] >= 20 and 40.0 <= stats['rate_hz'] <= 55.0, stats
+            assert ptz.get_yaw_status()['angle_deg'] == 0.0 and lift.get_status() is not None
+            assert bus.poller.stats()['load'] > 0.0
+            ptz.stop_monitoring()
+            lift.stop_monitoring()
+            assert bus.poller.jobs() == [] and ptz.get_poll_stats() is None
+        finally:
+            ptz.close()
+            lift.close()
+            release_bus(bus)
+
+
+def test_adaptive_interval_backoff():
+    rate = AdaptiveInterval(floor=0.02, ceiling=0.2)
+    rate.reset(0.0)
+    intervals = []
+    for i, angle in enumerate([10.0, 10.0, 10.0, 10.0, 10.0, 10.0, 10.0]):
+        rate.on_sample(angle, i * 1.0)
+        intervals.append(rate.interval)
+    # 连续静止 2 次后开始翻倍，封顶于上限
+    assert intervals == [0.02, 0.02, 0.04, 0.08, 0.16, 0.2, 0.2], intervals
+    rate.on_command(10.0)
+    assert rate.interval == 0.02 and rate.next_due <= 10.0
+    rate.on_sample(10.0, 10.0 + COMMAND_HOLD / 2)          # 起步前仍保持下限
+    assert rate.interval == 0.02
+    rate.on_sample(179.9, 11.0)
+    rate.on_sample(-179.9, 11.02)                           # 跨 ±180° 也算运动
+    assert rate.moving and rate.interval == 0.02
+    rate.on_sample(None, 11.04)                             # 读取失败不改变间隔
+    assert rate.interval == 0.02 and abs(rate.next_due - 11.06) < 1e-9
+
+
+def test_adaptive_polling_follows_motion():
+    with MotorSimulator(motor_ids=(1, 2)) as sim:
+        bus = acquire_bus(sim.address)
+        ptz = PTZController(port=sim.address)
+        try:
+            ptz.set_poll_rates(1, floor_ms=20)
+            ptz.start_monitoring(interval_ms=300, adaptive=True)
+            idle = lambda: all(axis['interval_ms'] == 300.0 for axis in ptz.get_poll_stats()['axes'].values())
+            assert wait_for(idle, 3.0)
+            reads = lambda motor_id: bus.metrics_snapshot()['commands'][f'{motor_id}:0x94']['transactions']
+            yaw_before, pitch_before = reads(1), reads(2)
+
+            # 10 RPM = 60°/s：YAW 运动约 0.5s，期间按 20ms 轮询，PITCH 仍为 300ms
+            assert ptz.set_yaw_angle(30.0, speed_rpm=10)
+            time.sleep(0.3)
+            axes = ptz.get_poll_stats()['axes']
+            assert axes[1]['moving'] and axes[1]['interval_ms'] == 20.0 and axes[2]['interval_ms'] == 300.0, axes
+            assert 3.0 < ptz.get_yaw_status()['angle_deg'] < 30.0
+            assert reads(1) - yaw_before >= 10 and reads(2) - pitch_before <= 2
+
+            assert wait_for(lambda: ptz.get_yaw_status()['angle_deg'] == 30.0)
+            assert wait_for(idle, 3.0)
+        finally:
+            ptz.close()
+            release_bus(bus)
+
+
+if __name__ == '__main__':
+    test_no_drift()
+    print("✓ 绝对截止时间，周期不随耗时漂移")
+    test_overrun_skip_keeps_phase()
+    print("✓ skip 策略丢弃错过的周期并保持相位")
+    test_overrun_burst_catches_up()
+    print("✓ burst 策略立即补跑错过的周期")
+    test_cancel_waits_and_errors_counted()
+    print("✓ 取消等待本次轮询结束，回调异常计数")
+    test_controllers_share_bus_poller()
+    print("✓ 同一总线上的控制器共用一个轮询线程")
+    test_adaptive_interval_backoff()
+    print("✓ 自适应间隔：指令后与运动中取下限，停稳后指数退避")
+    test_adaptive_polling_follows_motion()
+    print("✓ 自适应轮询：运动轴加速、静止轴保持上限")
@@ -0,0 +1,165 @@
+"""测试 RS485Comm 连接状态机：EOF 判定断开、断开期间立即失败、指数退避重连、keepalive 与状态回调
+
+在同一端口上停止、重启电机仿真器 (TCP网关替身)，检查状态变化与通信恢复。
+
+运行:
+    python test/test_reconnect.py
+"""
+import os
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from motor_sim import MotorSimulator
+from rs485_comm import (RS485Comm, CMD_READ_ANGLE, STATE_CONNECTING, STATE_CONNECTED,
+                        STATE_DISCONNECTED, STATE_CLOSED, KEEPALIVE_IDLE, KEEPALIVE_INTERVAL,
+                        KEEPALIVE_COUNT)
+from helpers import wait_for
+
+
+def free_port():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+class StateRecorder:
+    """记录状态回调 (old, new, 时刻)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.events = []
+
+    def __call__(self, old, new):
+        with self.lock:
+            self.events.append((old, new, time.monotonic()))
+
+    def transitions(self):
+        with self.lock:
+            return [(old, new) for old, new, _ in self.events]
+
+    def times(self, old, new):
+        with self.lock:
+            return [t for o, n, t in self.events if (o, n) == (old, new)]
+
+
+def test_eof_fail_fast_and_recovery():
+    sim = MotorSimulator(motor_ids=(1,)).start()
+    port = int(sim.address.rsplit(':', 1)[1])
+    comm = RS485Comm(port=sim.address, timeout=0.2, max_retries=2, reconnect_min=0.05, reconnect_max=0.4)
+    recorder = StateRecorder()
+    comm.add_state_listener(recorder)
+    try:
+        assert comm.state == STATE_CONNECTED and comm.available
+        assert comm.read_status(1)['angle_deg'] == 0.0
+
+        # 网关断开：下一次事务读到 EOF，立即判定断开，不消耗重试
+        sim.close()
+        result = comm.transact_result(1, CMD_READ_ANGLE)
+        assert result.status == 'link_error' and result.attempts == 1
+        assert recorder.transitions()[0] == (STATE_CONNECTED, STATE_DISCONNECTED)
+        assert not comm.available
+
+        # 断开期间事务立即失败
+        started = time.monotonic()
+        result = comm.transact_result(1, CMD_READ_ANGLE)
+        assert result.status == 'unavailable' and result.attempts == 0
+        assert time.monotonic() - started < 0.01
+        assert comm.read_status(1) is None and not comm.broadcast_stop()
+
+        # 重连间隔按指数退避增长，上限 reconnect_max
+        time.sleep(1.3)
+        attempts = recorder.times(STATE_DISCONNECTED, STATE_CONNECTING)
+        gaps = [b - a for a, b in zip(attempts, attempts[1:])]
+        assert len(gaps) >= 4, gaps
+        assert 0.04 < gaps[0] < 0.1 and 0.08 < gaps[1] < 0.17 and 0.17 < gaps[2] < 0.3, gaps
+        assert all(gap < 0.5 for gap in gaps) and gaps[-1] > 0.35, gaps
+        assert comm.reconnect_count == 0
+
+        # 网关在同一端口恢复：自动重连，通信恢复
+        sim = MotorSimulator(motor_ids=(1,), port=port, angles={1: 12.5}).start()
+        assert wait_for(lambda: comm.state == STATE_CONNECTED, timeout=1.0)
+        assert comm.reconnect_count == 1 and comm.available
+        assert comm.read_status(1)['angle_deg'] == 12.5
+        assert recorder.transitions()[-1] == (STATE_CONNECTING, STATE_CONNECTED)
+        assert set(recorder.transitions()) == {(STATE_CONNECTED, STATE_DISCONNECTED),
+                                               (STATE_DISCONNECTED, STATE_CONNECTING),
+                                               (STATE_CONNECTING, STATE_DISCONNECTED),
+                                               (STATE_CONNECTING, STATE_CONNECTED)}
+    finally:
+        comm.close()
+        sim.close()
+    assert comm.state == STATE_CLOSED and recorder.transitions()[-1] == (STATE_CONNECTED, STATE_CLOSED)
+
+
+def test_initial_connect_failure_and_listeners():
+    port = free_port()
+    address = f'127.0.0.1:{port}'
+    comm = RS485Comm(port=address, timeout=0.2, reconnect_min=0.02, reconnect_max=0.05)
+    recorder = StateRecorder()
+
+    def broken(old, new):
+        raise RuntimeError('回调异常不影响状态机')
+
+    comm.add_state_listener(broken)
+    comm.add_state_listener(recorder)
+    sim = None
+    try:
+        # 构造时连接失败：立即可知，后台继续重连
+        assert comm.state in (STATE_DISCONNECTED, STATE_CONNECTING) and not comm.available
+        assert comm.transact_result(1, CMD_READ_ANGLE).status == 'unavailable'
+        sim = MotorSimulator(motor_ids=(1,), port=port).start()
+        assert wait_for(lambda: comm.state == STATE_CONNECTED, timeout=1.0)
+        assert comm.read_angle(1) == 0.0
+
+        # TCP keepalive 探测半开连接
+        sock = comm._tcp_sock
+        assert sock.getsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE)
+        assert sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY)
+        for opt, value in (('TCP_KEEPIDLE', KEEPALIVE_IDLE), ('TCP_KEEPINTVL', KEEPALIVE_INTERVAL),
+                           ('TCP_KEEPCNT', KEEPALIVE_COUNT)):
+            if hasattr(socket, opt):
+                assert sock.getsockopt(socket.IPPROTO_TCP, getattr(socket, opt)) == value
+
+        # 移除的回调不再收到通知
+        comm.remove_state_listener(recorder)
+        seen = len(recorder.transitions())
+        sim.close()
+        assert comm.transact_result(1, CMD_READ_ANGLE).status == 'link_error'
+        sim = MotorSimulator(motor_ids=(1,), port=port).start()
+        assert wait_for(lambda: comm.state == STATE_CONNECTED, timeout=1.0)
+        assert len(recorder.transitions()) == seen and comm.reconnect_count == 2
+    finally:
+        comm.close()
+        if sim is not None:
+            sim.close()
+
+
+def test_no_auto_reconnect():
+    sim = MotorSimulator(motor_ids=(1,)).start()
+    port = int(sim.address.rsplit(':', 1)[1])
+    comm = RS485Comm(port=sim.address, timeout=0.2, auto_reconnect=False)
+    try:
+        assert comm.read_angle(1) == 0.0
+        sim.close()
+        assert comm.transact_result(1, CMD_READ_ANGLE).status == 'link_error'
+        sim = MotorSimulator(motor_ids=(1,), port=port).start()
+        time.sleep(0.2)
+        assert comm.state == STATE_DISCONNECTED and comm.read_angle(1) is None
+    finally:
+        comm.close()
+        sim.close()
+
+
+if __name__ == '__main__':
+    test_eof_fail_fast_and_recovery()
+    print("✓ EOF 判定断开，断开期间立即失败，指数退避重连后通信恢复")
+    test_initial_connect_failure_and_listeners()
+    print("✓ 首次连接失败后重连，keepalive 参数，状态回调注册/移除")
+    test_no_auto_reconnect()
+    print("✓ 关闭自动重连时保持断开")
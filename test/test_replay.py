@@ -0,0 +1,108 @@
+"""测试抓包回放：解码基准统计，以及回放网关经 RS485Comm(transport=...) 驱动轮询循环
+
+运行:
+    python test/test_replay.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from proto_v43 import build_frame
+from rs485_comm import RS485Comm, CMD_READ_ANGLE, CMD_STOP
+from wire_capture import WireCapture
+from replay import Capture, load_capture, replay_decode, replay_paced, ReplayGateway, bench_poll
+
+DATA = bytes([25, 0, 0, 0, 0, 0x10, 0x27])
+
+
+def record_field_capture(path):
+    """构造一份现场抓包：1号每次 2ms 后应答，2号奇数次超时"""
+    capture = WireCapture(path, capacity=256)
+    try:
+        for i in range(20):
+            capture.tx(build_frame(1, CMD_READ_ANGLE, b''))
+            time.sleep(0.002)
+            capture.rx(build_frame(1, CMD_READ_ANGLE, DATA), 0, True)
+            capture.result(1, None)
+            capture.tx(build_frame(2, CMD_READ_ANGLE, b''))
+            if i % 2:
+                capture.result(2, 0)
+            else:
+                capture.rx(build_frame(2, CMD_READ_ANGLE, DATA), 0, True)
+                capture.result(2, None)
+        capture.tx(build_frame(0xCD, CMD_STOP, b''))
+    finally:
+        capture.close()
+
+
+def test_decode_stages_and_resyncs():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bus.wcap')
+        record_field_capture(path)
+        capture = load_capture(path)
+        assert len(capture.rx_times) == 30
+        result = replay_decode(capture, chunk=7)
+        assert result['frames'] == 30 and result['resyncs'] == 0
+        assert set(result['stages']) == {'extract_frames', 'frame_decoder', 'parse_frame',
+                                         'comm_parse_frame', 'decode_status'}
+        assert all(stage['frames'] == 30 for stage in result['stages'].values())
+        assert result['stages']['frame_decoder']['retained_bytes'] < 1024
+
+        paced = replay_paced(capture, 'capture')
+        assert paced['frames'] == 30 and paced['seconds'] >= 0.03
+
+    frame = build_frame(1, CMD_READ_ANGLE, DATA)
+    noisy = Capture(b'\x00\x3e\x11' + frame + b'\xff' * 5 + frame, [], [])
+    result = replay_decode(noisy, chunk=4)
+    assert result['frames'] == 2 and result['resyncs'] >= 2 and result['discarded'] == 8
+    assert replay_paced(noisy, 'wire')['frames'] == 2
+
+
+def test_gateway_replays_field_timing():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bus.wcap')
+        record_field_capture(path)
+        gateway = ReplayGateway.from_capture(load_capture(path))
+    comm = RS485Comm(port=gateway.port, timeout=0.05, max_retries=0,
+                     auto_reconnect=False, transport=gateway.connect)
+    try:
+        started = time.monotonic()
+        assert comm.transact(1, CMD_READ_ANGLE) == bytes([CMD_READ_ANGLE]) + DATA
+        assert time.monotonic() - started >= 0.0015          # 现场应答延迟约 2ms
+        assert comm.transact(2, CMD_READ_ANGLE) is not None
+        assert comm.transact_result(2, CMD_READ_ANGLE).status == 'timeout'
+        assert comm.transact(3, CMD_READ_ANGLE) is None
+        stats = gateway.stats()
+        assert (stats['replied'], stats['dropped'], stats['unknown']) == (2, 1, 1)
+    finally:
+        comm.close()
+        gateway.close()
+
+
+def test_bench_poll_controllers():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bus.wcap')
+        record_field_capture(path)
+        capture = load_capture(path)
+    gateway = ReplayGateway.from_capture(capture, speed=0)
+    try:
+        result = bench_poll(gateway, 'ptz', duration=0.3, interval_ms=20)
+        assert result['transactions'] >= 4, result
+        assert result['commands']['1:0x94']['failed'] == 0
+        assert result['gateway']['dropped'] >= 1
+        lift = bench_poll(gateway, 'lift', duration=0.1, interval_ms=20, motor_id=1)
+        assert lift['successes'] >= 2 and lift['failed'] == 0, lift
+    finally:
+        gateway.close()
+
+
+if __name__ == '__main__':
+    test_decode_stages_and_resyncs()
+    print("✓ 解码各层统计与重新同步")
+    test_gateway_replays_field_timing()
+    print("✓ 回放网关按现场时序应答")
+    test_bench_poll_controllers()
+    print("✓ 控制器轮询循环对回放网关运行")
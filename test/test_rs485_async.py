@@ -0,0 +1,160 @@
+"""测试 AsyncRS485Comm：并发读取串行化、其他电机ID/噪声帧被丢弃、超时重试、广播与写出失败
+
+运行:
+    python test/test_rs485_async.py
+"""
+import asyncio
+import os
+import pty
+import struct
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from motor_sim import MotorSimulator
+from proto_v43 import build_frame, FrameDecoder
+from rs485_async import AsyncRS485Comm
+
+
+def test_concurrent_reads_and_broadcast():
+    async def run(sim):
+        async with AsyncRS485Comm(sim.address, timeout=0.2) as comm:
+            assert comm.available
+            statuses = await asyncio.gather(*(comm.read_status(motor_id) for motor_id in (1, 2, 3) * 10))
+            assert [s['angle_deg'] for s in statuses[:3]] == [0.0, -30.0, 45.5]
+            assert all(s is not None for s in statuses)
+            assert sim.stats()['requests'] == 30                 # 每个请求一次往返，无重试
+
+            reply = await comm.set_target_angle(1, 90.0, speed_rpm=10)
+            assert reply['success'] and sim.motor(1).target == 90.0
+            await comm.set_target_angle(2, 90.0, speed_rpm=10)
+            await asyncio.sleep(0.1)
+            assert await comm.broadcast_stop()
+            # 广播无应答；下一帧在静默间隔之后发送，此时电机已停止
+            stopped = await comm.read_angle(1)
+            assert sim.stats()['broadcasts'] == 1 and 0.0 < stopped < 20.0
+            motors = sim.stats()['motors']
+            assert not motors[1]['moving'] and not motors[2]['moving']
+            assert (await comm.stop_motor(1))['success']
+            assert await comm.broadcast_shutdown()
+            assert await comm.read_angle(2) is not None and not sim.motor(2).enabled
+        assert not comm.available
+
+    with MotorSimulator(motor_ids=(1, 2, 3), angles={2: -30.0, 3: 45.5}) as sim:
+        asyncio.run(run(sim))
+
+
+def test_wrong_id_noise_and_timeout():
+    async def run_noisy(address):
+        async with AsyncRS485Comm(address, timeout=0.2, max_retries=0) as comm:
+            for _ in range(5):
+                status = await comm.read_status(1)
+                assert status['angle_deg'] == 100.0 and status['temperature'] == 30
+
+    async def run_timeout(sim):
+        async with AsyncRS485Comm(sim.address, timeout=0.05, max_retries=2) as comm:
+            started = time.monotonic()
+            assert await comm.read_status(7) is None             # 不存在的电机不应答
+            elapsed = time.monotonic() - started
+            assert 0.15 <= elapsed < 0.3, elapsed
+            assert sim.stats()['unknown'] == 3                   # 首次 + 2次重试
+            assert await comm.read_angle(1) == 0.0
+
+    # 每个应答前先到达噪声字节、其他电机ID的帧和命令回显不符的帧
+    with MotorSimulator(motor_ids=(1,), angles={1: 100.0}, garbage=1.0, motor_faults={1: 'stray'}) as sim:
+        asyncio.run(run_noisy(sim.address))
+    with MotorSimulator(motor_ids=(1,), garbage=1.0, seed=3) as sim:
+        asyncio.run(run_timeout(sim))
+
+
+def test_link_failures():
+    async def run(sim):
+        async with AsyncRS485Comm(sim.address, timeout=0.2) as comm:
+            async def broken_write(frame, gap=None):
+                raise ConnectionResetError('连接被重置')
+
+            write, comm._write = comm._write, broken_write
+            # 写出失败：与 RS485Comm 一致返回False，并标记连接不可用
+            assert not await comm.broadcast_stop()
+            assert not comm.available and await comm.read_status(1) is None
+            comm._write = write
+
+        async with AsyncRS485Comm(sim.address, timeout=0.2) as comm:
+            assert await comm.read_angle(1) == 0.0
+            sim.close()
+            assert await comm.read_status(1) is None             # 读到EOF
+            assert not comm.available and not await comm.broadcast_shutdown()
+
+        comm = AsyncRS485Comm(sim.address, timeout=0.2)
+        assert not await comm.open() and not await comm.broadcast_stop()
+        await comm.close()
+
+    sim = MotorSimulator(motor_ids=(1,)).start()
+    try:
+        asyncio.run(run(sim))
+    finally:
+        sim.close()
+
+
+def test_serial_write_does_not_block_loop():
+    master, slave = pty.openpty()
+    stop = threading.Event()
+
+    def serve():
+        decoder = FrameDecoder()
+        while not stop.is_set():
+            try:
+                chunk = os.read(master, 4096)
+            except OSError:
+                return
+            for motor_id, data in decoder.feed(chunk):
+                os.write(master, build_frame(motor_id, data[0], bytes([25, 0, 0, 0, 0]) + struct.pack('<H', 1000)))
+
+    async def run():
+        async with AsyncRS485Comm(os.ttyname(slave), timeout=0.5) as comm:
+            assert comm.available and await comm.read_angle(1) == 10.0
+
+            # 模拟慢串口：写出阻塞 100ms，期间事件循环仍能调度其他协程
+            write = comm._ser.write
+
+            def slow_write(frame):
+                time.sleep(0.1)
+                return write(frame)
+
+            comm._ser.write = slow_write
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+
+            task = asyncio.get_running_loop().create_task(ticker())
+            try:
+                assert await comm.read_angle(2) == 10.0
+                assert await comm.broadcast_stop()
+            finally:
+                task.cancel()
+            assert ticks >= 10, ticks
+
+    threading.Thread(target=serve, daemon=True).start()
+    try:
+        asyncio.run(run())
+    finally:
+        stop.set()
+        os.close(slave)
+        os.close(master)
+
+
+if __name__ == '__main__':
+    test_concurrent_reads_and_broadcast()
+    print("✓ 并发读取串行化，广播停止/关闭")
+    test_wrong_id_noise_and_timeout()
+    print("✓ 噪声与其他电机ID的帧被丢弃，无应答按重试次数超时")
+    test_link_failures()
+    print("✓ 写出失败与连接断开时广播返回False")
+    test_serial_write_does_not_block_loop()
+    print("✓ 串口写出不阻塞事件循环")
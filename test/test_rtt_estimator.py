@@ -0,0 +1,47 @@
+"""测试自适应超时 (RTO估计) 与电机隔离策略
+
+运行:
+    python test/test_rtt_estimator.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from rtt_estimator import AdaptiveTimeouts
+
+
+def test_timeout_follows_rtt():
+    at = AdaptiveTimeouts(min_timeout=0.001, max_timeout=0.2)
+    assert at.timeout_for(1, 0x94) == 0.2          # 无样本取上限
+    for _ in range(50):
+        at.on_success(1, 0x94, 0.002)
+    assert 0.001 <= at.timeout_for(1, 0x94) < 0.005
+    # 同命令的其他电机借用总线级估计
+    assert at.timeout_for(2, 0x94) < 0.005
+    assert at.timeout_for(2, 0xA4) == 0.2
+
+
+def test_quarantine_backoff_and_recovery():
+    at = AdaptiveTimeouts(quarantine_after=2, quarantine_min=0.05, quarantine_max=0.1)
+    at.on_failure(2)
+    assert not at.is_quarantined(2)
+    assert at.retries_for(2, 3) == 3               # 偶尔失败一次不减少重试
+    at.on_failure(2)
+    assert at.is_quarantined(2)
+    time.sleep(0.06)
+    assert not at.is_quarantined(2)
+    assert at.retries_for(2, 3) == 0               # 隔离期满后只探测不重试
+    at.on_failure(2)                               # 探测失败，隔离期加倍
+    assert at.snapshot()['motors'][2]['quarantine_remaining_s'] > 0.05
+    at.on_success(2, 0x94, 0.003)
+    assert not at.is_quarantined(2)
+    assert at.retries_for(2, 3) == 3
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_') and callable(fn):
+            fn()
+            print(f"✓ {name}")
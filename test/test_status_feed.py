@@ -0,0 +1,134 @@
+"""测试状态订阅：队列/回调订阅、死区与电机过滤、慢订阅者丢样本不阻塞轮询，以及 SSE 推送
+
+运行:
+    python test/test_status_feed.py
+"""
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from status_feed import StatusFeed
+from motor_sim import MotorSimulator
+from ptz_controller import PTZController
+from helpers import status
+
+
+def test_feed_filters_and_drops():
+    feed = StatusFeed()
+    every = feed.subscribe(maxsize=4)
+    changes = feed.subscribe(deadband=0.5, motor_ids=[1])
+    for angle in (0.0, 0.2, 0.4, 0.6, 0.7, 1.2):
+        feed.publish({1: status(angle), 2: status(-angle)})
+    feed.publish({1: status(1.2, temperature=31)})           # 温度变化
+    feed.publish({1: None})                                   # 读取失败
+    feed.publish({1: None})
+
+    # 死区按上次投递的样本比较；读取成败变化也投递
+    assert [(s.angle_deg, s.status and s.status['temperature']) for s in changes.drain()] == \
+        [(0.0, 30), (0.6, 30), (1.2, 30), (1.2, 31), (None, None)]
+    # 满队列丢弃最旧的样本，保留最新的；序号可发现丢样本
+    kept = every.drain()
+    assert len(kept) == 4 and every.stats()['dropped'] == 11
+    assert [s.seq for s in kept] == [6, 7, 8, 9] and kept[-1].motor_id == 1
+
+    assert every.get(timeout=0.01) is None
+    every.close()
+    assert every.get() is None and feed.subscribers == 1
+    feed.close()
+    assert feed.subscribers == 0
+
+
+def test_slow_callback_does_not_block_publisher():
+    feed = StatusFeed()
+    release = threading.Event()
+    received = []
+
+    def slow(sample):
+        release.wait(2.0)
+        received.append(sample.seq)
+
+    def broken(sample):
+        raise ValueError(sample)
+
+    sub = feed.subscribe(callback=slow, maxsize=2)
+    bad = feed.subscribe(callback=broken)
+    started = time.monotonic()
+    for i in range(100):
+        feed.publish({1: status(float(i))})
+    assert time.monotonic() - started < 0.1
+    release.set()
+    deadline = time.monotonic() + 2.0
+    while 100 not in received and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert received[-1] == 100 and len(received) <= 4 and sub.stats()['dropped'] >= 96
+    while bad.stats()['pending'] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.01)
+    stats = bad.stats()
+    assert stats['errors'] > 0 and stats['errors'] + stats['dropped'] == 100, stats     # 回调异常只计数
+    feed.close()
+
+
+def test_controller_subscriptions():
+    with MotorSimulator(motor_ids=(1, 2)) as sim:
+        ptz = PTZController(port=sim.address)
+        try:
+            moving = ptz.subscribe(deadband=1.0, motor_ids=[ptz.yaw_id], maxsize=256)
+            stuck = ptz.subscribe(callback=lambda sample: time.sleep(1.0), maxsize=1)
+            ptz.start_monitoring(interval_ms=20)
+            first = moving.get(timeout=1.0)
+            assert first.motor_id == 1 and first.angle_deg == 0.0
+            time.sleep(0.2)
+            assert moving.drain() == []                      # 静止时死区内不推送
+
+            assert ptz.set_yaw_angle(30.0, speed_rpm=10)
+            assert ptz.wait_until_reached(yaw_deg=30.0, timeout=3.0)
+            time.sleep(0.05)
+            angles = [s.angle_deg for s in moving.drain()]
+            assert len(angles) >= 10 and angles == sorted(angles) and angles[-1] >= 29.0, angles
+            # 阻塞的回调订阅者只丢样本，轮询频率不受影响
+            assert stuck.stats()['dropped'] > 20
+            assert ptz.get_poll_stats()['rate_hz'] > 40.0
+        finally:
+            ptz.close()
+        assert moving.closed and moving.get() is None
+
+
+def test_api_status_stream():
+    import api_server
+
+    with MotorSimulator(motor_ids=(1, 2), angles={1: 12.5}) as sim:
+        api_server.init_ptz_controller(port=sim.address)
+        client = api_server.app.test_client()
+        try:
+            resp = client.get('/status_stream?deadband=0.1', buffered=False)
+            assert resp.status_code == 200 and resp.mimetype == 'text/event-stream'
+            events = {}
+            for chunk in resp.response:
+                line = chunk.decode() if isinstance(chunk, bytes) else chunk
+                if line.startswith('data: '):
+                    event = json.loads(line[6:])
+                    events[event['axis']] = event
+                if len(events) == 2:
+                    break
+            resp.close()
+            assert events['yaw']['angle'] == 12.5 and events['pitch']['temperature'] == 30
+            assert client.get('/status_stream?deadband=-1').status_code == 400
+        finally:
+            api_server.ptz_controller.close()
+            api_server.ptz_controller = None
+
+
+if __name__ == '__main__':
+    test_feed_filters_and_drops()
+    print("✓ 死区、电机过滤，满队列丢弃最旧样本")
+    test_slow_callback_does_not_block_publisher()
+    print("✓ 慢回调订阅者不阻塞发布")
+    test_controller_subscriptions()
+    print("✓ 控制器订阅：运动中推送变化，阻塞的订阅者不影响轮询")
+    test_api_status_stream()
+    print("✓ /status_stream SSE 推送")
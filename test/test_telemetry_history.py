@@ -0,0 +1,123 @@
+"""测试遥测历史：环形覆盖、按时间/样本数取窗口、抽稀包含最新样本、内存固定，以及控制器与 API 记录
+
+运行:
+    python test/test_telemetry_history.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from telemetry_history import AxisHistory, raw_to_deg
+from motor_sim import MotorSimulator
+from helpers import status
+
+
+def test_ring_wraps_with_fixed_memory():
+    history = AxisHistory(capacity=100)
+    memory = history.memory_bytes
+    assert memory == 101 * 16 and len(history) == 0
+    assert history.window(seconds=10, now=0.0)['total'] == 0
+
+    history.set_target(-12.5)
+    for i in range(250):
+        history.append(float(i), status(i * 0.1, temperature=i % 50) if i != 240 else None)
+    assert len(history) == 100 and history.memory_bytes == memory
+
+    window = history.window()
+    assert list(window['time']) == [float(i) for i in range(150, 250)]          # 跨越环形边界，按时间顺序
+    assert window['angle_raw'][0] == 1500 and window['temperature'][-1] == 249 % 50
+    assert window['angle_deg'][90] is None and window['target_deg'][0] == -12.5  # 240号读取失败
+    assert raw_to_deg(35950) == -0.5 and raw_to_deg(18000) == 180.0
+
+    # 按时间：最近 10 秒 (含边界)；按样本数
+    assert list(history.window(seconds=10, now=249.0)['time']) == [float(i) for i in range(239, 250)]
+    assert list(history.window(last=3)['time']) == [247.0, 248.0, 249.0]
+    assert history.window(seconds=1000, last=5, now=249.0)['total'] == 5
+    assert history.stats() == {'samples': 100, 'capacity': 100, 'written': 250, 'span_s': 99.0,
+                               'memory_bytes': memory}
+
+    # 读取成败单独记录：-128℃ 是有效的 int8 温度
+    history.append(250.0, status(1.0, temperature=-128))
+    window = history.window(last=2)
+    assert list(window['valid']) == [1, 1] and window['temperature'][-1] == -128
+    assert window['angle_deg'][-1] == 1.0
+    history.append(251.0, None)
+    assert history.window(last=1)['angle_deg'] == [None] and history.window(last=1)['valid'][0] == 0
+
+
+def test_window_skips_sample_being_written():
+    class WriterDuringCopy(AxisHistory):
+        """复制窗口时，写者正在写第 count 个样本 (已写时间列，尚未递增 count)"""
+        def _slice(self, arr, start, end, step):
+            self.time[self.count % self.slots] = -1.0
+            return super()._slice(arr, start, end, step)
+
+    history = WriterDuringCopy(capacity=10)
+    for i in range(20):
+        history.append(float(i), status(float(i)))
+    times = list(history.window()['time'])
+    assert times == [float(i) for i in range(10, 20)] and -1.0 not in times
+    # 缓冲区只留一个空位时，正在写入的位置不在可见窗口内；再写一个样本后最旧的被丢弃
+    history.append(20.0, status(20.0))
+    assert list(history.window()['time'])[-1] == 20.0 and -1.0 not in history.window()['time']
+
+
+def test_downsampling_keeps_latest_sample():
+    history = AxisHistory(capacity=1000)
+    for i in range(1234):
+        history.append(i * 0.02, status(i % 36000 / 100.0))
+    for max_points in (1, 7, 100, 999, 1000):
+        window = history.window(max_points=max_points)
+        times = list(window['time'])
+        assert window['total'] == 1000 and len(times) <= max_points, (max_points, len(times))
+        assert times[-1] == 1233 * 0.02                                            # 总是包含最新样本
+        assert all(round((b - a) / 0.02) == window['step'] for a, b in zip(times, times[1:]))
+    window = history.window(seconds=2.0, max_points=10, now=1233 * 0.02)
+    assert window['total'] == 101 and window['step'] == 11 and len(window['time']) == 10
+
+
+def test_controller_records_history():
+    import api_server
+
+    with MotorSimulator(motor_ids=(1, 2)) as sim:
+        api_server.init_ptz_controller(port=sim.address)
+        ptz = api_server.ptz_controller
+        client = api_server.app.test_client()
+        try:
+            ptz.stop_monitoring()
+            ptz.start_monitoring(interval_ms=20)
+            time.sleep(0.2)
+            assert ptz.set_yaw_angle(20.0, speed_rpm=10)
+            assert ptz.wait_until_reached(yaw_deg=20.0, timeout=3.0)
+            time.sleep(0.1)
+
+            window = ptz.get_history(ptz.yaw_id)
+            angles, targets = window['angle_deg'], window['target_deg']
+            assert window['total'] > 20 and angles[0] == 0.0 and angles[-1] == 20.0
+            assert targets[0] is None and targets[-1] == 20.0                    # 记录当时的指令目标
+            assert ptz.get_history(ptz.pitch_id)['target_deg'][-1] is None
+            stats = ptz.get_history_stats()
+            assert stats[ptz.yaw_id]['samples'] == window['total']
+
+            resp = client.get('/history?axis=yaw&seconds=60&max_points=10')
+            data = resp.get_json()
+            assert resp.status_code == 200 and data['success'] and len(data['t']) <= 10
+            assert data['angle'][-1] == 20.0 and data['target'][-1] == 20.0 and -1.0 < data['t'][-1] <= 0
+            assert client.get('/history?axis=roll').status_code == 400
+            assert client.get('/history?axis=yaw&max_points=0').status_code == 400
+        finally:
+            ptz.close()
+            api_server.ptz_controller = None
+
+
+if __name__ == '__main__':
+    test_ring_wraps_with_fixed_memory()
+    print("✓ 环形覆盖最旧样本，内存固定")
+    test_window_skips_sample_being_written()
+    print("✓ 正在写入的样本不出现在窗口中")
+    test_downsampling_keeps_latest_sample()
+    print("✓ 抽稀等间隔且包含最新样本")
+    test_controller_records_history()
+    print("✓ 控制器记录角度、温度与指令目标，/history 查询")
@@ -0,0 +1,167 @@
+"""测试流水线批量事务 transact_many_results：按 (电机ID, 命令回显) 匹配乱序应答、
+同一批中重复的 (ID, 命令)、只重发丢失应答的请求，以及串口模式退化为逐个事务
+
+运行:
+    python test/test_transact_many.py
+"""
+import os
+import pty
+import socket
+import struct
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from proto_v43 import build_frame, FrameDecoder
+from rs485_comm import RS485Comm, CMD_READ_ANGLE, CMD_READ_STATUS_A4, decode_status, encode_target_angle
+
+
+def reply(motor_id, cmd, angle_raw):
+    return build_frame(motor_id, cmd, bytes([25, 0, 0, 0, 0]) + struct.pack('<H', angle_raw))
+
+
+class ScriptedGateway:
+    """本地替身网关：每次收到的一组命令帧 [(motor_id, cmd), ...] 交给 handler，返回要发回的字节"""
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.batches = []
+        self._srv = socket.socket()
+        self._srv.bind(('127.0.0.1', 0))
+        self._srv.listen(1)
+        self.address = '127.0.0.1:%d' % self._srv.getsockname()[1]
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        conn, _ = self._srv.accept()
+        decoder = FrameDecoder()
+        with conn:
+            while True:
+                chunk = conn.recv(4096)
+                if not chunk:
+                    return
+                frames = [(motor_id, data[0]) for motor_id, data in decoder.feed(chunk)]
+                if frames:
+                    self.batches.append(frames)
+                    conn.sendall(self.handler(frames))
+
+
+def angles(results):
+    return [decode_status(result.data)['angle_raw'] if result.ok else None for result in results]
+
+
+def test_out_of_order_replies():
+    # 应答按发送的逆序到达，0x94 与 0xA4 混在同一批
+    gateway = ScriptedGateway(lambda frames: b''.join(reply(motor_id, cmd, motor_id * 1000 + cmd)
+                                                      for motor_id, cmd in reversed(frames)))
+    comm = RS485Comm(port=gateway.address, auto_reconnect=False)
+    try:
+        payload = encode_target_angle(30.0, 10)[0]
+        requests = [(1, CMD_READ_ANGLE, b''), (2, CMD_READ_ANGLE, b''), (1, CMD_READ_STATUS_A4, payload),
+                    (3, CMD_READ_ANGLE, b'')]
+        results = comm.transact_many_results(requests, timeout=0.5)
+        assert [result.status for result in results] == ['ok'] * 4
+        assert [result.attempts for result in results] == [1] * 4
+        assert angles(results) == [1148, 2148, 1164, 3148]
+        assert results[2].data[0] == CMD_READ_STATUS_A4
+        assert gateway.batches == [[(1, 0x94), (2, 0x94), (1, 0xA4), (3, 0x94)]]   # 一次流水线发出
+    finally:
+        comm.close()
+
+
+def test_duplicate_requests_matched_in_send_order():
+    sequence = iter(range(1, 100))
+    gateway = ScriptedGateway(lambda frames: b''.join(reply(motor_id, cmd, next(sequence))
+                                                      for motor_id, cmd in frames))
+    comm = RS485Comm(port=gateway.address, auto_reconnect=False)
+    try:
+        results = comm.transact_many_results([(1, CMD_READ_ANGLE, b''), (2, CMD_READ_ANGLE, b''),
+                                              (1, CMD_READ_ANGLE, b'')], timeout=0.5)
+        # 同一 (ID, 命令) 的应答按发送顺序依次分配
+        assert angles(results) == [1, 2, 3]
+        assert len(gateway.batches) == 1
+    finally:
+        comm.close()
+
+
+def test_dropped_reply_retried_alone():
+    seen = set()
+
+    def handler(frames):
+        out = b''
+        for motor_id, cmd in frames:
+            # 2号电机第一次不应答，4号电机始终不应答
+            if motor_id == 4 or (motor_id == 2 and motor_id not in seen):
+                seen.add(motor_id)
+                continue
+            out += reply(motor_id, cmd, motor_id)
+        return out
+
+    gateway = ScriptedGateway(handler)
+    comm = RS485Comm(port=gateway.address, max_retries=2, auto_reconnect=False)
+    try:
+        started = time.monotonic()
+        results = comm.transact_many_results([(1, CMD_READ_ANGLE, b''), (2, CMD_READ_ANGLE, b''),
+                                              (3, CMD_READ_ANGLE, b''), (4, CMD_READ_ANGLE, b'')],
+                                             timeout=0.05)
+        elapsed = time.monotonic() - started
+        assert angles(results) == [1, 2, 3, None]
+        assert [result.status for result in results] == ['ok', 'ok', 'ok', 'timeout']
+        assert [result.attempts for result in results] == [1, 2, 1, 3]
+        # 重试只重发未收到应答的请求
+        assert gateway.batches == [[(1, 0x94), (2, 0x94), (3, 0x94), (4, 0x94)],
+                                   [(2, 0x94), (4, 0x94)], [(4, 0x94)]]
+        assert 0.15 <= elapsed < 0.4, elapsed
+        m = comm.metrics_snapshot()['commands']
+        assert m['2:0x94']['retries'] == 1 and m['2:0x94']['successes'] == 1
+        assert m['4:0x94']['failed'] == 1 and m['4:0x94']['errors']['timeout'] == 3
+    finally:
+        comm.close()
+
+
+def test_serial_falls_back_to_sequential():
+    master, slave = pty.openpty()
+    reads = []
+    stop = threading.Event()
+
+    def serve():
+        decoder = FrameDecoder()
+        while not stop.is_set():
+            try:
+                chunk = os.read(master, 4096)
+            except OSError:
+                return
+            frames = decoder.feed(chunk)
+            if frames:
+                reads.append([motor_id for motor_id, _ in frames])
+            for motor_id, data in frames:
+                time.sleep(0.005)
+                os.write(master, reply(motor_id, data[0], motor_id * 10))
+
+    threading.Thread(target=serve, daemon=True).start()
+    comm = RS485Comm(port=os.ttyname(slave), auto_reconnect=False)
+    try:
+        assert comm.available and not comm._tcp_mode
+        results = comm.transact_many_results([(1, CMD_READ_ANGLE, b''), (2, CMD_READ_ANGLE, b''),
+                                              (3, CMD_READ_ANGLE, b'')], timeout=0.5)
+        assert angles(results) == [10, 20, 30]
+        # 半双工：每个请求等到应答后才发下一个
+        assert reads == [[1], [2], [3]]
+    finally:
+        stop.set()
+        comm.close()
+        os.close(slave)
+        os.close(master)
+
+
+if __name__ == '__main__':
+    test_out_of_order_replies()
+    print("✓ 乱序应答按 (ID, 命令回显) 匹配")
+    test_duplicate_requests_matched_in_send_order()
+    print("✓ 同一批中重复的 (ID, 命令) 按发送顺序匹配")
+    test_dropped_reply_retried_alone()
+    print("✓ 丢失的应答单独重试")
+    test_serial_falls_back_to_sequential()
+    print("✓ 串口模式逐个事务")
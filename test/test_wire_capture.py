@@ -0,0 +1,85 @@
+"""测试总线抓包：环形文件的写入、覆盖、重新打开，以及 RS485Comm 收发帧与结果的记录
+
+运行:
+    python test/test_wire_capture.py
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from proto_v43 import build_frame, FRAME_SIZE
+from motor_sim import MotorSimulator, STRAY_ID_OFFSET
+from rs485_comm import RS485Comm, CMD_READ_ANGLE
+from wire_capture import (WireCapture, read_capture, filter_records, decode_record, format_record,
+                          HEADER_SIZE, RECORD_SIZE)
+
+def test_ring_wraps_and_reopens():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bus.wcap')
+        capture = WireCapture(path, capacity=8)
+        for motor_id in range(1, 13):
+            capture.tx(build_frame(motor_id, CMD_READ_ANGLE, b''))
+        capture.close()
+        assert os.path.getsize(path) == HEADER_SIZE + 8 * RECORD_SIZE
+        records = list(read_capture(path))
+        assert [r['seq'] for r in records] == list(range(4, 12))
+        assert [r['motor_id'] for r in records] == list(range(5, 13))
+        assert all(r['dir'] == 'tx' and len(r['frame']) == FRAME_SIZE for r in records)
+
+        # 格式一致时接着写入，容量不同则重新开始
+        capture = WireCapture(path, capacity=8)
+        capture.result(7, None)
+        capture.close()
+        records = list(read_capture(path))
+        assert records[-1]['seq'] == 12 and records[-1]['result'] == 'ok'
+        capture = WireCapture(path, capacity=4)
+        assert capture.count == 0
+        capture.close()
+
+
+def test_comm_capture_frames_and_results():
+    stray = 1 + STRAY_ID_OFFSET
+    # 1号应答前先到达其他ID和命令回显错的帧，2号不在总线上 (不应答)
+    with tempfile.TemporaryDirectory() as tmp, \
+            MotorSimulator(motor_ids=(1,), angles={1: 100.0}, motor_faults={1: 'stray'}) as sim:
+        path = os.path.join(tmp, 'bus.wcap')
+        capture = WireCapture(path, capacity=64)
+        comm = RS485Comm(port=sim.address, timeout=0.02, max_retries=1,
+                         auto_reconnect=False, capture=capture)
+        try:
+            assert comm.transact(1, CMD_READ_ANGLE) is not None
+            assert comm.transact(2, CMD_READ_ANGLE) is None
+            assert comm.transact_many([(1, CMD_READ_ANGLE, b'')])[0] is not None
+            assert comm.broadcast_stop()
+            assert comm.set_capture(None) is capture
+            assert comm.transact(1, CMD_READ_ANGLE) is not None
+        finally:
+            comm.close()
+            capture.close()
+
+        records = list(read_capture(path))
+        assert [(r['dir'], r['motor_id'], r.get('result')) for r in records] == [
+            ('tx', 1, None), ('rx', stray, 'unmatched'), ('rx', 1, 'unmatched'), ('rx', 1, 'matched'),
+            ('result', 1, 'ok'),
+            ('tx', 2, None), ('result', 2, 'timeout'), ('tx', 2, None), ('result', 2, 'timeout'),
+            ('tx', 1, None), ('rx', stray, 'unmatched'), ('rx', 1, 'unmatched'), ('rx', 1, 'matched'),
+            ('result', 1, 'ok'),
+            ('tx', 205, None),
+        ]
+        assert all(a['monotonic'] <= b['monotonic'] for a, b in zip(records, records[1:]))
+
+        timeouts = filter_records(records, motor_id=2, direction='result', result='timeout')
+        assert len(timeouts) == 2
+        fields = decode_record(filter_records(records, motor_id=1, direction='rx', result='matched')[0])
+        assert fields['cmd_echo'] == '0x94' and fields['angle_deg'] == 100.0
+        assert decode_record(timeouts[0]) is None
+        assert 'angle=+100.00°' in format_record(records[3])
+
+
+if __name__ == '__main__':
+    test_ring_wraps_and_reopens()
+    print("✓ 环形文件覆盖与重新打开")
+    test_comm_capture_frames_and_results()
+    print("✓ 收发帧与事务结果记录")
@@ -0,0 +1,233 @@
+"""总线抓包：把每个收发帧写入固定大小的内存映射环形文件，可长期常开。
+
+RS485Comm(..., capture=WireCapture('/var/log/inchiptz/bus.wcap')) 或
+comm.set_capture(...) 开启后，记录:
+    TX      发出的每个命令帧 (流水线批量帧逐帧记录)
+    RX      解码出的每个完整响应帧，result 为 0 表示与当前事务匹配，1 表示迟到/其他电机的帧
+    RESULT  每次尝试的结果 (ok / timeout / crc / ... 见 bus_metrics.FAIL_REASONS)，无帧数据
+
+每条记录定长32字节，写入只是对 mmap 的内存拷贝：没有逐帧的系统调用和格式化，
+写满后从头覆盖。页面由内核回写，进程崩溃后文件中仍保留最近的记录。
+
+文件布局 (小端):
+    文件头 64字节: 魔数 'V43WCAP1', 版本, 记录长度, 容量(记录数), 已写记录总数,
+                   monotonic 与系统时间的差 (用于离线换算为时间戳)
+    记录   32字节: monotonic时间 f64, 方向 u8, 电机ID u8, 命令/结果 u8, 帧长 u8,
+                   序号 u32 (总序号低32位，用于识别已被覆盖的记录), 帧 13字节, 填充3字节
+
+离线查看:
+    python wire_capture.py bus.wcap                     # 全部记录
+    python wire_capture.py bus.wcap --motor 2 --last 50 # 2号电机最近50条
+    python wire_capture.py bus.wcap --dir result --result timeout
+"""
+from __future__ import annotations
+import mmap
+import struct
+import time
+from typing import Optional, Dict, Any, Iterator, List
+
+from proto_v43 import FRAME_SIZE, parse_frame, demo_decode_fields
+from bus_metrics import FAIL_REASONS
+
+MAGIC = b'V43WCAP1'
+VERSION = 1
+HEADER_SIZE = 64
+RECORD_SIZE = 32
+DEFAULT_CAPACITY = 131072            # 4MB，按每秒几千帧约可保留半分钟以上
+
+# 魔数, 版本, 记录长度, 容量, 已写记录总数, monotonic→系统时间偏移, 创建时间
+HEADER_STRUCT = struct.Struct('<8sHHIQdd')
+COUNT_STRUCT = struct.Struct('<Q')
+COUNT_OFFSET = 16
+# 时间, 方向, 电机ID, 命令/结果, 帧长, 序号 (其后为13字节帧与3字节填充)
+RECORD_STRUCT = struct.Struct('<dBBBBI')
+FRAME_OFFSET = RECORD_STRUCT.size
+
+DIR_TX = 0
+DIR_RX = 1
+DIR_RESULT = 2
+DIR_NAMES = ('tx', 'rx', 'result')
+
+# RX 记录的 result 字段
+RX_MATCHED = 0
+RX_UNMATCHED = 1
+
+# RESULT 记录的结果码: 0 成功，其余为 FAIL_REASONS 下标+1
+RESULT_NAMES = ('ok',) + FAIL_REASONS
+
+
+class WireCapture:
+    """环形抓包文件写入端
+
+    Args:
+        path: 抓包文件路径；已存在且格式一致时接着写入
+        capacity: 环形容量(记录数)
+
+    写入方法不加锁，调用方需保证串行 (RS485Comm 在总线锁内调用)。
+    """
+
+    def __init__(self, path: str, capacity: int = DEFAULT_CAPACITY):
+        if capacity <= 0:
+            raise ValueError('capacity must be positive')
+        self.path = path
+        self.capacity = capacity
+        size = HEADER_SIZE + capacity * RECORD_SIZE
+        self._file = open(path, 'a+b')
+        try:
+            self._file.seek(0)
+            header = self._file.read(HEADER_STRUCT.size)
+            self._file.truncate(size)
+            self._mm = mmap.mmap(self._file.fileno(), size)
+        except Exception:
+            self._file.close()
+            raise
+        self._count = 0
+        if len(header) == HEADER_STRUCT.size:
+            magic, version, record_size, old_capacity, count, _, _ = HEADER_STRUCT.unpack(header)
+            if (magic, version, record_size, old_capacity) == (MAGIC, VERSION, RECORD_SIZE, capacity):
+                self._count = count
+        # 每次打开都更新时钟偏移 (monotonic 的起点随重启变化)
+        HEADER_STRUCT.pack_into(self._mm, 0, MAGIC, VERSION, RECORD_SIZE, capacity, self._count,
+                                time.time() - time.monotonic(), time.time())
+
+    @property
+    def count(self) -> int:
+        """已写记录总数 (含已被覆盖的)"""
+        return self._count
+
+    def _record(self, direction: int, motor_id: int, code: int, frame, start: int = 0, length: int = 0):
+        n = self._count
+        off = HEADER_SIZE + (n % self.capacity) * RECORD_SIZE
+        mm = self._mm
+        RECORD_STRUCT.pack_into(mm, off, time.monotonic(), direction, motor_id & 0xFF, code,
+                                length, n & 0xFFFFFFFF)
+        if length:
+            mm[off + FRAME_OFFSET:off + FRAME_OFFSET + length] = frame[start:start + length]
+        self._count = n + 1
+        COUNT_STRUCT.pack_into(mm, COUNT_OFFSET, n + 1)
+
+    def tx(self, frames):
+        """记录发出的帧 (可为连续多帧)"""
+        for start in range(0, len(frames) - FRAME_SIZE + 1, FRAME_SIZE):
+            self._record(DIR_TX, frames[start + 1], frames[start + 3], frames, start, FRAME_SIZE)
+
+    def rx(self, buf, off: int, matched: bool):
+        """记录解码出的响应帧 (buf[off:off+13])"""
+        self._record(DIR_RX, buf[off + 1], RX_MATCHED if matched else RX_UNMATCHED, buf, off, FRAME_SIZE)
+
+    def result(self, motor_id: int, reason: Optional[int]):
+        """记录一次尝试的结果；reason 为 None 表示成功，否则为 FAIL_* 下标"""
+        self._record(DIR_RESULT, motor_id, 0 if reason is None else reason + 1, None)
+
+    def flush(self):
+        self._mm.flush()
+
+    def close(self):
+        if self._mm.closed:
+            return
+        self._mm.flush()
+        self._mm.close()
+        self._file.close()
+
+
+def read_capture(path: str) -> Iterator[Dict[str, Any]]:
+    """按写入顺序读出环形文件中仍有效的记录"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < HEADER_SIZE:
+        raise ValueError(f'{path}: 文件太短')
+    magic, version, record_size, capacity, count, clock_offset, _ = HEADER_STRUCT.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION or record_size != RECORD_SIZE:
+        raise ValueError(f'{path}: 不是抓包文件')
+    for n in range(max(0, count - capacity), count):
+        off = HEADER_SIZE + (n % capacity) * RECORD_SIZE
+        ts, direction, motor_id, code, length, seq = RECORD_STRUCT.unpack_from(data, off)
+        if seq != n & 0xFFFFFFFF:
+            continue                 # 写入中途被打断或已被覆盖
+        frame = data[off + FRAME_OFFSET:off + FRAME_OFFSET + length]
+        record = {
+            'seq': n,
+            'monotonic': ts,
+            'time': ts + clock_offset,
+            'dir': DIR_NAMES[direction] if direction < len(DIR_NAMES) else str(direction),
+            'motor_id': motor_id,
+            'frame': frame,
+        }
+        if direction == DIR_RESULT:
+            record['result'] = RESULT_NAMES[code] if code < len(RESULT_NAMES) else str(code)
+        elif direction == DIR_RX:
+            record['result'] = 'matched' if code == RX_MATCHED else 'unmatched'
+        yield record
+
+
+def decode_record(record: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """用 proto_v43 解析记录中的帧 (0x94 响应拆解字段)；无帧或校验失败返回None"""
+    frame = record['frame']
+    if not frame:
+        return None
+    parsed = parse_frame(frame)
+    if parsed is None:
+        return {'error': 'CRC/FORMAT', 'raw_hex': frame.hex()}
+    addr, data = parsed
+    if record['dir'] == 'rx' and data[0] == 0x94:
+        return demo_decode_fields(data)
+    return {'cmd': f'0x{data[0]:02X}', 'raw_hex': data.hex()}
+
+
+def format_record(record: Dict[str, Any], decode: bool = True) -> str:
+    wall = time.strftime('%H:%M:%S', time.localtime(record['time']))
+    line = (f"{record['seq']:>10} {wall}.{int(record['time'] * 1000) % 1000:03d} "
+            f"{record['monotonic']:>14.6f} {record['dir']:<6} id={record['motor_id']:<3}")
+    if 'result' in record:
+        line += f" {record['result']:<12}"
+    else:
+        line += ' ' * 13
+    if record['frame']:
+        line += ' ' + record['frame'].hex(' ')
+    if decode:
+        fields = decode_record(record)
+        if fields and 'angle_deg' in fields:
+            line += f"  angle={fields['angle_deg']:+.2f}°"
+        elif fields and 'error' in fields:
+            line += f"  {fields['error']}"
+    return line
+
+
+def filter_records(records, motor_id: Optional[int] = None, direction: Optional[str] = None,
+                   result: Optional[str] = None, since: Optional[float] = None) -> List[Dict[str, Any]]:
+    """按电机ID、方向、结果、时间 (monotonic 秒) 过滤记录"""
+    out = []
+    for record in records:
+        if motor_id is not None and record['motor_id'] != motor_id:
+            continue
+        if direction is not None and record['dir'] != direction:
+            continue
+        if result is not None and record.get('result') != result:
+            continue
+        if since is not None and record['monotonic'] < since:
+            continue
+        out.append(record)
+    return out
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='查看总线抓包环形文件')
+    parser.add_argument('path', help='抓包文件')
+    parser.add_argument('--motor', type=int, default=None, help='只看指定电机ID (广播为205)')
+    parser.add_argument('--dir', choices=DIR_NAMES, default=None, help='只看指定方向')
+    parser.add_argument('--result', default=None, help='只看指定结果 (ok/timeout/crc/matched/unmatched ...)')
+    parser.add_argument('--last', type=int, default=None, help='只显示最后N条')
+    parser.add_argument('--no-decode', action='store_true', help='不解析帧字段')
+    args = parser.parse_args()
+
+    records = filter_records(read_capture(args.path), args.motor, args.dir, args.result)
+    if args.last is not None:
+        records = records[-args.last:]
+    for record in records:
+        print(format_record(record, decode=not args.no_decode))
+
+
+if __name__ == '__main__':
+    main()